@@ -1,230 +1,74 @@
 import os
-import json
-import requests
-import numpy as np
-from urllib.parse import urlparse, parse_qs
-from http.server import BaseHTTPRequestHandler
-from dotenv import load_dotenv
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import sys
 import logging
-import asyncio
-import google.generativeai as genai
 
-# Load environment variables
-load_dotenv()
+# Shared modules (caching, clients, ...) live alongside search.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Configure Gemini API
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable not set")
+from lazy_init import Lazy, load_environment
+from metrics import timed, count_deadline_exceeded
+from deadline import deadline_scope, current_deadline, stage_timeout, expired, DeadlineExceeded, DEADLINE_ENHANCED_CHAT
+from circuit_breaker import breaker, UpstreamUnavailable
+import rag_chatbot
 
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('models/gemini-1.5-flash-latest')
+# Load environment variables before shared modules read their configuration
+load_environment(__file__)
+
+# Cold starts: nothing heavy happens at import. The Gemini SDK, numpy, psycopg2
+# and the shared service modules load when the first request that needs them
+# builds the chatbot or the model (see get_chatbot / get_model).
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class EmbeddingService:
-    """Service for generating text embeddings using HuggingFace API"""
-    
-    def __init__(self):
-        self.api_url = "https://api-inference.huggingface.co/models/BAAI/bge-large-en-v1.5"
-        token = os.getenv('HUGGINGFACE_API_TOKEN', '').strip()
-        self.headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-        self.embedding_dim = 1024  # BAAI/bge-large-en-v1.5 dimensions
-    
-    def generate_embedding(self, text):
-        """Generate embedding for given text"""
-        try:
-            payload = {
-                "inputs": text,
-                "options": {"wait_for_model": True}
-            }
-            response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=30)
-            
-            # Check for different error types
-            if response.status_code == 401:
-                logger.error("HuggingFace API authentication failed. Check your token.")
-                return None
-            elif response.status_code == 503:
-                logger.warning("Model is loading, waiting...")
-                # Model might be loading, try again after a short wait
-                import time
-                time.sleep(5)
-                response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=30)
-            
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            # Handle different response formats
-            if isinstance(result, list) and len(result) > 0:
-                # Check if it's a nested list (batch response)
-                if isinstance(result[0], list):
-                    return result[0]  # First embedding in batch
-                else:
-                    return result  # Direct embedding
-            elif isinstance(result, dict) and 'error' in result:
-                logger.error(f"HuggingFace API error: {result['error']}")
-                return None
-            else:
-                logger.error(f"Unexpected response format: {result}")
-                return None
-                
-        except requests.exceptions.Timeout:
-            logger.error("HuggingFace API timeout")
-            return None
-        except Exception as e:
-            logger.error(f"Error generating embedding: {str(e)}")
-            return None
+def _create_model():
+    import google.generativeai as genai
+    # Configure Gemini API
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY environment variable not set")
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel('models/gemini-1.5-flash-latest')
 
-class DatabaseService:
-    """Service for database operations with vector support"""
-    
-    def __init__(self):
-        self.db_url = os.getenv('DATABASE_URL')
-        
-    def get_connection(self):
-        """Get database connection"""
-        try:
-            return psycopg2.connect(self.db_url)
-        except Exception as e:
-            logger.error(f"Database connection error: {str(e)}")
-            return None
-    
-    def setup_database(self):
-        """Setup database schema with pgvector extension"""
-        try:
-            conn = self.get_connection()
-            if not conn:
-                return False
-                
-            cursor = conn.cursor()
-            
-            # Enable pgvector extension
-            cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-            
-            # Create documents table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS documents (
-                    id SERIAL PRIMARY KEY,
-                    title VARCHAR(255) NOT NULL,
-                    content TEXT NOT NULL,
-                    embedding vector(384),
-                    metadata JSONB DEFAULT '{}',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            
-            # Create index for vector similarity search
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS documents_embedding_idx 
-                ON documents USING ivfflat (embedding vector_cosine_ops)
-                WITH (lists = 100);
-            """)
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            logger.info("Database setup completed successfully")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Database setup error: {str(e)}")
-            return False
-    
-    def insert_document(self, title, content, embedding, metadata=None):
-        """Insert document with embedding"""
-        try:
-            conn = self.get_connection()
-            if not conn:
-                return False
-                
-            cursor = conn.cursor()
-            
-            embedding_str = f"[{','.join(map(str, embedding))}]"
-            metadata_json = json.dumps(metadata or {})
-            
-            cursor.execute("""
-                INSERT INTO documents (title, content, embedding, metadata)
-                VALUES (%s, %s, %s, %s)
-            """, (title, content, embedding_str, metadata_json))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error inserting document: {str(e)}")
-            return False
-    
-    def search_similar_documents(self, query_embedding, limit=3, similarity_threshold=0.7):
-        """Search for similar documents using cosine similarity"""
-        try:
-            conn = self.get_connection()
-            if not conn:
-                return []
-                
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            embedding_str = f"[{','.join(map(str, query_embedding))}]"
-            
-            cursor.execute("""
-                SELECT title, content, metadata,
-                       (1 - (embedding <=> %s::vector)) as similarity_score
-                FROM documents
-                WHERE (1 - (embedding <=> %s::vector)) >= %s
-                ORDER BY embedding <=> %s::vector
-                LIMIT %s;
-            """, (embedding_str, embedding_str, similarity_threshold, embedding_str, limit))
-            
-            results = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            
-            return [dict(row) for row in results]
-            
-        except Exception as e:
-            logger.error(f"Error searching documents: {str(e)}")
-            return []
+_model = Lazy(_create_model)
+
+def get_model():
+    """Return the configured Gemini model, importing the SDK on first use"""
+    return _model.get()
 
 class GeminiService:
     """Service for generating responses using Google Gemini API"""
     
     def __init__(self):
+        from context_packer import ContextPacker, CONTEXT_PACKING_ENABLED
         # Now using the direct Gemini API client instead of HTTP requests
-        pass
+        # Keeps prompt size (and prefill latency) bounded however verbose the documents are
+        self.packer = ContextPacker() if CONTEXT_PACKING_ENABLED else None
     
-    def generate_response(self, query, context_documents):
-        """Generate response using retrieved context with 100% accuracy"""
-        try:
-            # Prepare enhanced context from retrieved documents
-            context = ""
-            sources = []
+    def build_prompt(self, query, context_documents):
+        """Build the grounded prompt and source list from retrieved documents"""
+        if self.packer is not None:
+            context_documents = self.packer.pack(query, context_documents)
+        # Prepare enhanced context from retrieved documents
+        context = ""
+        sources = []
+        
+        for i, doc in enumerate(context_documents, 1):
+            similarity = doc.get('similarity_score', 0)
+            title = doc['title']
+            content = doc['content']
             
-            for i, doc in enumerate(context_documents, 1):
-                similarity = doc.get('similarity_score', 0)
-                title = doc['title']
-                content = doc['content']
-                
-                # Enhanced context formatting with full content
-                context += f"""
+            # Enhanced context formatting with full content
+            context += f"""
 === DOCUMENT {i}: {title} (Relevance Score: {similarity:.3f}) ===
 {content}
 
 """
-                sources.append(title)
-            
-            # Create strict prompt for 100% accuracy
-            prompt = f"""You are an AI assistant that answers questions based ONLY on the provided context documents.
+            sources.append(title)
+        
+        # Create strict prompt for 100% accuracy
+        prompt = f"""You are an AI assistant that answers questions based ONLY on the provided context documents.
 
 DOCUMENTS:
 {context}
@@ -248,113 +92,136 @@ Answer format:
 - If no relevant information: "I don't have information about that topic in my knowledge base."
 
 ANSWER:"""
-            
-            # Use the direct Gemini API client
-            response = model.generate_content(prompt)
-            generated_text = response.text.strip()
-            
-            return {
-                "answer": generated_text,
-                "sources": sources,
-                "context_used": len(context_documents)
-            }
-                
-        except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
-            return {
-                "answer": "I do not have enough information to answer your question.",
-                "sources": [],
-                "context_used": 0,
-                "error": str(e)
-            }
-
-class RAGChatbot:
-    """Main RAG Chatbot class"""
-    
-    def __init__(self):
-        self.embedding_service = EmbeddingService()
-        self.db_service = DatabaseService()
-        self.gemini_service = GeminiService()
+        
+        return prompt, sources
     
-    def setup(self):
-        """Setup the chatbot (database, etc.)"""
-        return self.db_service.setup_database()
+    def _format_response(self, response, sources, context_documents):
+        return {
+            "answer": response.text.strip(),
+            "sources": sources,
+            "context_used": len(context_documents)
+        }
     
-    def add_document(self, title, content, metadata=None):
-        """Add a document to the knowledge base"""
+    def generate_response(self, query, context_documents):
+        """Generate response using retrieved context with 100% accuracy; raises DeadlineExceeded when out of time, UpstreamUnavailable on failure"""
+        from hedging import hedged_call
         try:
-            # Generate embedding for the document
-            embedding = self.embedding_service.generate_embedding(content)
-            if embedding is None:
-                return False
-            
-            # Store in database
-            return self.db_service.insert_document(title, content, embedding, metadata)
-            
+            prompt, sources = self.build_prompt(query, context_documents)
+            
+            # Use the direct Gemini API client; a slow call is hedged only with HEDGE_LLM_ENABLED, and while
+            # Gemini's breaker is open this fails at once
+            with timed('gemini'):
+                response = breaker('gemini').call(hedged_call, 'gemini', get_model().generate_content, prompt,
+                                                  request_options={"timeout": stage_timeout(30)})
+            return self._format_response(response, sources, context_documents)
+        
+        except (DeadlineExceeded, UpstreamUnavailable):
+            raise
         except Exception as e:
-            logger.error(f"Error adding document: {str(e)}")
-            return False
+            if expired():
+                # SDK timeout errors vary; past the deadline any failure is the deadline's
+                raise DeadlineExceeded(f"Gemini did not answer in time: {str(e)}") from e
+            # The caller answers without Gemini rather than with a generic apology
+            logger.error(f"Error generating response: {str(e)}")
+            raise UpstreamUnavailable(f"Gemini request failed: {str(e)}") from e
     
-    def chat(self, query):
-        """Process a chat query using RAG pipeline with 100% accuracy"""
+    async def generate_response_async(self, query, context_documents):
+        """Async variant of generate_response using the SDK's native async call; raises UpstreamUnavailable on failure"""
         try:
-            # Step 1: Generate embedding for the query
-            query_embedding = self.embedding_service.generate_embedding(query)
-            if query_embedding is None:
-                return {
-                    "answer": "Sorry, I couldn't process your question at this time.",
-                    "sources": [],
-                    "context_used": 0,
-                    "error": "Failed to generate query embedding"
-                }
-            
-            # Step 2: Search for similar documents with improved similarity threshold
-            similar_docs = self.db_service.search_similar_documents(
-                query_embedding, 
-                limit=5,  # Increased from 3 to 5 for better coverage
-                similarity_threshold=0.3  # Lowered from 0.5 to 0.3 for more inclusive search
-            )
-            
-            if not similar_docs:
-                return {
-                    "answer": "I don't have information about that topic in my knowledge base. Please try asking about topics that are covered in my documents.",
-                    "sources": [],
-                    "context_used": 0
-                }
-            
-            # Step 3: Generate response using context with 100% accuracy
-            response = self.gemini_service.generate_response(query, similar_docs)
-            
-            return response
-            
+            prompt, sources = self.build_prompt(query, context_documents)
+            with timed('gemini'):
+                response = await breaker('gemini').acall(get_model().generate_content_async, prompt)
+            return self._format_response(response, sources, context_documents)
+        
+        except UpstreamUnavailable:
+            raise
         except Exception as e:
-            logger.error(f"Error in chat processing: {str(e)}")
-            return {
-                "answer": "An error occurred while processing your question.",
-                "sources": [],
-                "context_used": 0,
-                "error": str(e)
-            }
+            logger.error(f"Error generating response: {str(e)}")
+            raise UpstreamUnavailable(f"Gemini request failed: {str(e)}") from e
+
+    def stream_response(self, query, context_documents):
+        """Yield answer text fragments as Gemini generates them; raises DeadlineExceeded when out of time, UpstreamUnavailable on failure"""
+        prompt, _ = self.build_prompt(query, context_documents)
+        with timed('gemini'):
+            try:
+                chunks = breaker('gemini').call(get_model().generate_content, prompt, stream=True,
+                                                request_options={"timeout": stage_timeout(30)})
+            except (DeadlineExceeded, UpstreamUnavailable):
+                raise
+            except Exception as e:
+                raise UpstreamUnavailable(f"Gemini stream request failed: {str(e)}") from e
+            try:
+                for chunk in chunks:
+                    if expired():
+                        raise DeadlineExceeded("Gemini stream cut off at the request deadline")
+                    # Chunks without text (e.g. safety/finish metadata) raise on .text
+                    if chunk.parts:
+                        yield chunk.text
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                if expired():
+                    raise DeadlineExceeded(f"Gemini stream cut off at the request deadline: {str(e)}") from e
+                # Broke off mid-stream; the breaker only judged the opening call
+                breaker('gemini').record_failure()
+                raise UpstreamUnavailable(f"Gemini stream failed: {str(e)}") from e
+
+class RAGChatbot(rag_chatbot.RAGChatbot):
+    """Main RAG Chatbot class, answering with the Gemini SDK (pipeline in rag_chatbot.py)"""
     
-    async def get_enhanced_rag_response(self, query):
-        """Enhanced RAG response with detailed metadata and confidence scores"""
+    def __init__(self):
+        from async_clients import AsyncEmbeddingService
+        super().__init__(
+            GeminiService(),
+            top_k=5,  # Increased from 3 to 5 for better coverage
+            similarity_threshold=0.3,  # Lowered from 0.5 to 0.3 for more inclusive search
+            no_documents_answer="I don't have information about that topic in my knowledge base. Please try asking about topics that are covered in my documents."
+        )
+        self.async_embedding_service = AsyncEmbeddingService(cache=self.embedding_service)
+
+    async def get_enhanced_rag_response(self, query, deadline=None, mode='generative'):
+        """Enhanced RAG response with detailed metadata and confidence scores, within deadline seconds if given"""
+        # The scope is entered on the loop, in this request's task: blocking work handed to
+        # asyncio.to_thread inherits it, and the async clients get it explicitly as deadline_at
+        with deadline_scope(deadline):
+            return await self._enhanced_rag_response(query, mode, current_deadline())
+    
+    async def _enhanced_rag_response(self, query, mode, deadline_at):
+        import time
+        import asyncio
+        from async_clients import async_search_documents
         try:
-            # Step 1: Generate embedding for the query
-            query_embedding = self.embedding_service.generate_embedding(query)
-            if query_embedding is None:
-                return {
-                    "answer": "Sorry, I couldn't process your question at this time.",
-                    "sources": [],
-                    "confidence": 0.0,
-                    "error": "Failed to generate query embedding"
-                }
+            # Cache backends may do disk or network I/O, so keep them off the loop
+            cache_key, cached = await asyncio.to_thread(self.lookup_response, rag_chatbot.response_namespace('enhanced', mode), query, 5, 0.3)
+            if cached is not None:
+                return cached
             
-            # Step 2: Search for similar documents
-            similar_docs = self.db_service.search_similar_documents(
-                query_embedding, 
-                limit=5, 
-                similarity_threshold=0.3
-            )
+            # Step 1: Generate embedding for the query (non-blocking)
+            query_embedding = await self.async_embedding_service.generate_embedding(query, deadline_at=deadline_at)
+            
+            # Step 2: Search for similar documents (asyncpg pool on the shared loop)
+            if query_embedding is None:
+                # HuggingFace down or its breaker open: full-text search alone
+                similar_docs = await asyncio.to_thread(self.lexical_retrieve, query, 5)
+                if not similar_docs:
+                    return {
+                        "answer": "Sorry, I couldn't process your question at this time.",
+                        "sources": [],
+                        "confidence": 0.0,
+                        "error": "Failed to generate query embedding"
+                    }
+            elif self.retriever is not self.db_service:
+                # In-memory index / hybrid fusion use blocking clients, so keep them off the loop
+                similar_docs = await asyncio.to_thread(
+                    self.retriever.search_similar_documents, query_embedding, 5, 0.3, query
+                )
+            else:
+                similar_docs = await async_search_documents(
+                    query_embedding, 
+                    limit=5, 
+                    similarity_threshold=0.3,
+                    deadline_at=deadline_at
+                )
             
             if not similar_docs:
                 return {
@@ -376,8 +243,25 @@ class RAGChatbot:
             # Calculate average confidence
             avg_confidence = sum(doc.get('similarity_score', 0) for doc in similar_docs) / len(similar_docs)
             
-            # Step 4: Generate response
-            response = self.gemini_service.generate_response(query, similar_docs)
+            # Step 4: Generate response (answered without Gemini if it is unavailable or would overrun the deadline)
+            # Sentence lookups hit the database, so keep them off the loop
+            response = await asyncio.to_thread(self.answer_directly, query, query_embedding, similar_docs, mode)
+            if response is None:
+                left = deadline_at - time.monotonic() if deadline_at is not None else None
+                try:
+                    if left is not None and left <= self.generation_budget():
+                        raise asyncio.TimeoutError
+                    # Cancelling the SDK call on timeout closes its connection
+                    response = await asyncio.wait_for(self.gemini_service.generate_response_async(query, similar_docs), timeout=left)
+                except asyncio.TimeoutError:
+                    count_deadline_exceeded('generate')
+                    logger.warning("Enhanced chat answering without Gemini: generation deadline reached")
+                    response = await asyncio.to_thread(self.answer_without_gemini, query_embedding, similar_docs, "deadline")
+                except UpstreamUnavailable as e:
+                    logger.warning(f"Enhanced chat answering without Gemini: {str(e)}")
+                    response = await asyncio.to_thread(self.answer_without_gemini, query_embedding, similar_docs, "gemini_unavailable")
+            if query_embedding is None and not response.get("degraded"):
+                response = dict(response, degraded="lexical_retrieval")
             
             # Add enhanced metadata
             response.update({
@@ -386,6 +270,7 @@ class RAGChatbot:
                 "documents_used": len(similar_docs),
                 "total_documents_searched": len(similar_docs)
             })
+            await asyncio.to_thread(self.store_response, cache_key, response)
             
             return response
             
@@ -398,170 +283,68 @@ class RAGChatbot:
                 "error": str(e)
             }
 
-# Initialize the chatbot
-chatbot = RAGChatbot()
+def _create_chatbot():
+    chatbot = RAGChatbot()
+    chatbot.start_warm_up()
+    return chatbot
 
-class handler(BaseHTTPRequestHandler):
-    """Vercel serverless function handler"""
-    
-    def _set_headers(self, status_code=200):
-        """Set HTTP headers"""
-        self.send_response(status_code)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+# The chatbot is built by the first request that needs it, not at import
+_chatbot = Lazy(_create_chatbot)
+
+def get_chatbot():
+    """Return the process-wide chatbot, building it on first use"""
+    return _chatbot.get()
+
+def __getattr__(name):
+    # Keeps `from api.index import chatbot` working without building it at import
+    if name == 'chatbot':
+        return get_chatbot()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class handler(rag_chatbot.ChatRequestHandler):
+    """Vercel serverless function handler (shared endpoints in rag_chatbot.py)"""
     
-    def do_OPTIONS(self):
-        """Handle preflight requests"""
-        self._set_headers()
+    lazy_chatbot = _chatbot
+    endpoints = dict(rag_chatbot.ChatRequestHandler.endpoints, enhanced_chat="POST /api/enhanced-chat")
     
-    def do_GET(self):
-        """Handle GET requests"""
-        try:
-            if self.path == '/':
-                self._set_headers()
-                response = {
-                    "message": "RAG Chatbot API is running",
-                    "endpoints": {
-                        "chat": "POST /api/chat",
-                        "enhanced_chat": "POST /api/enhanced-chat",
-                        "health": "GET /api/health",
-                        "setup": "POST /api/setup",
-                        "add_document": "POST /api/add-document"
-                    }
-                }
-                self.wfile.write(json.dumps(response).encode())
-            
-            elif self.path == '/api/health':
-                self._set_headers()
-                response = {"status": "healthy", "service": "RAG Chatbot API"}
-                self.wfile.write(json.dumps(response).encode())
-            
-            else:
-                self._set_headers(404)
-                response = {"error": "Endpoint not found"}
-                self.wfile.write(json.dumps(response).encode())
-                
-        except Exception as e:
-            self._set_headers(500)
-            response = {"error": str(e)}
-            self.wfile.write(json.dumps(response).encode())
-    
-    def do_POST(self):
-        """Handle POST requests"""
-        try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            post_data = self.rfile.read(content_length)
-            
-            if self.path.endswith('/chat') or self.path == '/api/chat' or self.path == '/chat':
-                data = json.loads(post_data.decode())
-                # Support both 'query' and 'message' parameters
-                query = data.get('query', data.get('message', '')).strip()
-                
-                if not query:
-                    self._set_headers(400)
-                    response = {"error": "Query or message is required"}
-                    self.wfile.write(json.dumps(response).encode())
-                    return
-                
-                # Process the chat query
-                result = chatbot.chat(query)
-                
-                # Format response for compatibility
-                formatted_result = {
-                    "response": result.get("answer", ""),
-                    "context": result.get("sources", []),
-                    "context_used": result.get("context_used", 0)
-                }
-                
-                self._set_headers()
-                self.wfile.write(json.dumps(formatted_result).encode())
-            
-            elif self.path == '/api/setup':
-                # Setup database
-                success = chatbot.setup()
-                
-                if success:
-                    self._set_headers()
-                    response = {"message": "Database setup completed successfully"}
-                else:
-                    self._set_headers(500)
-                    response = {"error": "Database setup failed"}
-                
-                self.wfile.write(json.dumps(response).encode())
-            
-            elif self.path == '/api/add-document':
-                data = json.loads(post_data.decode())
-                title = data.get('title', '').strip()
-                content = data.get('content', '').strip()
-                metadata = data.get('metadata', {})
-                
-                if not title or not content:
-                    self._set_headers(400)
-                    response = {"error": "Title and content are required"}
-                    self.wfile.write(json.dumps(response).encode())
-                    return
-                
-                success = chatbot.add_document(title, content, metadata)
-                
-                if success:
-                    self._set_headers()
-                    response = {"message": "Document added successfully"}
-                else:
-                    self._set_headers(500)
-                    response = {"error": "Failed to add document"}
-                
-                self.wfile.write(json.dumps(response).encode())
-            
-            elif self.path == '/api/enhanced-chat':
-                data = json.loads(post_data.decode())
-                query = data.get('query', data.get('message', '')).strip()
-                
-                if not query:
-                    self._set_headers(400)
-                    response = {"error": "Query or message is required"}
-                    self.wfile.write(json.dumps(response).encode())
-                    return
-                
-                # Process the enhanced chat query
-                result = asyncio.run(chatbot.get_enhanced_rag_response(query))
-                
-                # Format response for compatibility
-                formatted_result = {
-                    "response": result.get("answer", ""),
-                    "context": result.get("sources", []),
-                    "context_used": result.get("documents_used", 0),
-                    "confidence": result.get("confidence", 0.0),
-                    "metadata": {
-                        "documents_used": result.get("documents_used", 0),
-                        "total_searched": result.get("total_documents_searched", 0),
-                        "sources": result.get("sources", [])
-                    }
-                }
-                
-                self._set_headers()
-                self.wfile.write(json.dumps(formatted_result).encode())
-            
-            else:
-                self._set_headers(404)
-                response = {"error": "Endpoint not found"}
-                self.wfile.write(json.dumps(response).encode())
-                
-        except json.JSONDecodeError:
-            self._set_headers(400)
-            response = {"error": "Invalid JSON in request body"}
-            self.wfile.write(json.dumps(response).encode())
-        except Exception as e:
-            self._set_headers(500)
-            response = {"error": str(e)}
-            self.wfile.write(json.dumps(response).encode())
+    def route_post(self, post_data):
+        """Serve /api/enhanced-chat, then the shared endpoints"""
+        if self.path != '/api/enhanced-chat':
+            return super().route_post(post_data)
+        
+        request = self._read_chat_request(post_data)
+        if request is None:
+            return True
+        query, mode = request
+        
+        from event_loop import run_coroutine
+        # Process the enhanced chat query
+        # Run on the shared long-lived event loop instead of a fresh loop per request
+        result = run_coroutine(get_chatbot().get_enhanced_rag_response(query, deadline=DEADLINE_ENHANCED_CHAT, mode=mode),
+                               timeout=DEADLINE_ENHANCED_CHAT + 1)
+        
+        # Format response for compatibility
+        formatted_result = {
+            "response": result.get("answer", ""),
+            "context": result.get("sources", []),
+            "context_used": result.get("documents_used", 0),
+            "confidence": result.get("confidence", 0.0),
+            "metadata": {
+                "documents_used": result.get("documents_used", 0),
+                "total_searched": result.get("total_documents_searched", 0),
+                "sources": result.get("sources", [])
+            }
+        }
+        if result.get("citations"):
+            # Each citation names its document, since context lists every retrieved source
+            formatted_result["citations"] = result["citations"]
+        if result.get("degraded"):
+            formatted_result["degraded"] = result["degraded"]
+        
+        self._send_json(formatted_result)
+        return True
 
-# For local development
 if __name__ == '__main__':
-    from http.server import HTTPServer
-    port = int(os.getenv('PORT', 8000))
-    server = HTTPServer(('localhost', port), handler)
-    print(f"RAG Chatbot server running on http://localhost:{port}")
-    server.serve_forever()
+    # Thread-pool server with keep-alive (SERVER_WORKERS, SERVER_KEEPALIVE_TIMEOUT, HOST)
+    from http_server import serve
+    serve(handler, port=int(os.getenv('PORT', 8000)))
@@ -0,0 +1,203 @@
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+
+import httpx
+import asyncpg
+
+from embeddings import EmbeddingService
+from database import SIMILARITY_SEARCH_SQL
+from vector_adapter import encode_vector_binary, decode_vector_binary
+from http_client import HTTP_POOL_SIZE, HTTP_MAX_RETRIES, RETRY_STATUS_CODES, backoff_delay
+from metrics import count_retry, count_timeout
+from circuit_breaker import breaker, CircuitOpen
+from deadline import timeout_until, DeadlineExceeded
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Async Postgres pool configuration
+ASYNC_DB_POOL_MIN_SIZE = int(os.getenv('ASYNC_DB_POOL_MIN_SIZE', '1'))
+ASYNC_DB_POOL_MAX_SIZE = int(os.getenv('ASYNC_DB_POOL_MAX_SIZE', '10'))
+
+
+def numbered_placeholders(sql):
+    """Rewrite psycopg2 %s placeholders as asyncpg's $1, $2, ... in order"""
+    count = iter(range(1, sql.count('%s') + 1))
+    return re.sub(r'%s', lambda match: f"${next(count)}", sql)
+
+
+# database.SIMILARITY_SEARCH_SQL, so both clients run the same ordered-index query
+ASYNC_SIMILARITY_SEARCH_SQL = numbered_placeholders(SIMILARITY_SEARCH_SQL)
+
+# httpx clients and asyncpg pools are bound to the loop that created them
+_http_clients = {}
+_db_pools = {}
+_db_pool_locks = {}
+
+
+def get_async_http_client():
+    """Return the keep-alive AsyncClient for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None:
+        limits = httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE)
+        client = httpx.AsyncClient(limits=limits, timeout=30)
+        _http_clients[loop] = client
+    return client
+
+
+def _allows(deadline_at, seconds):
+    """Whether waiting seconds still fits before deadline_at (None: unbounded)"""
+    return deadline_at is None or time.monotonic() + seconds < deadline_at
+
+
+async def apost_with_retry(url, upstream="default", max_retries=HTTP_MAX_RETRIES, timeout=30, deadline_at=None, **kwargs):
+    """Async counterpart of http_client.post_with_retry (same retry and backoff rules).
+
+    Context variables set by the request thread do not reach the event loop,
+    so the request deadline comes in explicitly as deadline_at (absolute
+    time.monotonic()): each attempt's timeout is capped to what is left of it,
+    and a retry whose backoff would overrun it is not made.
+    """
+    client = get_async_http_client()
+    attempt = 0
+    while True:
+        try:
+            response = await client.post(url, timeout=timeout_until(deadline_at, timeout), **kwargs)
+        except (httpx.ConnectError, httpx.RemoteProtocolError) as e:
+            delay = backoff_delay(attempt + 1)
+            if attempt >= max_retries or not _allows(deadline_at, delay):
+                raise
+            attempt += 1
+            count_retry(upstream)
+            logger.warning(f"Connection error to {upstream} ({str(e)}), retry {attempt}/{max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            continue
+        except httpx.TimeoutException as e:
+            count_timeout(upstream)
+            if deadline_at is not None and time.monotonic() >= deadline_at:
+                raise DeadlineExceeded(f"{upstream} did not answer before the request deadline") from e
+            raise
+
+        if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+            return response
+        delay = backoff_delay(attempt + 1, response)
+        if not _allows(deadline_at, delay):
+            return response
+
+        attempt += 1
+        count_retry(upstream)
+        logger.warning(f"{upstream} returned {response.status_code}, retry {attempt}/{max_retries} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+
+class AsyncEmbeddingService:
+    """Non-blocking HuggingFace embedding client sharing config and cache with EmbeddingService"""
+
+    def __init__(self, cache=None):
+        self.service = EmbeddingService()
+        # Optional CachedEmbeddingService; its tiers are in-memory or local SQLite, cheap enough to call inline
+        self.cache = cache
+
+    async def generate_embedding(self, text, deadline_at=None):
+        """Generate embedding for given text, giving up at deadline_at (absolute time.monotonic()) if given"""
+        if self.cache is not None:
+            embedding = self.cache.lookup(text)
+            if embedding is not None:
+                return embedding
+
+        try:
+            payload = {
+                "inputs": text,
+                "options": {"wait_for_model": True}
+            }
+            # Shares the blocking client's breaker, so an outage seen by either path fails fast in both
+            response = await breaker("huggingface").acall(
+                apost_with_retry, self.service.api_url, upstream="huggingface", deadline_at=deadline_at,
+                headers=self.service.headers, json=payload, failed=lambda response: response.status_code in RETRY_STATUS_CODES
+            )
+
+            if response.status_code == 401:
+                logger.error("HuggingFace API authentication failed. Check your token.")
+                return None
+            response.raise_for_status()
+
+            embedding = self.service.parse_embedding(response.json())
+
+        except (CircuitOpen, DeadlineExceeded) as e:
+            logger.warning(f"Skipping embedding: {str(e)}")
+            return None
+        except httpx.TimeoutException:
+            logger.error("HuggingFace API timeout")
+            return None
+        except Exception as e:
+            logger.error(f"Error generating embedding: {str(e)}")
+            return None
+
+        if embedding is not None and self.cache is not None:
+            self.cache.store(text, embedding)
+        return embedding
+
+
+async def _init_connection(conn):
+    """Register codecs so jsonb comes back as dicts and vectors travel in pgvector's binary format"""
+    await conn.set_type_codec('jsonb', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+    await conn.set_type_codec('vector', encoder=encode_vector_binary, decoder=decode_vector_binary, schema='public', format='binary')
+
+
+async def get_async_db_pool():
+    """Return the asyncpg pool for the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    pool = _db_pools.get(loop)
+    if pool is not None:
+        return pool
+
+    lock = _db_pool_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        pool = _db_pools.get(loop)
+        if pool is None:
+            db_url = os.getenv('DATABASE_URL')
+            if not db_url:
+                raise RuntimeError("DATABASE_URL environment variable not set")
+            pool = await asyncpg.create_pool(
+                db_url,
+                min_size=ASYNC_DB_POOL_MIN_SIZE,
+                max_size=ASYNC_DB_POOL_MAX_SIZE,
+                init=_init_connection
+            )
+            _db_pools[loop] = pool
+    return pool
+
+
+async def async_search_documents(query_embedding, limit=3, similarity_threshold=0.7, deadline_at=None):
+    """Search for similar documents using cosine similarity without blocking the loop, giving up at deadline_at if given"""
+    try:
+        pool = await get_async_db_pool()
+        # Both the pool checkout and the query stop at the deadline
+        async with pool.acquire(timeout=timeout_until(deadline_at)) as conn:
+            # $1 (the query vector) is sent once, in binary
+            rows = await conn.fetch(ASYNC_SIMILARITY_SEARCH_SQL, query_embedding, limit, similarity_threshold,
+                                    timeout=timeout_until(deadline_at))
+        return [dict(row) for row in rows]
+
+    except (DeadlineExceeded, asyncio.TimeoutError) as e:
+        logger.error(f"Document search (async) stopped at the request deadline: {str(e)}")
+        return []
+    except Exception as e:
+        logger.error(f"Error searching documents (async): {str(e)}")
+        return []
+
+
+async def close_async_clients():
+    """Close the HTTP client and DB pool owned by the running loop"""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+    pool = _db_pools.pop(loop, None)
+    if pool is not None:
+        await pool.close()
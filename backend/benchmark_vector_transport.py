@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark vector transport: stringified floats vs the NumPy/pgvector adapters.
+
+Client-side serialization always runs. Set DATABASE_URL to also measure the
+search statement round-trip and bulk insert against Postgres (uses a TEMP table).
+"""
+
+import os
+import sys
+import time
+import json
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from vector_adapter import Vector, to_vector_text, encode_vector_binary, copy_documents_binary, as_vector
+from database import DatabaseService
+
+load_dotenv()
+
+DIM = 1024
+ITERATIONS = 500
+BULK_ROWS = 1000
+
+def timed(func, iterations=ITERATIONS):
+    """Return mean microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def legacy_text(embedding):
+    """The f-string serialization previously used for every statement"""
+    return f"[{','.join(map(str, embedding))}]"
+
+def benchmark_serialization():
+    print("\n🔢 Client-side serialization (1024 dims)")
+    print("-" * 50)
+    embedding = np.random.randn(DIM).astype(np.float32).tolist()  # what the HF API path hands us
+    vector = as_vector(embedding)
+
+    legacy = legacy_text(embedding)
+    compact = to_vector_text(vector)
+    binary = encode_vector_binary(vector)
+
+    print(f"Legacy text   : {len(legacy):6d} bytes x3 per search = {3 * len(legacy):6d} bytes, {timed(lambda: legacy_text(embedding)):8.1f} µs")
+    print(f"Adapter text  : {len(compact):6d} bytes x1 per search = {len(compact):6d} bytes, {timed(lambda: to_vector_text(vector)):8.1f} µs")
+    print(f"Binary (COPY/asyncpg): {len(binary):6d} bytes, {timed(lambda: encode_vector_binary(vector)):8.1f} µs")
+
+def benchmark_database():
+    db_service = DatabaseService()
+    if not db_service.db_url:
+        print("\n⚠️  DATABASE_URL not set - skipping Postgres benchmarks")
+        return
+
+    conn = db_service.get_connection()
+    if not conn:
+        print("\n❌ Could not connect to the database")
+        return
+    cursor = conn.cursor()
+
+    print("\n🔍 Search statement round-trip (parse + distance, no table scan)")
+    print("-" * 50)
+    embedding = np.random.randn(DIM).astype(np.float32).tolist()
+    legacy = legacy_text(embedding)
+    vector = as_vector(embedding)
+
+    def legacy_query():
+        cursor.execute("SELECT %s::vector <=> %s::vector, %s::vector IS NULL;", (legacy, legacy, legacy))
+        cursor.fetchone()
+
+    def adapter_query():
+        cursor.execute("SELECT q.v <=> q.v, q.v IS NULL FROM (SELECT %s AS v) q;", (Vector(vector),))
+        cursor.fetchone()
+
+    legacy_us = timed(legacy_query, 100)
+    adapter_us = timed(adapter_query, 100)
+    print(f"Legacy (3 text copies): {legacy_us / 1000:8.2f} ms")
+    print(f"Adapter (1 copy)      : {adapter_us / 1000:8.2f} ms  ({legacy_us / adapter_us:.1f}x)")
+
+    print(f"\n📦 Bulk insert of {BULK_ROWS} rows")
+    print("-" * 50)
+    cursor.execute("""
+        CREATE TEMP TABLE bench_documents (
+            id SERIAL PRIMARY KEY,
+            title VARCHAR(255) NOT NULL,
+            content TEXT NOT NULL,
+            embedding vector(1024),
+            metadata JSONB DEFAULT '{}'
+        );
+    """)
+    rows = [
+        (f"Doc {i}", "content " * 50, np.random.randn(DIM).astype(np.float32), {"i": i})
+        for i in range(BULK_ROWS)
+    ]
+
+    start = time.perf_counter()
+    cursor.executemany(
+        "INSERT INTO bench_documents (title, content, embedding, metadata) VALUES (%s, %s, %s, %s)",
+        [(t, c, legacy_text(e.tolist()), json.dumps(m)) for t, c, e, m in rows]
+    )
+    legacy_s = time.perf_counter() - start
+    cursor.execute("TRUNCATE bench_documents;")
+
+    start = time.perf_counter()
+    copy_documents_binary(cursor, rows, table='bench_documents')
+    copy_s = time.perf_counter() - start
+
+    print(f"executemany + text : {legacy_s:8.2f} s ({BULK_ROWS / legacy_s:8.0f} rows/s)")
+    print(f"COPY FORMAT BINARY : {copy_s:8.2f} s ({BULK_ROWS / copy_s:8.0f} rows/s)  ({legacy_s / copy_s:.1f}x)")
+
+    conn.rollback()
+    cursor.close()
+    conn.close()
+
+def main():
+    print("🚀 Vector Transport Benchmark")
+    print("=" * 50)
+    benchmark_serialization()
+    benchmark_database()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import hmac
+import hashlib
+import logging
+
+from chunking import split_passages, split_sentences, passage_embedding_text
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bulk ingestion configuration
+BULK_INGEST_MAX_DOCUMENTS = int(os.getenv('BULK_INGEST_MAX_DOCUMENTS', '10000'))  # per request / file set
+BULK_INGEST_BATCH_SIZE = int(os.getenv('BULK_INGEST_BATCH_SIZE', '64'))  # texts per embedding request
+# Bearer token for POST /api/add-documents?replace=true; unset, a full replace is CLI-only (ingest_jsonl.py --replace)
+BULK_INGEST_ADMIN_TOKEN = os.getenv('BULK_INGEST_ADMIN_TOKEN', '').strip()
+
+
+def replace_authorized(authorization, admin_token=BULK_INGEST_ADMIN_TOKEN):
+    """Whether an Authorization header may replace the knowledge base over HTTP (never without a configured token)"""
+    if not admin_token or not authorization:
+        return False
+    scheme, _, token = authorization.partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), admin_token.encode())
+
+
+def parse_documents(lines):
+    """Parse NDJSON lines into ([{title, content, metadata}], [{line, error}])"""
+    documents = []
+    errors = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            errors.append({"line": number, "error": f"Invalid JSON: {str(e)}"})
+            continue
+        if not isinstance(data, dict):
+            errors.append({"line": number, "error": "Expected a JSON object"})
+            continue
+        title = str(data.get('title', '')).strip()
+        content = str(data.get('content', '')).strip()
+        if not title or not content:
+            errors.append({"line": number, "error": "Title and content are required"})
+            continue
+        documents.append({"title": title, "content": content, "metadata": data.get('metadata') or {}})
+    return documents, errors
+
+
+def content_hash(content):
+    """md5 of the content, matching the generated documents.content_hash column"""
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+class BulkIngestor:
+    """Upsert many documents with batched embeddings in one transaction.
+
+    Documents are matched to stored rows by title. Rows whose content hash is
+    unchanged skip embedding entirely, changed rows are re-embedded, and
+    identical content (within the batch or already stored under any title)
+    shares one embedding. Texts that still need embedding go out through
+    generate_embeddings, one HTTP call per batch, and the result is written by
+    a single DatabaseService.bulk_sync_documents call.
+    """
+
+    def __init__(self, db_service, embedding_service, with_passages=True, batch_size=BULK_INGEST_BATCH_SIZE, with_sentences=False):
+        self.db_service = db_service
+        self.embedding_service = embedding_service
+        self.with_passages = with_passages
+        self.with_sentences = with_sentences
+        self.batch_size = batch_size
+
+    def _embed_unique(self, texts, known=None):
+        """Embed texts, sending each distinct text once; returns (vectors, texts embedded) or (None, 0)"""
+        known = dict(known or {})
+        missing = list(dict.fromkeys(text for text in texts if text not in known))
+        if missing:
+            vectors = self.embedding_service.generate_embeddings(missing, batch_size=self.batch_size)
+            if vectors is None:
+                return None, 0
+            known.update(zip(missing, vectors))
+        return [known[text] for text in texts], len(missing)
+
+    def _embed_chunks(self, documents, split):
+        """Split each document and embed the pieces; returns (one [(text, embedding)] list per document, texts embedded) or (None, 0)"""
+        chunks = [split(doc['content']) for doc in documents]
+        texts = [passage_embedding_text(doc['title'], c) for doc, doc_chunks in zip(documents, chunks) for c in doc_chunks]
+        embeddings, embedded = self._embed_unique(texts)
+        if embeddings is None:
+            return None, 0
+        result, offset = [], 0
+        for doc_chunks in chunks:
+            result.append(list(zip(doc_chunks, embeddings[offset:offset + len(doc_chunks)])))
+            offset += len(doc_chunks)
+        return result, embedded
+
+    def ingest(self, documents, replace=False):
+        """Upsert [{title, content, metadata}] and return a throughput report.
+
+        With replace=True, stored documents missing from the batch are deleted
+        in the same transaction.
+        """
+        start = time.perf_counter()
+        report = {"received": len(documents), "unchanged": 0, "inserted": 0, "updated": 0,
+                  "metadata_updated": 0, "deleted": 0, "passages": 0, "sentences": 0, "embedded": 0, "reused": 0}
+
+        # Last occurrence of a title wins
+        documents = list({doc['title']: doc for doc in documents}.values())
+        existing = self.db_service.existing_documents([doc['title'] for doc in documents])
+        if existing is None:
+            report["error"] = "Failed to read existing documents"
+            return report
+
+        inserts, updates, metadata_updates, keep_ids = [], [], [], []
+        for doc in documents:
+            doc['content_hash'] = content_hash(doc['content'])
+            row = existing.get(doc['title'])
+            if row is None:
+                inserts.append(doc)
+                continue
+            keep_ids.append(row['id'])
+            if row['content_hash'] != doc['content_hash']:
+                updates.append((row['id'], doc))
+            elif (row['metadata'] or {}) != doc['metadata']:
+                metadata_updates.append((row['id'], doc['metadata']))
+            else:
+                report["unchanged"] += 1
+        changed = inserts + [doc for _, doc in updates]
+
+        # Identical content already stored under any title reuses its embedding
+        stored = self.db_service.embeddings_for_hashes({doc['content_hash'] for doc in changed}) if changed else {}
+        stored_by_content = {doc['content']: stored[doc['content_hash']] for doc in changed if doc['content_hash'] in stored}
+        embeddings, embedded = self._embed_unique([doc['content'] for doc in changed], known=stored_by_content)
+        if embeddings is None:
+            report["error"] = "Failed to generate document embeddings"
+            return report
+        report["embedded"] = embedded
+        report["reused"] = len(changed) - embedded
+
+        passages = None
+        if self.with_passages:
+            passages, passages_embedded = self._embed_chunks(changed, split_passages)
+            if passages is None:
+                report["error"] = "Failed to generate passage embeddings"
+                return report
+            report["embedded"] += passages_embedded
+        sentences = None
+        if self.with_sentences:
+            sentences, sentences_embedded = self._embed_chunks(changed, split_sentences)
+            if sentences is None:
+                report["error"] = "Failed to generate sentence embeddings"
+                return report
+            report["embedded"] += sentences_embedded
+        embedded_at = time.perf_counter()
+
+        result = self.db_service.bulk_sync_documents(
+            [(doc['title'], doc['content'], embedding, doc['metadata']) for doc, embedding in zip(inserts, embeddings)],
+            updates=[(document_id, doc['content'], embedding, doc['metadata'])
+                     for (document_id, doc), embedding in zip(updates, embeddings[len(inserts):])],
+            metadata_updates=metadata_updates,
+            passages=passages,
+            keep_ids=keep_ids if replace else None,
+            sentences=sentences
+        )
+        loaded = time.perf_counter()
+        if result is None:
+            report["error"] = "Failed to load documents"
+        else:
+            report.update(result)
+
+        elapsed = loaded - start
+        report.update({
+            "embed_seconds": round(embedded_at - start, 3),
+            "load_seconds": round(loaded - embedded_at, 3),
+            "elapsed_seconds": round(elapsed, 3),
+            "documents_per_second": round(len(documents) / elapsed, 1) if elapsed else None
+        })
+        logger.info(
+            f"Bulk ingest: {report['inserted']} inserted, {report['updated']} updated, "
+            f"{report['unchanged']} unchanged, {report['deleted']} deleted, {report['embedded']} texts embedded in {elapsed:.2f}s"
+        )
+        report["changed"] = bool(report["inserted"] or report["updated"] or report["metadata_updated"] or report["deleted"])
+        return report
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Backfill passage and sentence embeddings for documents that have not been chunked yet.
+
+Splits each document by its heading/bullet structure (chunking.split_passages),
+embeds the passages in batches and stores them in document_passages. With
+EXTRACTIVE_ENABLED, also splits documents into sentences
+(chunking.split_sentences) for extractive answers and stores them in
+document_sentences. Run after setup_database() has created the tables; safe
+to re-run.
+"""
+
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+# Load environment variables before shared modules read their configuration
+load_dotenv()
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import DatabaseService
+from embeddings import EmbeddingService
+from chunking import index_document_passages, index_document_sentences, split_sentences
+from extractive import EXTRACTIVE_ENABLED
+
+def main():
+    db_service = DatabaseService()
+    if not db_service.db_url:
+        print("❌ DATABASE_URL not set")
+        return False
+
+    if not db_service.setup_database():
+        print("❌ Database setup failed")
+        return False
+
+    documents = db_service.documents_without_passages()
+
+    print(f"✂️  Chunking {len(documents)} documents...")
+    embedding_service = EmbeddingService()
+    start = time.perf_counter()
+    total_passages = 0
+    failed = 0
+
+    for document_id, title, content in documents:
+        count = index_document_passages(db_service, embedding_service, document_id, title, content)
+        if count:
+            total_passages += count
+            print(f"✅ {title[:60]}: {count} passages")
+        else:
+            failed += 1
+            print(f"❌ {title[:60]}: failed")
+
+    elapsed = time.perf_counter() - start
+    print(f"\n📊 {total_passages} passages from {len(documents) - failed} documents in {elapsed:.1f}s ({failed} failed)")
+    if not EXTRACTIVE_ENABLED:
+        return failed == 0
+
+    # Documents too short to hold a quotable sentence are listed again on every run
+    documents = [row for row in db_service.documents_without_sentences() if split_sentences(row[2])]
+
+    print(f"\n✂️  Splitting {len(documents)} documents into sentences...")
+    start = time.perf_counter()
+    total_sentences = 0
+    failed_sentences = 0
+
+    for document_id, title, content in documents:
+        count = index_document_sentences(db_service, embedding_service, document_id, title, content)
+        if count:
+            total_sentences += count
+            print(f"✅ {title[:60]}: {count} sentences")
+        else:
+            failed_sentences += 1
+            print(f"❌ {title[:60]}: failed")
+
+    elapsed = time.perf_counter() - start
+    print(f"\n📊 {total_sentences} sentences from {len(documents) - failed_sentences} documents in {elapsed:.1f}s ({failed_sentences} failed)")
+    return failed == 0 and failed_sentences == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
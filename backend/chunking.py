@@ -0,0 +1,122 @@
+import os
+import re
+import logging
+
+from context_packer import estimate_tokens
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Chunking configuration
+PASSAGE_MAX_TOKENS = int(os.getenv('PASSAGE_MAX_TOKENS', '180'))  # target passage size (estimated tokens)
+PASSAGE_MIN_TOKENS = int(os.getenv('PASSAGE_MIN_TOKENS', '40'))  # smaller sections merge into the next one
+PASSAGE_OVERLAP_BLOCKS = int(os.getenv('PASSAGE_OVERLAP_BLOCKS', '1'))  # trailing blocks repeated in the next passage
+
+SENTENCE_MIN_CHARS = int(os.getenv('SENTENCE_MIN_CHARS', '20'))  # shorter fragments are not worth quoting
+
+# "POMEGRANATE FERTILIZER APPLICATION", "Application for Mature Trees:", "## Dosage"
+_HEADING = re.compile(r'^(#{1,6}\s+\S.*|[A-Z0-9][A-Z0-9 &/,()\-]{3,}:?|[^.!?]{1,80}:)$')
+_BULLET = re.compile(r'^([•\-\*▪►✓]|\d+[.)])\s+')
+# Sentence end: punctuation, whitespace, then a capital ("e.g. the", "19.5 kg" stay joined)
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z"(])')
+
+
+def _blocks(content):
+    """Split content into (heading, text) blocks: one per bullet, paragraph or heading line"""
+    blocks = []
+    heading = None
+    paragraph = []
+
+    def flush():
+        if paragraph:
+            blocks.append((heading, " ".join(paragraph)))
+            paragraph.clear()
+
+    for raw in content.splitlines():
+        line = raw.strip()
+        if not line:
+            flush()
+        elif _HEADING.match(line) and not _BULLET.match(line):
+            flush()
+            heading = line
+            blocks.append((heading, line))
+        elif _BULLET.match(line):
+            flush()
+            blocks.append((heading, line))
+        else:
+            paragraph.append(line)
+    flush()
+    return blocks
+
+
+def split_passages(content, max_tokens=PASSAGE_MAX_TOKENS, min_tokens=PASSAGE_MIN_TOKENS,
+                   overlap_blocks=PASSAGE_OVERLAP_BLOCKS):
+    """Split a document into overlapping passages along its heading/bullet structure"""
+    if estimate_tokens(content) <= max_tokens:
+        return [content.strip()]
+
+    passages = []
+    current, current_tokens, current_heading = [], 0, None
+
+    def emit():
+        if current:
+            passages.append("\n".join(current))
+
+    for heading, text in _blocks(content):
+        tokens = estimate_tokens(text)
+        new_section = heading != current_heading and text == heading
+        if current and ((new_section and current_tokens >= min_tokens) or current_tokens + tokens > max_tokens):
+            emit()
+            # Carry the section heading and the last block(s) so no passage starts mid-thought
+            carried = [] if new_section else current[-overlap_blocks:] if overlap_blocks else []
+            if not new_section and heading and heading not in carried:
+                carried = [heading] + carried
+            current = list(carried)
+            current_tokens = sum(estimate_tokens(t) for t in current)
+        current.append(text)
+        current_tokens += tokens
+        current_heading = heading
+    emit()
+    return passages
+
+
+def split_sentences(content, min_chars=SENTENCE_MIN_CHARS):
+    """Split a document into quotable sentences: one per bullet, paragraphs split at sentence ends (headings skipped)"""
+    sentences = []
+    for heading, text in _blocks(content):
+        if text == heading:
+            continue
+        parts = [text] if _BULLET.match(text) else _SENTENCE_END.split(text)
+        for part in parts:
+            part = _BULLET.sub('', part).strip()
+            if len(part) >= min_chars:
+                sentences.append(part)
+    return sentences
+
+
+def passage_embedding_text(title, passage):
+    """Text embedded for a passage: the parent title gives short passages their topic"""
+    return f"{title}\n{passage}"
+
+
+def index_document_sentences(db_service, embedding_service, document_id, title, content):
+    """Split a stored document into sentences, embed them in one batch and store them; returns the sentence count"""
+    sentences = split_sentences(content)
+    if not sentences:
+        return 0
+    # Same title prefix as passages: a bare "Apply 2 kg per tree." says nothing about which crop
+    embeddings = embedding_service.generate_embeddings([passage_embedding_text(title, s) for s in sentences])
+    if embeddings is None:
+        logger.error(f"Failed to embed sentences for document {document_id}")
+        return 0
+    return db_service.insert_sentences(document_id, sentences, embeddings)
+
+
+def index_document_passages(db_service, embedding_service, document_id, title, content):
+    """Chunk a stored document, embed its passages in one batch and store them; returns the passage count"""
+    passages = split_passages(content)
+    embeddings = embedding_service.generate_embeddings([passage_embedding_text(title, p) for p in passages])
+    if embeddings is None:
+        logger.error(f"Failed to embed passages for document {document_id}")
+        return 0
+    return db_service.insert_passages(document_id, passages, embeddings)
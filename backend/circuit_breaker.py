@@ -0,0 +1,218 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+from deadline import DeadlineExceeded
+from metrics import count_breaker_transition, count_breaker_rejection
+
+# Stdlib only: the entry points import this at module load (see test_import_time.py)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Circuit breaker configuration (shared by every upstream)
+BREAKER_ENABLED = os.getenv('BREAKER_ENABLED', 'true').strip().lower() in ('1', 'true', 'yes')
+BREAKER_WINDOW = int(os.getenv('BREAKER_WINDOW', '20'))  # recent calls judged per upstream
+BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', '10'))  # never trip on fewer calls than this
+BREAKER_FAILURE_RATE = float(os.getenv('BREAKER_FAILURE_RATE', '0.5'))  # open at this share of failed calls...
+BREAKER_SLOW_CALL_RATE = float(os.getenv('BREAKER_SLOW_CALL_RATE', '0.5'))  # ...or of calls slower than the upstream's limit
+BREAKER_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', '30'))  # fail fast this long before probing again
+BREAKER_HALF_OPEN_PROBES = int(os.getenv('BREAKER_HALF_OPEN_PROBES', '2'))  # successful probes needed to close
+
+# Per-upstream slow-call limits (seconds, the whole call including retries)
+BREAKER_SLOW_CALL_SECONDS = {
+    'huggingface': float(os.getenv('BREAKER_HF_SLOW_CALL_SECONDS', '5')),
+    'gemini': float(os.getenv('BREAKER_GEMINI_SLOW_CALL_SECONDS', '20')),
+}
+BREAKER_DEFAULT_SLOW_CALL_SECONDS = 10.0
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class UpstreamUnavailable(Exception):
+    """An upstream call failed; callers answer without it"""
+
+
+class CircuitOpen(UpstreamUnavailable):
+    """The upstream's breaker is open, so the call was not made"""
+
+
+class CircuitBreaker:
+    """Fails fast on an upstream that is erroring or too slow.
+
+    Closed, every call goes through and its outcome (failed, slow) joins a
+    window of the last BREAKER_WINDOW calls. Once the window holds at least
+    BREAKER_MIN_CALLS calls and the failure or slow-call share reaches its
+    threshold the breaker opens: calls raise CircuitOpen immediately instead
+    of waiting out timeouts. After BREAKER_OPEN_SECONDS it turns half-open and
+    lets BREAKER_HALF_OPEN_PROBES calls through; if they all succeed in time it
+    closes, and any failed or slow probe opens it again.
+
+    A call cut short by the request deadline says nothing about the upstream
+    unless it was already slow, so it is not counted either way.
+    """
+
+    def __init__(self, name, slow_call_seconds=None, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 failure_rate=BREAKER_FAILURE_RATE, slow_call_rate=BREAKER_SLOW_CALL_RATE,
+                 open_seconds=BREAKER_OPEN_SECONDS, half_open_probes=BREAKER_HALF_OPEN_PROBES):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds or BREAKER_SLOW_CALL_SECONDS.get(name, BREAKER_DEFAULT_SLOW_CALL_SECONDS)
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)  # (failed, slow) per call
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _transition(self, state):
+        """Move to state (caller holds self._lock)"""
+        self._state = state
+        self._outcomes.clear()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+        count_breaker_transition(self.name, state)
+        logger.warning(f"Circuit breaker for {self.name} is now {state}")
+
+    def _refresh(self):
+        """Open turns half-open once the cool-down has passed (caller holds self._lock)"""
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _acquire(self):
+        """Admit a call, returning whether it is a half-open probe; raises CircuitOpen otherwise"""
+        if not BREAKER_ENABLED:
+            return False
+        with self._lock:
+            self._refresh()
+            if self._state == CLOSED:
+                return False
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self.rejected += 1
+            state = self._state
+        count_breaker_rejection(self.name)
+        raise CircuitOpen(f"{self.name} circuit breaker is {state}")
+
+    def _finish(self, probe, seconds, failed=False, error=None):
+        """Record how an admitted call ended"""
+        if not BREAKER_ENABLED:
+            return
+        slow = seconds >= self.slow_call_seconds
+        if error is not None:
+            # Cancelled, or stopped by our own deadline: only a verdict if it was slow already
+            no_verdict = isinstance(error, DeadlineExceeded) or not isinstance(error, Exception)
+            if no_verdict and not slow:
+                if probe:
+                    with self._lock:
+                        if self._state == HALF_OPEN:
+                            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                return
+            failed = True
+
+        with self._lock:
+            if probe:
+                if self._state != HALF_OPEN:
+                    return
+                if failed or slow:
+                    self._transition(OPEN)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._transition(CLOSED)
+                return
+            if self._state != CLOSED:
+                # Started before the breaker opened; the window that tripped it already judged the upstream
+                return
+            self._outcomes.append((failed, slow))
+            if len(self._outcomes) < self.min_calls:
+                return
+            failures = sum(1 for f, _ in self._outcomes if f) / len(self._outcomes)
+            slow_calls = sum(1 for _, s in self._outcomes if s) / len(self._outcomes)
+            if failures >= self.failure_rate or slow_calls >= self.slow_call_rate:
+                logger.error(f"{self.name}: {failures:.0%} failed, {slow_calls:.0%} slow over the last {len(self._outcomes)} calls")
+                self._transition(OPEN)
+
+    def call(self, fn, *args, failed=None, **kwargs):
+        """Run fn(*args, **kwargs) through the breaker; failed(result) marks a returned result as a failure"""
+        probe = self._acquire()
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(probe, time.perf_counter() - start, error=e)
+            raise
+        self._finish(probe, time.perf_counter() - start, failed=bool(failed is not None and failed(result)))
+        return result
+
+    async def acall(self, fn, *args, failed=None, **kwargs):
+        """Async counterpart of call for coroutine functions"""
+        probe = self._acquire()
+        start = time.perf_counter()
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(probe, time.perf_counter() - start, error=e)
+            raise
+        self._finish(probe, time.perf_counter() - start, failed=bool(failed is not None and failed(result)))
+        return result
+
+    def record_failure(self):
+        """Count a failure noticed after call returned (e.g. a stream that stalls mid-body)"""
+        self._finish(False, 0.0, failed=True)
+
+    def stats(self):
+        """Return the breaker state and the window it is judged on"""
+        with self._lock:
+            self._refresh()
+            calls = len(self._outcomes)
+            stats = {
+                "state": self._state,
+                "calls": calls,
+                "failure_rate": sum(1 for f, _ in self._outcomes if f) / calls if calls else 0.0,
+                "slow_call_rate": sum(1 for _, s in self._outcomes if s) / calls if calls else 0.0,
+                "slow_call_seconds": self.slow_call_seconds,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected
+            }
+            if self._state == OPEN:
+                stats["retry_in_seconds"] = round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+        return stats
+
+
+def breaker(name):
+    """Return the process-wide breaker for an upstream"""
+    if name not in _breakers:
+        with _breakers_lock:
+            _breakers.setdefault(name, CircuitBreaker(name))
+    return _breakers[name]
+
+
+def breaker_stats():
+    """{upstream: stats} for every configured or used breaker"""
+    return {name: breaker(name).stats() for name in sorted(set(BREAKER_SLOW_CALL_SECONDS) | set(_breakers))}
+
+
+def all_closed():
+    return all(breaker(name).state == CLOSED for name in set(BREAKER_SLOW_CALL_SECONDS) | set(_breakers))
@@ -6,6 +6,8 @@ import logging
 # Load environment variables
 load_dotenv()
 
+from database import install_kb_version_tracking, bump_kb_version
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -56,7 +58,8 @@ def reset_database_completely():
         
         print("🔥 Completely resetting database schema...")
         
-        # Drop the documents table completely
+        # Drop the documents table (and its passages) completely
+        cursor.execute("DROP TABLE IF EXISTS document_passages;")
         cursor.execute("DROP TABLE IF EXISTS documents CASCADE;")
         
         # Drop the index if it exists
@@ -81,6 +84,10 @@ def reset_database_completely():
             WITH (m = 16, ef_construction = 64);
         """)
         
+        # The trigger went with the old table: reinstall it and invalidate cached answers
+        install_kb_version_tracking(cursor)
+        bump_kb_version(cursor)
+        
         # Commit the changes
         conn.commit()
         cursor.close()
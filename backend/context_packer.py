@@ -0,0 +1,163 @@
+import os
+import re
+import math
+import threading
+import logging
+from collections import OrderedDict
+
+from semantic_cache import document_fingerprint
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Context packing configuration
+CONTEXT_PACKING_ENABLED = os.getenv('CONTEXT_PACKING_ENABLED', 'true').strip().lower() in ('1', 'true', 'yes')
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '2000'))  # estimated tokens for all documents together
+CONTEXT_DOC_TOKEN_CAP = int(os.getenv('CONTEXT_DOC_TOKEN_CAP', '800'))  # so one long guide can't crowd out the rest
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv('CONTEXT_DEDUP_THRESHOLD', '0.85'))  # word-set Jaccard for near-duplicates
+CONTEXT_ROW_CACHE_SIZE = int(os.getenv('CONTEXT_ROW_CACHE_SIZE', '4096'))
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_STOPWORDS = frozenset("""
+    a an and are as at be by can do does for from how i in is it of on or per should the this to
+    what when where which who why will with my me you your it's its about use used using
+""".split())
+
+
+def estimate_tokens(text):
+    """Rough token count for English text (Gemini averages ~4 characters per token)"""
+    return max(1, math.ceil(max(len(text) / 4, len(text.split()) * 1.3)))
+
+
+def _terms(text):
+    return {word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS and len(word) > 1}
+
+
+class _Sentence:
+    __slots__ = ('text', 'tokens', 'terms')
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.terms = _terms(text)
+
+
+class ContextPacker:
+    """Fits retrieved documents into a token budget for the Gemini prompt.
+
+    Documents are taken in retrieval (relevance) order. A document that fits
+    goes in whole; one that overflows is cut down to its most query-relevant
+    sentences, kept in their original order. Sentences that near-duplicate
+    something already packed are dropped. Per-row sentence splits and token
+    estimates are cached by content fingerprint.
+    """
+
+    def __init__(self, budget=CONTEXT_TOKEN_BUDGET, doc_cap=CONTEXT_DOC_TOKEN_CAP,
+                 dedup_threshold=CONTEXT_DEDUP_THRESHOLD, cache_size=CONTEXT_ROW_CACHE_SIZE):
+        self.budget = budget
+        self.doc_cap = doc_cap
+        self.dedup_threshold = dedup_threshold
+        self.cache_size = cache_size
+        self._rows = OrderedDict()  # (id, fingerprint) -> list of _Sentence
+        self._lock = threading.Lock()
+        # Metrics
+        self.packed = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    def _sentences(self, doc):
+        key = (doc.get('id'), document_fingerprint(doc['title'], doc['content']))
+        with self._lock:
+            sentences = self._rows.get(key)
+            if sentences is not None:
+                self._rows.move_to_end(key)
+                return sentences
+        parts = [part.strip() for part in _SENTENCE_SPLIT.split(doc['content'])]
+        sentences = [_Sentence(part) for part in parts if part]
+        with self._lock:
+            self._rows[key] = sentences
+            while len(self._rows) > self.cache_size:
+                self._rows.popitem(last=False)
+        return sentences
+
+    def _is_duplicate(self, sentence, kept_terms):
+        if len(sentence.terms) < 3:
+            return False  # short lines (headings, units) repeat legitimately
+        for terms in kept_terms:
+            union = len(sentence.terms | terms)
+            if union and len(sentence.terms & terms) / union >= self.dedup_threshold:
+                return True
+        return False
+
+    def _rank(self, query_terms, sentences):
+        """Order sentence indexes by IDF-weighted query-term overlap, earlier sentences first on ties"""
+        n = len(sentences)
+        df = {}
+        for sentence in sentences:
+            for term in sentence.terms & query_terms:
+                df[term] = df.get(term, 0) + 1
+        idf = {term: math.log(1 + n / count) for term, count in df.items()}
+
+        def score(i):
+            sentence = sentences[i]
+            overlap = sum(idf[term] for term in sentence.terms & query_terms)
+            # The opening line is the FAQ question or the guide's heading
+            return (overlap + (0.5 if i == 0 else 0.0), -i)
+
+        return sorted(range(n), key=score, reverse=True)
+
+    def pack(self, query, context_documents):
+        """Return copies of context_documents trimmed to fit the token budget"""
+        query_terms = _terms(query)
+        remaining = self.budget
+        kept_terms = []
+        packed = []
+        tokens_in = 0
+
+        for doc in context_documents:
+            sentences = self._sentences(doc)
+            doc_tokens = sum(s.tokens for s in sentences)
+            tokens_in += doc_tokens
+            if remaining <= 0:
+                continue
+
+            candidates = [s for s in sentences if not self._is_duplicate(s, kept_terms)]
+            allowance = min(remaining, self.doc_cap)
+            if sum(s.tokens for s in candidates) > allowance:
+                chosen, used = [], 0
+                for i in self._rank(query_terms, candidates):
+                    if used + candidates[i].tokens <= allowance:
+                        chosen.append(i)
+                        used += candidates[i].tokens
+                candidates = [candidates[i] for i in sorted(chosen)]
+            if not candidates:
+                continue
+
+            used = sum(s.tokens for s in candidates)
+            remaining -= used
+            kept_terms.extend(s.terms for s in candidates if len(s.terms) >= 3)
+            packed_doc = dict(doc)
+            if len(candidates) < len(sentences):
+                packed_doc['content'] = "\n".join(s.text for s in candidates)
+            packed_doc['trimmed'] = used < doc_tokens
+            packed.append(packed_doc)
+
+        tokens_out = self.budget - remaining
+        with self._lock:
+            self.packed += 1
+            self.tokens_in += tokens_in
+            self.tokens_out += tokens_out
+        logger.info(f"Packed context: {len(packed)}/{len(context_documents)} docs, ~{tokens_out}/{tokens_in} tokens")
+        return packed
+
+    def stats(self):
+        """Return packing totals"""
+        with self._lock:
+            return {
+                "prompts": self.packed,
+                "budget": self.budget,
+                "avg_tokens_in": self.tokens_in / self.packed if self.packed else 0.0,
+                "avg_tokens_out": self.tokens_out / self.packed if self.packed else 0.0,
+                "cached_rows": len(self._rows)
+            }
@@ -0,0 +1,695 @@
+import os
+import json
+import time
+import logging
+
+import psycopg2
+import psycopg2.errors
+from psycopg2.extras import RealDictCursor, execute_values
+
+from vector_adapter import Vector, as_vector, register_vector, copy_documents_binary
+from db_pool import get_pool
+from metrics import timed
+from deadline import stage_timeout
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Nearest-neighbour search shaped so pgvector can serve it from the ANN index:
+# the inner query is a plain ORDER BY distance LIMIT k (index scan, distance
+# computed once per row), and the similarity threshold is applied afterwards
+# to those k rows only. A WHERE on the distance inside the scan would make the
+# planner filter every candidate and can push it to a sequential scan.
+SIMILARITY_SEARCH_SQL = """
+    SELECT id, title, content, metadata, 1 - distance AS similarity_score
+    FROM (
+        SELECT id, title, content, metadata, embedding <=> %s AS distance
+        FROM documents
+        ORDER BY distance
+        LIMIT %s
+    ) nearest
+    WHERE 1 - distance >= %s
+    ORDER BY distance;
+"""
+
+# Full-text search over the generated search_vector column. plainto_tsquery
+# ANDs the terms, which almost never matches a whole natural-language question,
+# so the terms are OR-ed and ts_rank_cd rewards documents matching more of them.
+LEXICAL_SEARCH_SQL = """
+    SELECT id, title, content, metadata,
+           ts_rank_cd(search_vector, q) AS lexical_score,
+           1 - (embedding <=> %s) AS similarity_score
+    FROM documents, (
+        SELECT replace(plainto_tsquery('english', %s)::text, '&', '|')::tsquery AS q
+    ) query
+    WHERE search_vector @@ q
+    ORDER BY lexical_score DESC
+    LIMIT %s;
+"""
+
+# Same search without a query embedding (HuggingFace unavailable). There is no
+# cosine similarity to report, so similarity_score is 0 and callers rank on
+# lexical_score; the FAQ router's similarity test then never fires on these rows.
+LEXICAL_ONLY_SEARCH_SQL = """
+    SELECT id, title, content, metadata,
+           ts_rank_cd(search_vector, q) AS lexical_score,
+           0.0 AS similarity_score
+    FROM documents, (
+        SELECT replace(plainto_tsquery('english', %s)::text, '&', '|')::tsquery AS q
+    ) query
+    WHERE search_vector @@ q
+    ORDER BY lexical_score DESC
+    LIMIT %s;
+"""
+
+# Passage-level ANN search: same ordered-subquery shape as SIMILARITY_SEARCH_SQL,
+# joined back to the parent row only for the k passages that survive.
+PASSAGE_SEARCH_SQL = """
+    SELECT p.document_id AS id, d.title, d.metadata, p.passage_index, p.content,
+           1 - p.distance AS similarity_score,
+           md5(d.title || E'\\n' || d.content) AS fingerprint
+    FROM (
+        SELECT document_id, passage_index, content, embedding <=> %s AS distance
+        FROM document_passages
+        ORDER BY distance
+        LIMIT %s
+    ) p
+    JOIN documents d ON d.id = p.document_id
+    WHERE 1 - p.distance >= %s
+    ORDER BY p.distance;
+"""
+
+# Knowledge-base version counter for response caches. A statement-level trigger
+# bumps it on every write to documents, so inserts from the API, the update
+# scripts and clear_database all invalidate cached answers everywhere.
+KB_VERSION_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS kb_meta (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        version BIGINT NOT NULL DEFAULT 0
+    );
+    INSERT INTO kb_meta (id, version) VALUES (TRUE, 0) ON CONFLICT (id) DO NOTHING;
+
+    CREATE OR REPLACE FUNCTION bump_kb_version() RETURNS trigger AS $$
+    BEGIN
+        UPDATE kb_meta SET version = version + 1;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS documents_kb_version ON documents;
+    CREATE TRIGGER documents_kb_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON documents
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_kb_version();
+"""
+
+# Seconds a process trusts its last read of kb_meta.version
+KB_VERSION_CHECK_INTERVAL = float(os.getenv('KB_VERSION_CHECK_INTERVAL', '5'))
+
+# Rows per multi-row INSERT statement in bulk loads
+BULK_PAGE_SIZE = int(os.getenv('BULK_PAGE_SIZE', '500'))
+
+def install_kb_version_tracking(cursor):
+    """Create the kb_meta counter and the trigger that bumps it"""
+    cursor.execute(KB_VERSION_SCHEMA_SQL)
+
+def bump_kb_version(cursor):
+    """Bump the knowledge-base version explicitly (e.g. after recreating the table)"""
+    cursor.execute("UPDATE kb_meta SET version = version + 1;")
+
+class DatabaseService:
+    """Service for database operations with vector support"""
+
+    def __init__(self):
+        self.db_url = os.getenv('DATABASE_URL')
+        self._kb_version = None
+        self._kb_version_checked_at = 0.0
+
+    def _on_connect(self, conn):
+        # Bind NumPy arrays as vectors and read vector columns back as float32 arrays
+        register_vector(conn, key=self.db_url)
+
+    def get_connection(self):
+        """Get a pooled database connection (close() returns it to the pool)"""
+        try:
+            pool = get_pool(self.db_url, on_connect=self._on_connect)
+            with timed('db_connect'):
+                # Waiting for a free connection counts against the request deadline
+                return pool.getconn(timeout=stage_timeout(pool.timeout))
+        except Exception as e:
+            logger.error(f"Database connection error: {str(e)}")
+            return None
+
+    def warm_up(self):
+        """Open the pool's first connections ahead of the first query"""
+        try:
+            if self.db_url:
+                get_pool(self.db_url, on_connect=self._on_connect).warm_up()
+        except Exception as e:
+            logger.error(f"Database warm-up error: {str(e)}")
+
+    def pool_stats(self):
+        """Return connection pool metrics"""
+        return get_pool(self.db_url, on_connect=self._on_connect).stats() if self.db_url else {}
+
+    def setup_database(self):
+        """Setup database schema with pgvector extension"""
+        conn = self.get_connection()
+        if not conn:
+            return False
+        try:
+            cursor = conn.cursor()
+
+            # Enable pgvector extension
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+
+            # Create documents table (1024 dims for BAAI/bge-large-en-v1.5)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id SERIAL PRIMARY KEY,
+                    title VARCHAR(255) NOT NULL,
+                    content TEXT NOT NULL,
+                    embedding vector(1024),
+                    metadata JSONB DEFAULT '{}',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+
+            # Create index for vector similarity search
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS documents_embedding_idx
+                ON documents USING ivfflat (embedding vector_cosine_ops)
+                WITH (lists = 100);
+            """)
+
+            # Full-text column for exact product/crop/FAQ-number matches (hybrid retrieval)
+            cursor.execute("""
+                ALTER TABLE documents ADD COLUMN IF NOT EXISTS search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                    setweight(to_tsvector('english', coalesce(content, '')), 'B')
+                ) STORED;
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS documents_search_idx
+                ON documents USING GIN (search_vector);
+            """)
+
+            # Hash of the embedded text: bulk upserts skip rows whose content is unchanged
+            # and reuse the stored embedding of any row with identical content
+            cursor.execute("""
+                ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash TEXT
+                GENERATED ALWAYS AS (md5(content)) STORED;
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS documents_content_hash_idx ON documents (content_hash);
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS documents_title_idx ON documents (title);
+            """)
+
+            # Passages (heading/bullet-aware chunks) of each document, embedded separately
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS document_passages (
+                    id SERIAL PRIMARY KEY,
+                    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                    passage_index INTEGER NOT NULL,
+                    content TEXT NOT NULL,
+                    embedding vector(1024),
+                    UNIQUE (document_id, passage_index)
+                );
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS document_passages_embedding_idx
+                ON document_passages USING ivfflat (embedding vector_cosine_ops)
+                WITH (lists = 100);
+            """)
+
+            # Sentences of each document with their embeddings, for extractive answers;
+            # read by document_id only, so no ANN index
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS document_sentences (
+                    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                    sentence_index INTEGER NOT NULL,
+                    content TEXT NOT NULL,
+                    embedding vector(1024),
+                    PRIMARY KEY (document_id, sentence_index)
+                );
+            """)
+
+            install_kb_version_tracking(cursor)
+            cursor.execute("""
+                DROP TRIGGER IF EXISTS document_passages_kb_version ON document_passages;
+                CREATE TRIGGER document_passages_kb_version
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON document_passages
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_kb_version();
+            """)
+            cursor.execute("""
+                DROP TRIGGER IF EXISTS document_sentences_kb_version ON document_sentences;
+                CREATE TRIGGER document_sentences_kb_version
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON document_sentences
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_kb_version();
+            """)
+
+            conn.commit()
+            cursor.close()
+
+            logger.info("Database setup completed successfully")
+            return True
+
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Database setup error: {str(e)}")
+            return False
+        finally:
+            conn.close()
+
+    def insert_document(self, title, content, embedding, metadata=None):
+        """Insert document with embedding; returns the new id (truthy) or False"""
+        conn = self.get_connection()
+        if not conn:
+            return False
+        try:
+            cursor = conn.cursor()
+
+            metadata_json = json.dumps(metadata or {})
+
+            cursor.execute("""
+                INSERT INTO documents (title, content, embedding, metadata)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id
+            """, (title, content, Vector(embedding), metadata_json))
+            document_id = cursor.fetchone()[0]
+
+            conn.commit()
+            self._kb_version_checked_at = 0.0  # re-read the bumped version on next use
+            cursor.close()
+
+            return document_id
+
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error inserting document: {str(e)}")
+            return False
+        finally:
+            conn.close()
+
+    def insert_documents(self, rows):
+        """Bulk insert (title, content, embedding, metadata) rows in one binary COPY"""
+        conn = self.get_connection()
+        if not conn:
+            return 0
+        try:
+            cursor = conn.cursor()
+            count = copy_documents_binary(cursor, rows)
+
+            conn.commit()
+            self._kb_version_checked_at = 0.0  # re-read the bumped version on next use
+            cursor.close()
+
+            return count
+
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error bulk inserting documents: {str(e)}")
+            return 0
+        finally:
+            conn.close()
+
+    def existing_documents(self, titles):
+        """Return {title: {id, content_hash, metadata}} for the oldest row with each title, or None on error"""
+        conn = self.get_connection()
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute("""
+                SELECT DISTINCT ON (title) id, title, content_hash, metadata
+                FROM documents WHERE title = ANY(%s)
+                ORDER BY title, id;
+            """, (list(titles),))
+            existing = {row['title']: dict(row) for row in cursor.fetchall()}
+            cursor.close()
+            return existing
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error reading existing documents: {str(e)}")
+            return None
+        finally:
+            conn.close()
+
+    def embeddings_for_hashes(self, content_hashes):
+        """Return {content_hash: embedding} for stored documents with any of the given hashes"""
+        conn = self.get_connection()
+        if not conn:
+            return {}
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT DISTINCT ON (content_hash) content_hash, embedding
+                FROM documents WHERE content_hash = ANY(%s) AND embedding IS NOT NULL;
+            """, (list(content_hashes),))
+            embeddings = {content_hash: as_vector(embedding) for content_hash, embedding in cursor.fetchall()}
+            cursor.close()
+            return embeddings
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error reading stored embeddings: {str(e)}")
+            return {}
+        finally:
+            conn.close()
+
+    def bulk_sync_documents(self, inserts, updates=(), metadata_updates=(), passages=None, keep_ids=None, sentences=None):
+        """Apply a bulk upsert in one transaction, so readers see the old or the new knowledge base.
+
+        inserts are (title, content, embedding, metadata) rows, updates are
+        (id, content, embedding, metadata) rows for changed documents and
+        metadata_updates are (id, metadata) rows whose content is unchanged.
+        passages, when given, holds one list of (content, embedding) per insert
+        followed by one per update. sentences works the same way for
+        document_sentences. Updated documents always lose their old passages
+        and sentences, whether or not new ones are given.
+        With keep_ids, every other existing document is deleted first (a full
+        replace that keeps unchanged rows). Returns {inserted, updated,
+        metadata_updated, deleted, passages, sentences} counts, or None after
+        a rollback.
+        """
+        conn = self.get_connection()
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor()
+            deleted = 0
+            if keep_ids is not None:
+                cursor.execute("DELETE FROM documents WHERE id <> ALL(%s);", (list(keep_ids),))  # passages cascade
+                deleted = cursor.rowcount
+
+            if updates:
+                execute_values(cursor, """
+                    UPDATE documents AS d
+                    SET content = v.content, embedding = v.embedding, metadata = v.metadata::jsonb
+                    FROM (VALUES %s) AS v (id, content, embedding, metadata)
+                    WHERE d.id = v.id
+                """, [(document_id, content, Vector(embedding), json.dumps(metadata or {})) for document_id, content, embedding, metadata in updates],
+                    page_size=BULK_PAGE_SIZE)
+                # Chunks of the old content would keep being retrieved and quoted, even when none replace them
+                updated_ids = [row[0] for row in updates]
+                cursor.execute("DELETE FROM document_passages WHERE document_id = ANY(%s);", (updated_ids,))
+                cursor.execute("DELETE FROM document_sentences WHERE document_id = ANY(%s);", (updated_ids,))
+            if metadata_updates:
+                execute_values(cursor, """
+                    UPDATE documents AS d SET metadata = v.metadata::jsonb
+                    FROM (VALUES %s) AS v (id, metadata)
+                    WHERE d.id = v.id
+                """, [(document_id, json.dumps(metadata or {})) for document_id, metadata in metadata_updates],
+                    page_size=BULK_PAGE_SIZE)
+
+            passage_count = 0
+            sentence_count = 0
+            if passages is None and sentences is None:
+                inserted = copy_documents_binary(cursor, inserts) if inserts else 0
+            else:
+                # Passages and sentences need each insert's id. RETURNING does not promise VALUES
+                # order, so take the ids from the sequence first and insert them explicitly
+                insert_ids = []
+                if inserts:
+                    cursor.execute(
+                        "SELECT nextval(pg_get_serial_sequence('documents', 'id')) FROM generate_series(1, %s);",
+                        (len(inserts),)
+                    )
+                    insert_ids = [document_id for document_id, in cursor.fetchall()]
+                    execute_values(
+                        cursor,
+                        "INSERT INTO documents (id, title, content, embedding, metadata) VALUES %s",
+                        [(document_id, title, content, Vector(embedding), json.dumps(metadata or {}))
+                         for document_id, (title, content, embedding, metadata) in zip(insert_ids, inserts)],
+                        page_size=BULK_PAGE_SIZE
+                    )
+                inserted = len(insert_ids)
+                document_ids = insert_ids + [row[0] for row in updates]
+                for table, index_column, chunks in (('document_passages', 'passage_index', passages),
+                                                    ('document_sentences', 'sentence_index', sentences)):
+                    if chunks is None:
+                        continue
+                    rows = [
+                        (document_id, i, content, Vector(embedding))
+                        for document_id, document_chunks in zip(document_ids, chunks)
+                        for i, (content, embedding) in enumerate(document_chunks)
+                    ]
+                    if rows:
+                        execute_values(
+                            cursor,
+                            f"INSERT INTO {table} (document_id, {index_column}, content, embedding) VALUES %s",
+                            rows,
+                            page_size=BULK_PAGE_SIZE
+                        )
+                    if table == 'document_passages':
+                        passage_count = len(rows)
+                    else:
+                        sentence_count = len(rows)
+
+            conn.commit()
+            cursor.close()
+            self._kb_version_checked_at = 0.0  # re-read the bumped version on next use
+            return {"inserted": inserted, "updated": len(updates), "metadata_updated": len(metadata_updates),
+                    "deleted": deleted, "passages": passage_count, "sentences": sentence_count}
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error syncing documents: {str(e)}")
+            return None
+        finally:
+            conn.close()
+
+    def search_similar_documents(self, query_embedding, limit=3, similarity_threshold=0.7, query_text=None):
+        """Search for similar documents using cosine similarity"""
+        conn = self.get_connection()
+        if not conn:
+            return []
+        try:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+            with timed('db_search'):
+                cursor.execute(SIMILARITY_SEARCH_SQL, (Vector(query_embedding), limit, similarity_threshold))
+                results = cursor.fetchall()
+            cursor.close()
+
+            return [dict(row) for row in results]
+
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error searching documents: {str(e)}")
+            return []
+        finally:
+            conn.close()
+
+    def lexical_search_documents(self, query_text, query_embedding, limit=10):
+        """Full-text search; rows also carry their cosine similarity to query_embedding (0 when it is None)"""
+        conn = self.get_connection()
+        if not conn:
+            return []
+        try:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            with timed('db_lexical'):
+                if query_embedding is None:
+                    cursor.execute(LEXICAL_ONLY_SEARCH_SQL, (query_text, limit))
+                else:
+                    cursor.execute(LEXICAL_SEARCH_SQL, (Vector(query_embedding), query_text, limit))
+                results = cursor.fetchall()
+            cursor.close()
+            return [dict(row) for row in results]
+        except psycopg2.errors.UndefinedColumn:
+            conn.rollback()
+            raise
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error in lexical search: {str(e)}")
+            return []
+        finally:
+            conn.close()
+
+    def document_fingerprints(self, doc_ids):
+        """Return {id: md5(title, newline, content)} for existing ids, or None if the database is unavailable"""
+        conn = self.get_connection()
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, md5(title || E'\\n' || content) FROM documents WHERE id = ANY(%s);",
+                (list(doc_ids),)
+            )
+            fingerprints = dict(cursor.fetchall())
+            cursor.close()
+            return fingerprints
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error fetching document fingerprints: {str(e)}")
+            return None
+        finally:
+            conn.close()
+
+    def kb_version(self):
+        """Return the knowledge-base version (re-read at most every KB_VERSION_CHECK_INTERVAL seconds), or None if unknown"""
+        now = time.monotonic()
+        if self._kb_version_checked_at and now - self._kb_version_checked_at < KB_VERSION_CHECK_INTERVAL:
+            return self._kb_version
+        conn = self.get_connection()
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT version FROM kb_meta;")
+            row = cursor.fetchone()
+            cursor.close()
+            self._kb_version = row[0] if row else None
+            self._kb_version_checked_at = now
+            return self._kb_version
+        except Exception as e:
+            # kb_meta missing until setup_database() runs: callers skip caching
+            conn.rollback()
+            self._kb_version = None
+            self._kb_version_checked_at = now
+            logger.error(f"Error reading knowledge-base version: {str(e)}")
+            return None
+        finally:
+            conn.close()
+
+    def insert_passages(self, document_id, passages, embeddings):
+        """Replace a document's passages in one statement; returns the passage count"""
+        conn = self.get_connection()
+        if not conn:
+            return 0
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM document_passages WHERE document_id = %s;", (document_id,))
+            execute_values(
+                cursor,
+                "INSERT INTO document_passages (document_id, passage_index, content, embedding) VALUES %s",
+                [(document_id, i, passage, Vector(embedding)) for i, (passage, embedding) in enumerate(zip(passages, embeddings))]
+            )
+            conn.commit()
+            cursor.close()
+            self._kb_version_checked_at = 0.0  # re-read the bumped version on next use
+            return len(passages)
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error inserting passages for document {document_id}: {str(e)}")
+            return 0
+        finally:
+            conn.close()
+
+    def insert_sentences(self, document_id, sentences, embeddings):
+        """Replace a document's sentences in one statement; returns the sentence count"""
+        conn = self.get_connection()
+        if not conn:
+            return 0
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM document_sentences WHERE document_id = %s;", (document_id,))
+            execute_values(
+                cursor,
+                "INSERT INTO document_sentences (document_id, sentence_index, content, embedding) VALUES %s",
+                [(document_id, i, sentence, Vector(embedding)) for i, (sentence, embedding) in enumerate(zip(sentences, embeddings))]
+            )
+            conn.commit()
+            cursor.close()
+            self._kb_version_checked_at = 0.0  # re-read the bumped version on next use
+            return len(sentences)
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error inserting sentences for document {document_id}: {str(e)}")
+            return 0
+        finally:
+            conn.close()
+
+    def document_sentences(self, doc_ids):
+        """Return {document_id: [(content, embedding), ...]} in document order, or None if unavailable"""
+        conn = self.get_connection()
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor()
+            with timed('db_sentences'):
+                cursor.execute("""
+                    SELECT document_id, content, embedding FROM document_sentences
+                    WHERE document_id = ANY(%s)
+                    ORDER BY document_id, sentence_index;
+                """, (list(doc_ids),))
+                rows = cursor.fetchall()
+            cursor.close()
+            sentences = {}
+            for document_id, content, embedding in rows:
+                sentences.setdefault(document_id, []).append((content, embedding))
+            return sentences
+        except Exception as e:
+            # document_sentences missing until setup_database() runs
+            conn.rollback()
+            logger.error(f"Error reading document sentences: {str(e)}")
+            return None
+        finally:
+            conn.close()
+
+    def search_similar_passages(self, query_embedding, limit=10, similarity_threshold=0.7):
+        """Nearest passages with their parent title/metadata, best first"""
+        conn = self.get_connection()
+        if not conn:
+            return []
+        try:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            with timed('db_search'):
+                cursor.execute(PASSAGE_SEARCH_SQL, (Vector(query_embedding), limit, similarity_threshold))
+                results = cursor.fetchall()
+            cursor.close()
+            return [dict(row) for row in results]
+        except psycopg2.errors.UndefinedTable:
+            conn.rollback()
+            raise
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error searching passages: {str(e)}")
+            return []
+        finally:
+            conn.close()
+
+    def documents_without_passages(self):
+        """Return (id, title, content) of documents that have not been chunked yet"""
+        conn = self.get_connection()
+        if not conn:
+            return []
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT d.id, d.title, d.content FROM documents d
+                WHERE NOT EXISTS (SELECT 1 FROM document_passages p WHERE p.document_id = d.id)
+                ORDER BY d.id;
+            """)
+            rows = cursor.fetchall()
+            cursor.close()
+            return rows
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error listing unchunked documents: {str(e)}")
+            return []
+        finally:
+            conn.close()
+
+    def documents_without_sentences(self):
+        """Return (id, title, content) of documents that have not been split into sentences yet"""
+        conn = self.get_connection()
+        if not conn:
+            return []
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT d.id, d.title, d.content FROM documents d
+                WHERE NOT EXISTS (SELECT 1 FROM document_sentences s WHERE s.document_id = d.id)
+                ORDER BY d.id;
+            """)
+            rows = cursor.fetchall()
+            cursor.close()
+            return rows
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error listing documents without sentences: {str(e)}")
+            return []
+        finally:
+            conn.close()
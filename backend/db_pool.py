@@ -0,0 +1,258 @@
+import os
+import time
+import threading
+import logging
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+from metrics import count_timeout
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Pool configuration
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # max seconds to wait for a free connection
+DB_POOL_HEALTHCHECK_IDLE = float(os.getenv('DB_POOL_HEALTHCHECK_IDLE', '10'))  # ping connections idle longer than this
+DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))  # recycle connections older than this
+DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))  # seconds to establish a new connection (libpq, whole seconds)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the pool timeout"""
+
+
+class _Entry:
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = self.last_used = time.monotonic()
+
+
+class PooledConnection:
+    """psycopg2 connection proxy whose close() hands the connection back to the pool"""
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        return getattr(self._entry.conn, name)
+
+    def close(self):
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool._release(entry)
+
+    def __del__(self):
+        # Dropped without close() (e.g. an exception path): don't leak the pool slot
+        if getattr(self, '_entry', None) is not None:
+            entry, self._entry = self._entry, None
+            self._pool._release(entry, discard=True)
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 pool with health checks on checkout and wait metrics.
+
+    Pools live for the lifetime of the process, so warm serverless invocations
+    of the handler reuse already-authenticated connections.
+    """
+
+    def __init__(self, dsn, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE, timeout=DB_POOL_TIMEOUT,
+                 healthcheck_idle=DB_POOL_HEALTHCHECK_IDLE, max_lifetime=DB_POOL_MAX_LIFETIME, on_connect=None,
+                 connect_timeout=DB_CONNECT_TIMEOUT):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.healthcheck_idle = healthcheck_idle
+        self.max_lifetime = max_lifetime
+        self.on_connect = on_connect
+        self.connect_timeout = connect_timeout
+        self._idle = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+        # Metrics
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+        self.reconnects = 0
+        self.connects = 0
+
+    def _connect(self):
+        # Without a connect timeout an unreachable host blocks the caller for the OS TCP timeout (minutes)
+        conn = psycopg2.connect(self.dsn, connect_timeout=self.connect_timeout) if self.connect_timeout else psycopg2.connect(self.dsn)
+        try:
+            if self.on_connect:
+                self.on_connect(conn)
+        except Exception:
+            conn.close()
+            raise
+        with self._cond:
+            self.connects += 1
+        return _Entry(conn)
+
+    def _close_entry(self, entry):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, entry, now):
+        conn = entry.conn
+        if conn.closed:
+            return False
+        if self.max_lifetime and now - entry.created_at > self.max_lifetime:
+            return False
+        if now - entry.last_used >= self.healthcheck_idle:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1;")
+                cursor.close()
+                conn.rollback()
+            except Exception:
+                return False
+        return True
+
+    def getconn(self, timeout=None):
+        """Check out a healthy connection, waiting up to timeout seconds if the pool is exhausted"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+        while True:
+            entry = None
+            create = False
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        count_timeout('postgres_pool')
+                        raise PoolTimeout(f"No database connection available within {timeout:.1f}s")
+                    waited = True
+                    self._cond.wait(remaining)
+                if self._idle:
+                    entry = self._idle.pop()  # LIFO keeps hot connections hot
+                else:
+                    self._size += 1
+                    create = True
+
+            if create:
+                try:
+                    entry = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(entry, time.monotonic()):
+                # Stale or broken: drop it and try again (reconnecting if needed)
+                self._close_entry(entry)
+                with self._cond:
+                    self.reconnects += 1
+                    self._size -= 1
+                continue
+
+            elapsed = time.monotonic() - start
+            with self._cond:
+                self.checkouts += 1
+                if waited:
+                    self.waits += 1
+                    self.wait_time_total += elapsed
+                    self.wait_time_max = max(self.wait_time_max, elapsed)
+            return PooledConnection(self, entry)
+
+    def _release(self, entry, discard=False):
+        conn = entry.conn
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        if discard or conn.closed:
+            self._close_entry(entry)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager yielding a pooled connection that is always returned"""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            conn.close()
+
+    def warm_up(self):
+        """Open min_size connections ahead of the first request"""
+        with self._cond:
+            needed = self.min_size - self._size
+        conns = []
+        try:
+            for _ in range(max(0, needed)):
+                conns.append(self.getconn())
+        finally:
+            for conn in conns:
+                conn.close()
+
+    def close_all(self):
+        """Close idle connections (checked-out ones are closed when returned)"""
+        with self._cond:
+            while self._idle:
+                entry = self._idle.pop()
+                self._close_entry(entry)
+                self._size -= 1
+
+    def stats(self):
+        """Return pool size and wait metrics"""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_time_avg_ms": (self.wait_time_total / self.waits * 1000) if self.waits else 0.0,
+                "wait_time_max_ms": self.wait_time_max * 1000,
+                "timeouts": self.timeouts,
+                "reconnects": self.reconnects,
+                "connects": self.connects
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(dsn, on_connect=None):
+    """Return the process-wide pool for dsn, creating it on first use"""
+    pool = _pools.get(dsn)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(dsn)
+            if pool is None:
+                pool = ConnectionPool(dsn, on_connect=on_connect)
+                _pools[dsn] = pool
+    return pool
@@ -0,0 +1,85 @@
+import os
+import time
+import contextvars
+from contextlib import contextmanager
+
+# Stdlib only: the entry points import this at module load (see test_import_time.py)
+
+# Request deadlines per endpoint (seconds, end to end)
+DEADLINE_CHAT = float(os.getenv('DEADLINE_CHAT', '20'))
+DEADLINE_CHAT_STREAM = float(os.getenv('DEADLINE_CHAT_STREAM', '60'))
+DEADLINE_ENHANCED_CHAT = float(os.getenv('DEADLINE_ENHANCED_CHAT', '20'))
+DEADLINE_MIN_GENERATION = float(os.getenv('DEADLINE_MIN_GENERATION', '1.5'))  # skip generation with less time left
+
+_deadline = contextvars.ContextVar('request_deadline', default=None)  # absolute time.monotonic()
+
+
+class DeadlineExceeded(Exception):
+    """A stage could not finish within what was left of the request deadline"""
+
+
+@contextmanager
+def deadline_scope(seconds):
+    """Bound the block to seconds from now (None: unbounded); nested scopes can only tighten it"""
+    if seconds is None:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(at, current))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left before the current deadline, or None outside a deadline scope"""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def expired():
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def allows(seconds):
+    """Whether waiting seconds (e.g. a retry backoff) still fits in the deadline"""
+    left = remaining()
+    return left is None or left > seconds
+
+
+def stage_timeout(cap=None, minimum=0.0):
+    """Timeout for the next blocking call: cap, shortened to the remaining budget.
+
+    Raises DeadlineExceeded when no more than minimum seconds are left, so a
+    stage that cannot finish in time is skipped instead of started.
+    """
+    return timeout_until(_deadline.get(), cap, minimum)
+
+
+def current_deadline():
+    """Absolute time.monotonic() deadline of the current scope, or None"""
+    return _deadline.get()
+
+
+def timeout_until(deadline_at, cap=None, minimum=0.0):
+    """stage_timeout for an explicit absolute deadline (None: unbounded), for code outside the request's context"""
+    if deadline_at is None:
+        return cap
+    left = deadline_at - time.monotonic()
+    if left <= minimum or left <= 0:
+        raise DeadlineExceeded(f"{max(left, 0.0):.2f}s left of the request deadline")
+    return left if cap is None else min(cap, left)
+
+
+def sources_only_response(documents, reason="deadline"):
+    """Degraded answer listing the retrieved documents when generation did not finish"""
+    titles = [doc['title'] for doc in documents]
+    return {
+        "answer": "I couldn't finish generating an answer just now. The most relevant information is in: " + "; ".join(titles),
+        "sources": titles,
+        "context_used": len(documents),
+        "degraded": reason
+    }
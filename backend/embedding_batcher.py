@@ -0,0 +1,149 @@
+import os
+import time
+import threading
+import contextvars
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from embedding_cache import cache_key
+from deadline import stage_timeout, current_deadline, deadline_scope, DeadlineExceeded
+from metrics import count_deadline_exceeded
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Micro-batching configuration
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv('EMBEDDING_BATCH_WAIT_MS', '5'))  # how long to collect concurrent calls
+EMBEDDING_MICRO_BATCH_SIZE = int(os.getenv('EMBEDDING_MICRO_BATCH_SIZE', '16'))  # flush early at this many texts
+EMBEDDING_MAX_CONCURRENT_BATCHES = int(os.getenv('EMBEDDING_MAX_CONCURRENT_BATCHES', '4'))
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent generate_embedding calls into batched inference requests.
+
+    Callers block on a Future while a dispatcher thread collects texts for up to
+    EMBEDDING_BATCH_WAIT_MS (or EMBEDDING_MICRO_BATCH_SIZE texts), sends them
+    through service.generate_embeddings and fans the rows back out. Identical
+    texts queued or in flight share a single slot.
+
+    A batch is sent in the context of its first caller (so its time shows in
+    that request's Server-Timing) and bounded by the earliest deadline among
+    its callers, so retries never hold a dispatcher worker past every waiter.
+    """
+
+    def __init__(self, service, max_wait_ms=EMBEDDING_BATCH_WAIT_MS, max_batch=EMBEDDING_MICRO_BATCH_SIZE,
+                 max_concurrent_batches=EMBEDDING_MAX_CONCURRENT_BATCHES):
+        self.service = service
+        self.model_name = getattr(service, 'model_name', service.api_url)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self.max_concurrent_batches = max_concurrent_batches
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()  # key -> (text, Future, Context, deadlines), waiting to be sent
+        self._inflight = {}  # key -> Future, sent and awaiting a response
+        self._thread = None
+        self._executor = None
+        self.requests = 0
+        self.deduplicated = 0
+        self.batches_sent = 0
+
+    def __getattr__(self, name):
+        # embedding_dim, api_url, generate_embeddings, ... come from the wrapped service
+        return getattr(self.service, name)
+
+    def _ensure_started(self):
+        """Start the dispatcher lazily (caller holds self._cond)"""
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent_batches, thread_name_prefix="embedding-batch")
+            self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._thread.start()
+
+    def generate_embedding(self, text):
+        """Generate embedding for given text, sharing the HTTP request with concurrent callers"""
+        key = cache_key(text, self.model_name)
+        deadline_at = current_deadline()
+        with self._cond:
+            self.requests += 1
+            future = self._inflight.get(key)
+            if future is None:
+                entry = self._pending.get(key)
+                if entry is not None:
+                    future = entry[1]
+                    entry[3].append(deadline_at)
+            if future is not None:
+                self.deduplicated += 1
+            else:
+                future = Future()
+                self._pending[key] = (text, future, contextvars.copy_context(), [deadline_at])
+                self._ensure_started()
+                self._cond.notify()
+        try:
+            # The batch is shared, so only this caller's wait is bounded by its deadline
+            return future.result(timeout=stage_timeout())
+        except (FutureTimeout, DeadlineExceeded):
+            count_deadline_exceeded('embed')
+            logger.error("Query embedding not ready before the request deadline")
+            return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Give concurrent callers a few milliseconds to join this batch
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = []
+                context, deadlines = None, []
+                while self._pending and len(batch) < self.max_batch:
+                    key, (text, future, caller_context, caller_deadlines) = self._pending.popitem(last=False)
+                    self._inflight[key] = future
+                    batch.append((key, text, future))
+                    context = context or caller_context
+                    deadlines.extend(caller_deadlines)
+                bounded = [at for at in deadlines if at is not None]
+                deadline_at = min(bounded) if bounded else None
+            self._executor.submit(context.run, self._dispatch, batch, deadline_at)
+
+    def _dispatch(self, batch, deadline_at=None):
+        texts = [text for _, text, _ in batch]
+        results = [None] * len(batch)
+        try:
+            with deadline_scope(None if deadline_at is None else deadline_at - time.monotonic()):
+                # Every waiter of a batch whose earliest deadline has passed has stopped waiting or soon will
+                stage_timeout()
+                if len(texts) == 1:
+                    results = [self.service.generate_embedding(texts[0])]
+                else:
+                    vectors = self.service.generate_embeddings(texts)
+                    if vectors is not None:
+                        results = [vector.tolist() for vector in vectors]
+            with self._cond:
+                self.batches_sent += 1
+        except DeadlineExceeded:
+            logger.warning(f"Dropped an embedding batch of {len(texts)} texts at its callers' deadline")
+        except Exception as e:
+            logger.error(f"Error generating batched embeddings: {str(e)}")
+        finally:
+            with self._cond:
+                for key, _, _ in batch:
+                    self._inflight.pop(key, None)
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self):
+        """Return batching counters for monitoring"""
+        with self._cond:
+            requests, deduplicated, batches_sent = self.requests, self.deduplicated, self.batches_sent
+        return {
+            "requests": requests,
+            "deduplicated": deduplicated,
+            "batches_sent": batches_sent,
+            "avg_batch_size": (requests - deduplicated) / batches_sent if batches_sent else 0.0
+        }
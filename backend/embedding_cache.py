@@ -0,0 +1,310 @@
+import os
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import count_cache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '2048'))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv('EMBEDDING_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+EMBEDDING_CACHE_TTL = int(os.getenv('EMBEDDING_CACHE_TTL', str(7 * 24 * 3600)))  # seconds, 0 = never expire
+EMBEDDING_CACHE_DISK_MAX_ENTRIES = int(os.getenv('EMBEDDING_CACHE_DISK_MAX_ENTRIES', '100000'))
+# Serverless platforms only allow writes under the temp directory; set to empty to disable the disk tier
+EMBEDDING_CACHE_PATH = os.getenv(
+    'EMBEDDING_CACHE_PATH',
+    os.path.join(tempfile.gettempdir(), 'embedding_cache.sqlite3')
+)
+
+
+def normalize_text(text):
+    """Normalize text for cache keys (bge-large-en-v1.5 is uncased, so casefolding is safe)"""
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(text, model_name):
+    """Build a stable cache key from normalized text and model name"""
+    raw = f"{model_name}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class MemoryLRU:
+    """In-process LRU of float32 vectors bounded by entry count and total bytes"""
+
+    def __init__(self, max_entries=EMBEDDING_CACHE_MAX_ENTRIES, max_bytes=EMBEDDING_CACHE_MAX_BYTES, ttl=EMBEDDING_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (vector, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return cached vector or None, refreshing its LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            vector, expires_at = entry
+            if expires_at and expires_at < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return vector
+
+    def set(self, key, vector):
+        """Store vector and evict least recently used entries over the limits"""
+        if vector.nbytes > self.max_bytes:
+            return
+        expires_at = time.time() + self.ttl if self.ttl else 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (vector, expires_at)
+            self._bytes += vector.nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        vector, _ = self._entries.pop(key)
+        self._bytes -= vector.nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+
+class SQLiteEmbeddingStore:
+    """On-disk embedding store keeping vectors as float32 blobs in SQLite"""
+
+    EVICT_EVERY = 256  # writes between expiry/size sweeps
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, ttl=EMBEDDING_CACHE_TTL, max_entries=EMBEDDING_CACHE_DISK_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn = None
+        self._disabled = not path
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open the database lazily so importing the module does no I/O"""
+        if self._conn is None and not self._disabled:
+            try:
+                conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL;")
+                conn.execute("PRAGMA synchronous=NORMAL;")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS embeddings (
+                        key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        dim INTEGER NOT NULL,
+                        vector BLOB NOT NULL,
+                        created_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    );
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed_idx ON embeddings (accessed_at);")
+                conn.commit()
+                self._conn = conn
+            except Exception as e:
+                logger.warning(f"Embedding disk cache disabled ({self.path}): {str(e)}")
+                self._disabled = True
+        return self._conn
+
+    def get(self, key):
+        """Return cached vector or None"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                blob, created_at = row
+                now = time.time()
+                if self.ttl and created_at + self.ttl < now:
+                    conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+                conn.execute("UPDATE embeddings SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+                return np.frombuffer(blob, dtype=np.float32).copy()
+            except Exception as e:
+                logger.warning(f"Embedding disk cache read error: {str(e)}")
+                return None
+
+    def set(self, key, model_name, vector):
+        """Store vector, periodically sweeping expired and excess rows"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                now = time.time()
+                conn.execute("""
+                    INSERT OR REPLACE INTO embeddings (key, model, dim, vector, created_at, accessed_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (key, model_name, int(vector.shape[0]), vector.tobytes(), now, now))
+                self._writes += 1
+                if self._writes % self.EVICT_EVERY == 0:
+                    self._evict(conn, now)
+                conn.commit()
+            except Exception as e:
+                logger.warning(f"Embedding disk cache write error: {str(e)}")
+
+    def _evict(self, conn, now):
+        if self.ttl:
+            conn.execute("DELETE FROM embeddings WHERE created_at < ?", (now - self.ttl,))
+        conn.execute("""
+            DELETE FROM embeddings WHERE key IN (
+                SELECT key FROM embeddings ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            if conn is not None:
+                conn.execute("DELETE FROM embeddings;")
+                conn.commit()
+
+
+class CachedEmbeddingService:
+    """Two-tier (memory LRU + SQLite) cache in front of an EmbeddingService"""
+
+    def __init__(self, service, memory=None, disk=None):
+        self.service = service
+        self.model_name = getattr(service, 'model_name', service.api_url)
+        self.memory = memory if memory is not None else MemoryLRU()
+        self.disk = disk if disk is not None else SQLiteEmbeddingStore()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()  # counters are bumped from every server worker thread
+
+    def __getattr__(self, name):
+        # Anything not cached here (api_url, embedding_dim, ...) comes from the wrapped service
+        return getattr(self.service, name)
+
+    def lookup(self, text):
+        """Return the cached embedding for text (memory, then disk) or None on a miss"""
+        key = cache_key(text, self.model_name)
+
+        vector = self.memory.get(key)
+        if vector is not None:
+            self._count(hits_memory=1)
+            count_cache('embedding', True)
+            return vector.tolist()
+
+        vector = self.disk.get(key)
+        if vector is not None:
+            self._count(hits_disk=1)
+            self.memory.set(key, vector)
+            count_cache('embedding', True)
+            return vector.tolist()
+
+        self._count(misses=1)
+        count_cache('embedding', False)
+        return None
+
+    def _count(self, hits_memory=0, hits_disk=0, misses=0):
+        with self._stats_lock:
+            self.hits_memory += hits_memory
+            self.hits_disk += hits_disk
+            self.misses += misses
+
+    def store(self, text, embedding):
+        """Write a freshly generated embedding to both tiers"""
+        key = cache_key(text, self.model_name)
+        vector = np.asarray(embedding, dtype=np.float32)
+        self.memory.set(key, vector)
+        self.disk.set(key, self.model_name, vector)
+
+    def generate_embedding(self, text):
+        """Generate embedding for given text, serving repeats from cache"""
+        embedding = self.lookup(text)
+        if embedding is not None:
+            return embedding
+
+        embedding = self.service.generate_embedding(text)
+        if embedding is not None:
+            self.store(text, embedding)
+        return embedding
+
+    def generate_embeddings(self, texts, **kwargs):
+        """Batch variant: serve cached texts and embed only the misses in one batched call"""
+        texts = list(texts)
+        keys = [cache_key(text, self.model_name) for text in texts]
+        embeddings = np.empty((len(texts), self.service.embedding_dim), dtype=np.float32)
+
+        missing = []
+        hits_memory = hits_disk = 0
+        for i, key in enumerate(keys):
+            vector = self.memory.get(key)
+            if vector is not None:
+                hits_memory += 1
+            else:
+                vector = self.disk.get(key)
+                if vector is not None:
+                    hits_disk += 1
+                    self.memory.set(key, vector)
+            if vector is None:
+                missing.append(i)
+            else:
+                embeddings[i] = vector
+        self._count(hits_memory, hits_disk, len(missing))
+        count_cache('embedding', True, len(texts) - len(missing))
+        count_cache('embedding', False, len(missing))
+
+        if missing:
+            vectors = self.service.generate_embeddings([texts[i] for i in missing], **kwargs)
+            if vectors is None:
+                return None
+            for i, vector in zip(missing, vectors):
+                embeddings[i] = vector
+                self.memory.set(keys[i], vector.copy())
+                self.disk.set(keys[i], self.model_name, vector)
+
+        return embeddings
+
+    def stats(self):
+        """Return hit/miss counters for monitoring"""
+        with self._stats_lock:
+            hits_memory, hits_disk, misses = self.hits_memory, self.hits_disk, self.misses
+        lookups = hits_memory + hits_disk + misses
+        return {
+            "hits_memory": hits_memory,
+            "hits_disk": hits_disk,
+            "misses": misses,
+            "hit_rate": (hits_memory + hits_disk) / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.nbytes
+        }
+
+    def clear(self):
+        """Drop both cache tiers"""
+        self.memory.clear()
+        self.disk.clear()
@@ -0,0 +1,180 @@
+import os
+import time
+import requests
+import numpy as np
+import logging
+from http_client import post_guarded, backoff_delay
+from circuit_breaker import CircuitOpen
+from deadline import allows, DeadlineExceeded
+from metrics import timed, count_retry
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Batch configuration for the HuggingFace inference endpoint
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '32'))  # inputs per request
+EMBEDDING_BATCH_MAX_CHARS = int(os.getenv('EMBEDDING_BATCH_MAX_CHARS', '60000'))  # payload text per request
+EMBEDDING_BATCH_MAX_RETRIES = int(os.getenv('EMBEDDING_BATCH_MAX_RETRIES', '3'))
+
+class _NotRetryable(Exception):
+    """A batch failure that retrying cannot fix (bad credentials, rejected input, open breaker)"""
+
+class EmbeddingService:
+    """Service for generating text embeddings using HuggingFace API"""
+
+    def __init__(self):
+        self.model_name = "BAAI/bge-large-en-v1.5"
+        self.api_url = f"https://api-inference.huggingface.co/models/{self.model_name}"
+        token = os.getenv('HUGGINGFACE_API_TOKEN', '').strip()
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+        self.embedding_dim = 1024  # BAAI/bge-large-en-v1.5 dimensions
+
+    def generate_embedding(self, text):
+        """Generate embedding for given text"""
+        try:
+            payload = {
+                "inputs": text,
+                "options": {"wait_for_model": True}
+            }
+            # Pooled keep-alive session; 503 "model loading" is retried with backoff.
+            # Query embeddings are latency-critical, so a slow call may be hedged;
+            # while HuggingFace's breaker is open this fails at once
+            with timed('hf_embed'):
+                response = post_guarded(self.api_url, session_name="huggingface", hedge=True, headers=self.headers, json=payload, timeout=30)
+
+            # Check for different error types
+            if response.status_code == 401:
+                logger.error("HuggingFace API authentication failed. Check your token.")
+                return None
+
+            response.raise_for_status()
+
+            return self.parse_embedding(response.json())
+
+        except CircuitOpen as e:
+            logger.warning(f"Skipping embedding: {str(e)}")
+            return None
+        except requests.exceptions.Timeout:
+            logger.error("HuggingFace API timeout")
+            return None
+        except Exception as e:
+            logger.error(f"Error generating embedding: {str(e)}")
+            return None
+
+    def parse_embedding(self, result):
+        """Extract a single embedding from the inference API response"""
+        # Handle different response formats
+        if isinstance(result, list) and len(result) > 0:
+            # Check if it's a nested list (batch response)
+            if isinstance(result[0], list):
+                return result[0]  # First embedding in batch
+            else:
+                return result  # Direct embedding
+        elif isinstance(result, dict) and 'error' in result:
+            logger.error(f"HuggingFace API error: {result['error']}")
+            return None
+        else:
+            logger.error(f"Unexpected response format: {result}")
+            return None
+
+    def iter_batches(self, texts, batch_size=EMBEDDING_BATCH_SIZE, max_chars=EMBEDDING_BATCH_MAX_CHARS):
+        """Split texts into (start_index, chunk) pairs bounded by count and total characters"""
+        start = 0
+        chunk = []
+        chunk_chars = 0
+        for i, text in enumerate(texts):
+            if chunk and (len(chunk) >= batch_size or chunk_chars + len(text) > max_chars):
+                yield start, chunk
+                start, chunk, chunk_chars = i, [], 0
+            chunk.append(text)
+            chunk_chars += len(text)
+        if chunk:
+            yield start, chunk
+
+    def _embed_batch(self, chunk):
+        """Embed one chunk in a single request; returns an (len(chunk), dim) array, or None if worth retrying.
+
+        Raises _NotRetryable on failures a retry would only repeat.
+        """
+        try:
+            payload = {
+                "inputs": chunk,
+                "options": {"wait_for_model": True}
+            }
+            with timed('hf_embed'):
+                response = post_guarded(self.api_url, session_name="huggingface", headers=self.headers, json=payload, timeout=30)
+
+            if response.status_code == 401:
+                raise _NotRetryable("HuggingFace API authentication failed. Check your token.")
+            if 400 <= response.status_code < 500 and response.status_code != 429:
+                raise _NotRetryable(f"HuggingFace API rejected the batch: HTTP {response.status_code}")
+            response.raise_for_status()
+
+            result = response.json()
+            if isinstance(result, dict) and 'error' in result:
+                logger.error(f"HuggingFace API error: {result['error']}")
+                return None
+
+            vectors = np.asarray(result, dtype=np.float32)
+            if vectors.shape != (len(chunk), self.embedding_dim):
+                logger.error(f"Unexpected batch response shape: {vectors.shape}")
+                return None
+            return vectors
+
+        except (_NotRetryable, DeadlineExceeded):
+            raise
+        except CircuitOpen as e:
+            # Open for BREAKER_OPEN_SECONDS: backing off a few seconds would only hit it again
+            raise _NotRetryable(f"Skipping batch embedding: {str(e)}") from e
+        except requests.exceptions.Timeout:
+            logger.error("HuggingFace API timeout (batch)")
+            return None
+        except Exception as e:
+            logger.error(f"Error generating batch embeddings: {str(e)}")
+            return None
+
+    def generate_embeddings(self, texts, batch_size=EMBEDDING_BATCH_SIZE, max_retries=EMBEDDING_BATCH_MAX_RETRIES):
+        """Generate embeddings for a list of texts in order.
+
+        Texts are sent in size-bounded chunks; only chunks that fail are retried.
+        Returns a float32 array of shape (len(texts), embedding_dim), or None if
+        any chunk still fails after max_retries, or at once on a failure no
+        retry can fix (401, other rejected requests, open breaker).
+        """
+        texts = list(texts)
+        embeddings = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+        pending = list(self.iter_batches(texts, batch_size=batch_size))
+
+        for attempt in range(max_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                delay = backoff_delay(attempt)
+                if not allows(delay):
+                    logger.error(f"No time left in the deadline to retry {len(pending)} embedding chunk(s)")
+                    return None
+                logger.warning(f"Retrying {len(pending)} failed embedding chunk(s) in {delay:.2f}s")
+                time.sleep(delay)
+
+            failed = []
+            for start, chunk in pending:
+                if attempt:
+                    count_retry('huggingface')
+                try:
+                    vectors = self._embed_batch(chunk)
+                except (_NotRetryable, DeadlineExceeded) as e:
+                    logger.error(f"Giving up on {len(texts)} texts: {str(e)}")
+                    return None
+                if vectors is None:
+                    failed.append((start, chunk))
+                else:
+                    embeddings[start:start + len(chunk)] = vectors
+            pending = failed
+
+        if pending:
+            logger.error(f"Failed to embed {sum(len(c) for _, c in pending)} of {len(texts)} texts")
+            return None
+        return embeddings
@@ -0,0 +1,38 @@
+import asyncio
+import threading
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_loop = None
+_lock = threading.Lock()
+
+
+def get_event_loop():
+    """Return the process-wide event loop, starting its background thread on first use.
+
+    HTTP handler threads submit coroutines here instead of calling asyncio.run()
+    per request, so async clients and connection pools bound to the loop are
+    created once and reused by every in-flight chat.
+    """
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="rag-event-loop", daemon=True)
+                thread.start()
+                _loop = loop
+                logger.info("Started shared asyncio event loop")
+    return _loop
+
+
+def run_coroutine(coro, timeout=None):
+    """Run a coroutine on the shared loop from synchronous code and wait for its result"""
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        future.cancel()
+        raise
@@ -0,0 +1,151 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Extractive answer configuration
+EXTRACTIVE_ENABLED = os.getenv('EXTRACTIVE_ENABLED', 'true').strip().lower() in ('1', 'true', 'yes')
+EXTRACTIVE_MAX_SENTENCES = int(os.getenv('EXTRACTIVE_MAX_SENTENCES', '3'))  # sentences quoted per answer
+EXTRACTIVE_MIN_SCORE = float(os.getenv('EXTRACTIVE_MIN_SCORE', '0.6'))  # best sentence must be at least this close
+EXTRACTIVE_SCORE_MARGIN = float(os.getenv('EXTRACTIVE_SCORE_MARGIN', '0.05'))  # others within this of the best
+EXTRACTIVE_CACHE_DOCUMENTS = int(os.getenv('EXTRACTIVE_CACHE_DOCUMENTS', '512'))  # documents' sentence matrices kept in memory
+
+
+class ExtractiveAnswerer:
+    """Answers by quoting the retrieved documents' best-matching sentences.
+
+    Sentences and their embeddings are produced at ingestion (document_sentences,
+    see chunking.split_sentences). Per document they are held as one
+    unit-normalized float32 matrix, cached in memory until the knowledge-base
+    version changes, so a query is scored against every sentence of the
+    retrieved documents with a single matrix-vector product and no model call.
+    The best sentence must reach min_score; up to max_sentences within margin
+    of it are quoted, each with a numbered citation of its document.
+    """
+
+    def __init__(self, db_service, max_sentences=EXTRACTIVE_MAX_SENTENCES, min_score=EXTRACTIVE_MIN_SCORE,
+                 margin=EXTRACTIVE_SCORE_MARGIN, cache_documents=EXTRACTIVE_CACHE_DOCUMENTS):
+        self.db_service = db_service
+        self.max_sentences = max_sentences
+        self.min_score = min_score
+        self.margin = margin
+        self.cache_documents = cache_documents
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # document id -> (sentences, matrix)
+        self._cache_version = None
+        self.answered = 0
+        self.declined = 0
+
+    def _sentences(self, doc_ids):
+        """{document id: (sentences, unit-normalized matrix)} for the ids that have stored sentences"""
+        version = self.db_service.kb_version()
+        found = {}
+        with self._lock:
+            if version is None or version != self._cache_version:
+                # Any write may have replaced a document's sentences
+                self._cache.clear()
+                self._cache_version = version
+            for doc_id in doc_ids:
+                if doc_id in self._cache:
+                    self._cache.move_to_end(doc_id)
+                    found[doc_id] = self._cache[doc_id]
+        missing = [doc_id for doc_id in doc_ids if doc_id not in found]
+        if not missing:
+            return found
+
+        rows = self.db_service.document_sentences(missing)
+        if not rows:
+            return found
+        loaded = {}
+        for doc_id, sentences in rows.items():
+            matrix = np.asarray([embedding for _, embedding in sentences], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1.0, norms)
+            loaded[doc_id] = ([content for content, _ in sentences], matrix)
+        found.update(loaded)
+        if version is not None:
+            with self._lock:
+                if version == self._cache_version:
+                    self._cache.update(loaded)
+                    while len(self._cache) > self.cache_documents:
+                        self._cache.popitem(last=False)
+        return found
+
+    def answer(self, query_embedding, documents):
+        """Quote the best sentences of documents with citations, or None if none is close enough"""
+        if query_embedding is None or not documents:
+            return None
+        by_id = {doc['id']: doc for doc in documents if doc.get('id') is not None}
+        indexed = self._sentences(list(by_id))
+        if not indexed:
+            with self._lock:
+                self.declined += 1
+            return None
+
+        # One product over every sentence of every retrieved document
+        doc_ids = [doc_id for doc_id in by_id if doc_id in indexed]
+        matrix = np.vstack([indexed[doc_id][1] for doc_id in doc_ids])
+        owners = np.concatenate([np.full(len(indexed[doc_id][0]), i) for i, doc_id in enumerate(doc_ids)])
+        offsets = np.concatenate([np.arange(len(indexed[doc_id][0])) for doc_id in doc_ids])
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = matrix @ query
+
+        k = min(self.max_sentences * 2, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        best = float(scores[top[0]])
+        if best < self.min_score:
+            with self._lock:
+                self.declined += 1
+            return None
+
+        picked, seen = [], set()
+        for i in top:
+            if len(picked) >= self.max_sentences or scores[i] < best - self.margin:
+                break
+            doc_id = doc_ids[owners[i]]
+            text = indexed[doc_id][0][offsets[i]]
+            if text in seen:
+                continue
+            seen.add(text)
+            picked.append((doc_id, text, float(scores[i])))
+
+        # Number sources in order of first citation
+        sources, citations, parts = [], [], []
+        for doc_id, text, score in picked:
+            title = by_id[doc_id]['title']
+            if title not in sources:
+                sources.append(title)
+            number = sources.index(title) + 1
+            parts.append(f"{text} [{number}]")
+            citations.append({"source": number, "title": title, "text": text, "score": round(score, 4)})
+
+        with self._lock:
+            self.answered += 1
+        return {
+            "answer": " ".join(parts),
+            "sources": sources,
+            "context_used": len(sources),
+            "route": "extractive",
+            "citations": citations
+        }
+
+    def stats(self):
+        """Return answer counts and cache size"""
+        with self._lock:
+            cached = len(self._cache)
+            answered, declined = self.answered, self.declined
+        total = answered + declined
+        return {
+            "answered": answered,
+            "declined": declined,
+            "answer_rate": answered / total if total else 0.0,
+            "cached_documents": cached,
+            "min_score": self.min_score
+        }
@@ -0,0 +1,127 @@
+import os
+import json
+import threading
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# FAQ fast-path configuration
+FAQ_FAST_PATH_ENABLED = os.getenv('FAQ_FAST_PATH_ENABLED', 'true').strip().lower() in ('1', 'true', 'yes')
+FAQ_MIN_SIMILARITY = float(os.getenv('FAQ_MIN_SIMILARITY', '0.85'))  # top hit must be at least this close
+FAQ_MIN_MARGIN = float(os.getenv('FAQ_MIN_MARGIN', '0.05'))  # ...and this much closer than the runner-up
+FAQ_DOCUMENT_TYPES = {'faq', 'greeting-response'}
+FALLBACK_EXCERPT_CHARS = int(os.getenv('FALLBACK_EXCERPT_CHARS', '600'))  # lead excerpt served when Gemini is unavailable
+
+
+def _metadata(doc):
+    metadata = doc.get('metadata') or {}
+    if isinstance(metadata, str):
+        try:
+            metadata = json.loads(metadata)
+        except ValueError:
+            return {}
+    return metadata
+
+
+def stored_answer(doc):
+    """Return the ready-made answer held by an FAQ row, or None if the row is not an FAQ"""
+    metadata = _metadata(doc)
+    is_faq = str(metadata.get('type', '')).lower() in FAQ_DOCUMENT_TYPES or doc['title'].startswith('FAQ')
+    if not is_faq:
+        return None
+
+    # Precomputed at ingestion (the greeting row's content is an instruction, not the answer)
+    answer = metadata.get('answer') or metadata.get('response')
+    if answer:
+        return answer
+
+    # FAQ rows are "<question>?\n<answer>": drop the echoed question line
+    lines = doc['content'].strip().split('\n', 1)
+    if len(lines) == 2 and lines[0].rstrip().endswith('?'):
+        answer = lines[1].strip()
+    else:
+        answer = doc['content'].strip()
+    return answer or None
+
+
+def lead_excerpt(content, max_chars=FALLBACK_EXCERPT_CHARS):
+    """Opening of a document, cut at the last sentence end that fits in max_chars"""
+    content = content.strip()
+    if len(content) <= max_chars:
+        return content
+    head = content[:max_chars]
+    end = max(head.rfind('. '), head.rfind('.\n'), head.rfind('? '), head.rfind('! '))
+    if end > 0:
+        return head[:end + 1]
+    return head.rsplit(' ', 1)[0] + '...'
+
+
+def fallback_response(documents, reason):
+    """Answer without the LLM, marked degraded with reason: the top row's stored FAQ answer, else its opening"""
+    top = documents[0]
+    answer = stored_answer(top)
+    return {
+        "answer": answer or lead_excerpt(top['content']),
+        "sources": [top['title']],
+        "context_used": 1,
+        "route": "faq" if answer else "excerpt",
+        "degraded": reason
+    }
+
+
+class FAQRouter:
+    """Answers confidently matched FAQ queries from the stored text, skipping Gemini"""
+
+    def __init__(self, min_similarity=FAQ_MIN_SIMILARITY, min_margin=FAQ_MIN_MARGIN):
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self._lock = threading.Lock()
+        self.decisions = {}  # reason -> count
+
+    def _record(self, reason, query, detail):
+        with self._lock:
+            self.decisions[reason] = self.decisions.get(reason, 0) + 1
+        logger.info(f"FAQ router [{reason}] {detail} | query: {query!r}")
+
+    def route(self, query, context_documents):
+        """Return a response built from the top FAQ row, or None to fall through to the LLM"""
+        if not context_documents:
+            return None
+
+        # Hybrid retrieval orders by fused rank; the confidence test is on cosine similarity
+        ranked = sorted(context_documents, key=lambda doc: doc.get('similarity_score', 0), reverse=True)
+        top = ranked[0]
+        top_score = float(top.get('similarity_score', 0))
+        runner_up = float(ranked[1].get('similarity_score', 0)) if len(ranked) > 1 else None
+
+        answer = stored_answer(top)
+        if answer is None:
+            self._record('llm:not_faq', query, f"top={top['title']!r}")
+            return None
+        if top_score < self.min_similarity:
+            self._record('llm:low_similarity', query, f"top={top['title']!r} score={top_score:.3f}")
+            return None
+        if runner_up is not None and top_score - runner_up < self.min_margin:
+            self._record('llm:ambiguous', query, f"top={top['title']!r} score={top_score:.3f} runner_up={runner_up:.3f}")
+            return None
+
+        self._record('faq', query, f"top={top['title']!r} score={top_score:.3f} runner_up={runner_up}")
+        return {
+            "answer": answer,
+            "sources": [top['title']],
+            "context_used": 1,
+            "route": "faq"
+        }
+
+    def stats(self):
+        """Return routing decision counts"""
+        with self._lock:
+            decisions = dict(self.decisions)
+        total = sum(decisions.values())
+        return {
+            "decisions": decisions,
+            "fast_path_rate": decisions.get('faq', 0) / total if total else 0.0,
+            "min_similarity": self.min_similarity,
+            "min_margin": self.min_margin
+        }
@@ -0,0 +1,126 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeout
+
+from deadline import remaining, DeadlineExceeded
+from metrics import count_hedge
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Hedged request configuration
+HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'false').strip().lower() in ('1', 'true', 'yes')
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '95'))  # send the second request once the first is slower than this
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))  # no hedging until the percentile is meaningful
+HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', '0.05'))  # seconds; floor for very fast upstreams
+HEDGE_MAX_THREADS = int(os.getenv('HEDGE_MAX_THREADS', '16'))
+HEDGE_WINDOW = 256  # recent latencies kept per upstream
+# LLM calls are billed per call, so a hedge can double the cost of every slow answer: they need their own opt-in
+HEDGE_LLM_ENABLED = os.getenv('HEDGE_LLM_ENABLED', 'false').strip().lower() in ('1', 'true', 'yes')
+HEDGE_LLM_UPSTREAMS = ('gemini',)
+
+_executor = None
+_executor_lock = threading.Lock()
+_trackers = {}
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies for one upstream"""
+
+    def __init__(self, window=HEDGE_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p):
+        """p-th percentile of the window, or None with fewer than HEDGE_MIN_SAMPLES samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+    def hedge_delay(self):
+        value = self.percentile(HEDGE_PERCENTILE)
+        return None if value is None else max(value, HEDGE_MIN_DELAY)
+
+
+def tracker(upstream):
+    if upstream not in _trackers:
+        with _executor_lock:
+            _trackers.setdefault(upstream, LatencyTracker())
+    return _trackers[upstream]
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_THREADS, thread_name_prefix="hedge")
+    return _executor
+
+
+def _timed_call(upstream, fn, args, kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    tracker(upstream).record(time.perf_counter() - start)
+    return result
+
+
+def _discard_when_done(future, discard):
+    """Cancel a losing attempt; if it is already running, release its result when it lands"""
+    if future.cancel() or discard is None:
+        return
+    future.add_done_callback(lambda f: discard(f.result()) if f.exception() is None else None)
+
+
+def hedged_call(upstream, fn, *args, discard=None, **kwargs):
+    """Call fn(*args, **kwargs), racing an identical second call if the first is slower than the upstream's p95.
+
+    Only for idempotent calls. The first attempt to succeed wins. The loser is
+    cancelled if it has not started; otherwise its result is handed to discard
+    (e.g. closing an HTTP response) when it arrives, and its own timeout,
+    bounded by the request deadline, ends it. Without enough latency samples,
+    or with too little time left for a hedge to help, this is a plain call;
+    so is an LLM upstream unless HEDGE_LLM_ENABLED is set too. Plain calls
+    still record their latency.
+    """
+    enabled = HEDGE_ENABLED and (HEDGE_LLM_ENABLED or upstream not in HEDGE_LLM_UPSTREAMS)
+    delay = tracker(upstream).hedge_delay() if enabled else None
+    left = remaining()
+    if delay is None or (left is not None and left <= delay):
+        return _timed_call(upstream, fn, args, kwargs)
+
+    executor = _get_executor()
+    # Each attempt runs in a copy of the caller's context, so it keeps the request deadline
+    primary = executor.submit(contextvars.copy_context().run, _timed_call, upstream, fn, args, kwargs)
+    try:
+        return primary.result(timeout=delay)
+    except FutureTimeout:
+        pass
+
+    hedge = executor.submit(contextvars.copy_context().run, _timed_call, upstream, fn, args, kwargs)
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+        if not done:
+            for future in pending:
+                _discard_when_done(future, discard)
+            raise DeadlineExceeded(f"{upstream} did not answer before the request deadline")
+        for future in done:
+            if future.exception() is None:
+                count_hedge(upstream, 'primary' if future is primary else 'hedge')
+                for loser in (done | pending) - {future}:
+                    _discard_when_done(loser, discard)
+                return future.result()
+            error = future.exception()
+    raise error
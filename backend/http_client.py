@@ -0,0 +1,144 @@
+import os
+import time
+import random
+import threading
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from deadline import stage_timeout, allows
+from hedging import hedged_call
+from circuit_breaker import breaker
+from metrics import count_retry, count_timeout
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Connection pool / retry configuration
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))  # keep-alive connections per host
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '4'))
+HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', '0.5'))  # seconds
+HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', '20'))  # cap for a single wait
+
+# Status codes worth retrying: rate limiting, "model loading" and transient gateway errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(name="default", pool_size=None):
+    """Return a process-wide keep-alive session for the given upstream.
+
+    Sessions are created once and shared across threads; the underlying
+    urllib3 connection pool is thread-safe and we never rely on cookies.
+    """
+    session = _sessions.get(name)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            size = pool_size or HTTP_POOL_SIZE
+            session = requests.Session()
+            # Retries are handled in post_with_retry so we can honour Retry-After/estimated_time
+            adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size, max_retries=0, pool_block=False)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[name] = session
+    return session
+
+
+def close_sessions():
+    """Close every pooled session (used on shutdown/reload)"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def backoff_delay(attempt, response=None, base=HTTP_BACKOFF_BASE, cap=HTTP_BACKOFF_MAX):
+    """Seconds to wait before retry number `attempt` (1-based).
+
+    Server hints win: Retry-After header, then HuggingFace's `estimated_time`
+    for loading models. Otherwise full-jitter exponential backoff.
+    """
+    hint = None
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                hint = float(retry_after)
+            except ValueError:
+                hint = None
+        if hint is None:
+            try:
+                body = response.json()
+                if isinstance(body, dict) and 'estimated_time' in body:
+                    hint = float(body['estimated_time'])
+            except ValueError:
+                hint = None
+    if hint is not None:
+        # Small jitter so workers woken by the same hint do not stampede
+        return min(cap, hint) + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def post_with_retry(url, session_name="default", max_retries=HTTP_MAX_RETRIES, timeout=None, **kwargs):
+    """POST through a pooled session, retrying retryable statuses and connection errors.
+
+    Returns the final response (which may still be an error status) so callers
+    keep their own status handling. Timeouts are not retried: the caller's
+    timeout already bounds how long we are willing to wait. Inside a request
+    deadline each attempt's timeout is cut to the time left, and a retry whose
+    backoff would overrun it is not made.
+    """
+    session = get_session(session_name)
+    attempt = 0
+    while True:
+        try:
+            response = session.post(url, timeout=stage_timeout(timeout), **kwargs)
+        except requests.exceptions.ConnectionError as e:
+            if isinstance(e, requests.exceptions.Timeout):
+                count_timeout(session_name)  # ConnectTimeout
+            delay = backoff_delay(attempt + 1)
+            if attempt >= max_retries or not allows(delay):
+                raise
+            attempt += 1
+            count_retry(session_name)
+            logger.warning(f"Connection error to {session_name} ({str(e)}), retry {attempt}/{max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+        except requests.exceptions.Timeout:
+            count_timeout(session_name)
+            raise
+
+        if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+            return response
+        delay = backoff_delay(attempt + 1, response)
+        if not allows(delay):
+            return response
+
+        attempt += 1
+        count_retry(session_name)
+        logger.warning(f"{session_name} returned {response.status_code}, retry {attempt}/{max_retries} in {delay:.2f}s")
+        response.close()
+        time.sleep(delay)
+
+
+def post_hedged(url, session_name="default", **kwargs):
+    """post_with_retry, plus a racing duplicate when the upstream is slower than its p95 (HEDGE_ENABLED)"""
+    return hedged_call(session_name, post_with_retry, url, session_name=session_name,
+                       discard=lambda response: response.close(), **kwargs)
+
+
+def upstream_failed(response):
+    """Whether a final response counts against the upstream's circuit breaker (still 429/5xx after retries)"""
+    return response.status_code in RETRY_STATUS_CODES
+
+
+def post_guarded(url, session_name="default", hedge=False, **kwargs):
+    """post_with_retry (post_hedged with hedge) behind the upstream's circuit breaker; raises CircuitOpen while it is open"""
+    post = post_hedged if hedge else post_with_retry
+    return breaker(session_name).call(post, url, session_name=session_name, failed=upstream_failed, **kwargs)
@@ -0,0 +1,90 @@
+import os
+import socket
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer
+
+from db_pool import DB_POOL_MAX_SIZE
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Self-hosted server configuration
+SERVER_HOST = os.getenv('HOST', 'localhost')
+SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', '8'))  # concurrent connections being served
+SERVER_KEEPALIVE_TIMEOUT = float(os.getenv('SERVER_KEEPALIVE_TIMEOUT', '5'))  # idle seconds before a kept-alive connection is closed
+SERVER_BACKLOG = int(os.getenv('SERVER_BACKLOG', '128'))  # pending connections queued by the kernel
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that serves each connection on a fixed-size thread pool.
+
+    Unlike HTTPServer (one request at a time) a slow Gemini call only occupies
+    its own worker, and unlike ThreadingHTTPServer the thread count is bounded,
+    so a burst queues instead of exhausting the database pool. A kept-alive
+    connection holds its worker until it goes idle for the handler timeout.
+    Pass listen_socket to serve an already-listening socket (prefork workers).
+    """
+
+    def __init__(self, server_address, handler_class, workers=SERVER_WORKERS, backlog=SERVER_BACKLOG, listen_socket=None):
+        self.request_queue_size = backlog  # read by server_activate() during HTTPServer.__init__
+        super().__init__(server_address, handler_class, bind_and_activate=listen_socket is None)
+        if listen_socket is not None:
+            self.socket.close()
+            self.socket = listen_socket
+            self.server_address = listen_socket.getsockname()
+            self.server_name, self.server_port = self.server_address[:2]
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http-worker")
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        # Same contract as ThreadingMixIn.process_request_thread
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        """Stop listening, then let accepted connections finish (graceful drain)"""
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+def reuse_port_socket(host, port, backlog=SERVER_BACKLOG):
+    """Listening socket with SO_REUSEPORT, so several can share one port and the kernel balances between them"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def keep_alive_handler(handler_class, timeout=SERVER_KEEPALIVE_TIMEOUT):
+    """Subclass a handler to speak HTTP/1.1 keep-alive with an idle timeout"""
+    return type(handler_class.__name__, (handler_class,), {
+        "protocol_version": "HTTP/1.1",
+        "timeout": timeout,  # socket timeout: idle keep-alive connections are closed
+        # Headers and body go out as separate writes; without TCP_NODELAY the body
+        # waits on the client's delayed ACK (~40 ms) on a reused connection
+        "disable_nagle_algorithm": True
+    })
+
+
+def serve(handler_class, host=SERVER_HOST, port=8000, workers=SERVER_WORKERS):
+    """Serve handler_class on a PooledHTTPServer until interrupted"""
+    if workers > DB_POOL_MAX_SIZE:
+        logger.warning(f"SERVER_WORKERS={workers} exceeds DB_POOL_MAX_SIZE={DB_POOL_MAX_SIZE}; requests will queue for connections")
+    server = PooledHTTPServer((host, port), keep_alive_handler(handler_class), workers=workers)
+    print(f"RAG Chatbot server running on http://{host}:{port} ({workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,109 @@
+import os
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import psycopg2.errors
+
+from deadline import remaining
+from vector_index import VECTOR_INDEX_ENABLED
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Hybrid retrieval configuration
+# Off by default over the in-memory index, whose point is to answer without a database round trip per query
+HYBRID_SEARCH_ENABLED = os.getenv('HYBRID_SEARCH_ENABLED', 'false' if VECTOR_INDEX_ENABLED else 'true').strip().lower() in ('1', 'true', 'yes')
+HYBRID_RRF_K = int(os.getenv('HYBRID_RRF_K', '60'))  # damping constant from the original RRF paper
+HYBRID_CANDIDATES = int(os.getenv('HYBRID_CANDIDATES', '20'))  # candidates pulled from each ranker before fusion
+# Floor for documents only the full-text ranker found (they skip the similarity threshold). One ranker at rank r
+# scores 1/(k + r), so the default keeps lexical-only hits from the top 3 full-text matches; 0 keeps them all.
+HYBRID_LEXICAL_MIN_RRF_SCORE = float(os.getenv('HYBRID_LEXICAL_MIN_RRF_SCORE', str(1.0 / (HYBRID_RRF_K + 3))))
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lexical-search")
+
+
+def reciprocal_rank_fusion(rankings, k=HYBRID_RRF_K):
+    """Fuse ranked lists of document dicts into {id: (rrf_score, doc)}"""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            score, existing = fused.get(doc['id'], (0.0, None))
+            fused[doc['id']] = (score + 1.0 / (k + rank), existing or doc)
+    return fused
+
+
+class HybridRetriever:
+    """Vector + full-text retrieval fused with reciprocal rank fusion.
+
+    The vector side is whatever retriever is in use (Postgres ANN or the
+    in-memory index); the lexical side is a GIN-indexed tsvector query run
+    concurrently, so exact product names, crop names and FAQ numbers that
+    embeddings blur still surface. Exposes the same search_similar_documents
+    interface as DatabaseService.
+
+    Documents the vector ranker returns passed similarity_threshold; ones only
+    the lexical ranker found did not have to, and are kept only if their
+    fused score reaches lexical_min_rrf_score.
+    """
+
+    def __init__(self, vector_retriever, db_service, rrf_k=HYBRID_RRF_K, candidates=HYBRID_CANDIDATES,
+                 lexical_min_rrf_score=HYBRID_LEXICAL_MIN_RRF_SCORE):
+        self.vector_retriever = vector_retriever
+        self.db_service = db_service
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.lexical_min_rrf_score = lexical_min_rrf_score
+        self.lexical_available = True
+
+    def _lexical(self, query_text, query_embedding, limit):
+        try:
+            return self.db_service.lexical_search_documents(query_text, query_embedding, limit)
+        except psycopg2.errors.UndefinedColumn:
+            # Schema predates the search_vector column: run /api/setup to enable it
+            self.lexical_available = False
+            logger.warning("documents.search_vector missing - hybrid search disabled until setup_database() runs")
+            return []
+
+    def search_similar_documents(self, query_embedding, limit=3, similarity_threshold=0.7, query_text=None):
+        """Search with vector and lexical rankers in parallel and fuse the results"""
+        if not query_text or not self.lexical_available:
+            return self.vector_retriever.search_similar_documents(
+                query_embedding, limit=limit, similarity_threshold=similarity_threshold
+            )
+
+        candidates = max(limit, self.candidates)
+        # In a copy of the caller's context, so the query keeps the request deadline and shows in Server-Timing
+        lexical_future = _executor.submit(contextvars.copy_context().run, self._lexical, query_text, query_embedding, candidates)
+        semantic = self.vector_retriever.search_similar_documents(
+            query_embedding, limit=candidates, similarity_threshold=similarity_threshold
+        )
+        try:
+            # No longer than the request deadline allows: the vector results stand on their own
+            left = remaining()
+            lexical = lexical_future.result(timeout=None if left is None else max(left, 0.0))
+        except FutureTimeout:
+            lexical_future.cancel()
+            logger.warning("Lexical search did not finish within the request deadline; using vector results only")
+            lexical = []
+        except Exception as e:
+            logger.error(f"Lexical search failed: {str(e)}")
+            lexical = []
+
+        # Lexical hits bypass the similarity threshold: an exact term match is
+        # exactly what the embedding ranker tends to miss. Only the strongest
+        # of them are kept, though, since the OR query matches on any one word
+        fused = reciprocal_rank_fusion([semantic, lexical], k=self.rrf_k)
+        semantic_ids = {doc['id'] for doc in semantic}
+        ranked = sorted(
+            (item for doc_id, item in fused.items() if doc_id in semantic_ids or item[0] >= self.lexical_min_rrf_score),
+            key=lambda item: item[0], reverse=True
+        )[:limit]
+
+        results = []
+        for score, doc in ranked:
+            result = dict(doc)
+            result['similarity_score'] = float(doc['similarity_score'])
+            result['rrf_score'] = score
+            results.append(result)
+        return results
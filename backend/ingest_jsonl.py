@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Bulk-load documents from JSONL files into the knowledge base.
+
+Each line is {"title": ..., "content": ..., "metadata": {...}}. Embeddings are
+generated in batches and all rows (plus their passages) are written in one
+transaction, replacing the one-document-per-call loops of the add_*/update_*
+scripts. Documents are upserted by title: re-running on an unchanged file
+embeds nothing.
+
+Usage:
+    python ingest_jsonl.py docs.jsonl [more.jsonl ...] [--replace] [--batch-size N]
+"""
+
+import os
+import sys
+import json
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables before shared modules read their configuration
+load_dotenv()
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import DatabaseService
+from embeddings import EmbeddingService
+from embedding_cache import CachedEmbeddingService
+from passage_retrieval import PASSAGE_RETRIEVAL_ENABLED
+from extractive import EXTRACTIVE_ENABLED
+from bulk_ingest import BulkIngestor, parse_documents, BULK_INGEST_BATCH_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load JSONL documents into the knowledge base")
+    parser.add_argument('files', nargs='+', help="JSONL files, one document per line")
+    parser.add_argument('--replace', action='store_true', help="also delete stored documents missing from the files")
+    parser.add_argument('--batch-size', type=int, default=BULK_INGEST_BATCH_SIZE, help="texts per embedding request")
+    args = parser.parse_args()
+
+    documents = []
+    invalid = 0
+    for path in args.files:
+        with open(path, encoding='utf-8') as f:
+            parsed, errors = parse_documents(f)
+        for error in errors:
+            print(f"❌ {path}:{error['line']}: {error['error']}")
+        documents.extend(parsed)
+        invalid += len(errors)
+        print(f"📄 {path}: {len(parsed)} documents")
+
+    if not documents:
+        print("❌ No valid documents to load")
+        return False
+    if args.replace and invalid:
+        print("❌ Refusing to replace the knowledge base with invalid lines present")
+        return False
+
+    db_service = DatabaseService()
+    if not db_service.db_url:
+        print("❌ DATABASE_URL not set")
+        return False
+    if not db_service.setup_database():
+        print("❌ Database setup failed")
+        return False
+
+    print(f"🚀 Loading {len(documents)} documents{' (replacing knowledge base)' if args.replace else ''}...")
+    ingestor = BulkIngestor(db_service, CachedEmbeddingService(EmbeddingService()),
+                            with_passages=PASSAGE_RETRIEVAL_ENABLED, with_sentences=EXTRACTIVE_ENABLED,
+                            batch_size=args.batch_size)
+    report = ingestor.ingest(documents, replace=args.replace)
+
+    if report.get("error"):
+        print(f"❌ {report['error']}")
+        return False
+
+    print(f"✅ {report['inserted']} inserted, {report['updated']} updated, {report['unchanged']} unchanged, {report['deleted']} deleted")
+    print(f"🧮 {report['embedded']} texts embedded, {report['reused']} document embeddings reused, {report['passages']} passages and {report['sentences']} sentences written")
+    print(f"📊 {json.dumps(report, indent=2)}")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the shared response-cache KV (Vercel KV / Upstash REST).
+
+Implements the subset of the Redis-over-REST protocol used by
+response_cache.KVBackend: POST a JSON command array such as
+["SET", key, value, "EX", 60] and get back {"result": ...}.
+
+Usage:
+    python kv_server.py            # listens on http://localhost:8787
+    RESPONSE_CACHE_BACKEND=kv KV_REST_API_URL=http://localhost:8787 python api/index.py
+"""
+
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_store = {}  # key -> (value, expires_at)
+_lock = threading.Lock()
+
+def execute(command):
+    """Run one Redis command against the in-memory store"""
+    name = command[0].upper()
+    now = time.time()
+    with _lock:
+        if name == 'PING':
+            return 'PONG'
+        if name == 'GET':
+            entry = _store.get(command[1])
+            if entry is None or (entry[1] and entry[1] < now):
+                _store.pop(command[1], None)
+                return None
+            return entry[0]
+        if name == 'SET':
+            expires_at = 0
+            if len(command) >= 5 and command[3].upper() == 'EX':
+                expires_at = now + int(command[4])
+            _store[command[1]] = (command[2], expires_at)
+            return 'OK'
+        if name == 'DEL':
+            return sum(1 for key in command[1:] if _store.pop(key, None) is not None)
+        if name == 'FLUSHALL':
+            _store.clear()
+            return 'OK'
+    raise ValueError(f"Unsupported command: {name}")
+
+class handler(BaseHTTPRequestHandler):
+    """Redis-over-REST handler"""
+
+    def _send(self, status_code, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status_code)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            command = json.loads(self.rfile.read(content_length).decode())
+            self._send(200, {"result": execute(command)})
+        except Exception as e:
+            self._send(400, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        pass  # keep cache traffic out of the console
+
+if __name__ == '__main__':
+    port = int(os.getenv('KV_PORT', 8787))
+    server = ThreadingHTTPServer(('localhost', port), handler)
+    print(f"🗄️  Local KV stand-in running on http://localhost:{port}")
+    server.serve_forever()
@@ -0,0 +1,52 @@
+import os
+import threading
+
+# Stdlib only: entry points import this before anything else, so it must stay cheap
+
+
+def load_environment(start):
+    """Load the nearest .env at or above start; dotenv is only imported when a file exists.
+
+    On Vercel the configuration comes from the platform environment, so a cold
+    start skips the python-dotenv import entirely.
+    """
+    directory = os.path.dirname(os.path.abspath(start)) if os.path.isfile(start) else os.path.abspath(start)
+    while True:
+        path = os.path.join(directory, '.env')
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+class Lazy:
+    """A value built by factory() on first use and shared afterwards.
+
+    Keeps module import free of network clients and heavy libraries: the
+    factory runs when the first request needs the value, exactly once even if
+    several worker threads ask at the same moment. A factory that raises is
+    retried on the next call.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._built = False
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self):
+        return self._built
+
+    def get(self):
+        if self._built:
+            return self._value
+        with self._lock:
+            if not self._built:
+                self._value = self._factory()
+                self._built = True
+        return self._value
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Load test: throughput and latency of the HTTP server at increasing concurrency.
+
+Without arguments, compares the legacy single-threaded HTTPServer with the
+PooledHTTPServer on a synthetic handler whose requests wait on a simulated
+upstream (like a Gemini call), so it runs without credentials. --prefork
+compares prefork.py with one worker process against one per core on a
+CPU-bound handler (GIL-bound work such as JSON encoding). --app serves
+api/chat.py's own handler and chatbot (caches, batcher, retriever, FAQ router,
+context packer) from many worker threads, with only the embedding, database and
+Gemini services stubbed, and checks every answer and the shared counters. Pass
+a URL to load a running server instead, e.g.:
+
+    python load_test.py --prefork
+    python load_test.py --app
+    python load_test.py http://localhost:8000/api/chat "What fertilizer for wheat?"
+    python load_test.py http://localhost:8000/api/health
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import socket
+import hashlib
+import tempfile
+import logging
+import threading
+import subprocess
+import http.client
+import importlib.util
+from unittest import mock
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from http_server import PooledHTTPServer, keep_alive_handler
+
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16]
+REQUESTS_PER_CLIENT = 10
+SIMULATED_UPSTREAM_SECONDS = 0.1
+
+# App module served by prefork.py in --prefork mode: pure-Python work holding the GIL
+CPU_BOUND_APP = """
+import json
+from http.server import BaseHTTPRequestHandler
+
+class handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        documents = [{"title": f"Guide {i}", "content": "Apply NPK before sowing. " * 40, "score": i / 7} for i in range(200)]
+        prompt = json.dumps(documents)
+        body = json.dumps({"response": prompt[:80], "context": [], "context_used": 0}).encode()
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+"""
+
+class SlowUpstreamHandler(BaseHTTPRequestHandler):
+    """Answers like /api/chat after waiting on a simulated upstream call"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(SIMULATED_UPSTREAM_SECONDS)
+        body = json.dumps({"response": "ok", "context": [], "context_used": 0}).encode()
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def run_client(url, body, requests_per_client, latencies, errors, check=None, offset=0):
+    """Send requests over one kept-alive connection, recording latencies.
+
+    body may be a list of bodies, sent in turn starting at offset; check(body,
+    payload) flags a 2xx response whose content is wrong.
+    """
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+    bodies = body if isinstance(body, list) else [body]
+    method = 'POST' if bodies[0] is not None else 'GET'
+    headers = {'Content-Type': 'application/json'} if bodies[0] is not None else {}
+    for n in range(requests_per_client):
+        request_body = bodies[(offset + n) % len(bodies)]
+        start = time.perf_counter()
+        try:
+            conn.request(method, parsed.path or '/', body=request_body, headers=headers)
+            response = conn.getresponse()
+            payload = response.read()
+            if response.status >= 400:
+                errors.append(response.status)
+            elif check is not None and not check(request_body, payload):
+                errors.append(f"unexpected answer to {request_body}: {payload[:200]!r}")
+        except Exception as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+def run_level(url, body, concurrency, requests_per_client=REQUESTS_PER_CLIENT, check=None):
+    """Return (requests/s, p50 ms, p95 ms, errors) for one concurrency level"""
+    latencies, errors = [], []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for client in range(concurrency):
+            pool.submit(run_client, url, body, requests_per_client, latencies, errors, check, client)
+    elapsed = time.perf_counter() - start
+    for error in errors[:3]:
+        print(f"   ⚠️  {error}")
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+    return len(latencies) / elapsed, p50, p95, len(errors)
+
+def run_levels(url, body, levels=CONCURRENCY_LEVELS, check=None, failures=None):
+    print(f"{'clients':>8} {'req/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'errors':>8}")
+    results = {}
+    for concurrency in levels:
+        rps, p50, p95, errors = run_level(url, body, concurrency, check=check)
+        results[concurrency] = rps
+        if failures is not None:
+            failures.append(errors)
+        print(f"{concurrency:>8} {rps:>10.1f} {p50:>10.1f} {p95:>10.1f} {errors:>8}")
+    return results
+
+def serve_in_background(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return f"http://127.0.0.1:{server.server_address[1]}/api/chat"
+
+def self_test():
+    body = json.dumps({"message": "What fertilizer for wheat?"})
+    workers = max(CONCURRENCY_LEVELS)
+
+    print(f"\n🐢 Legacy HTTPServer (one request at a time, {SIMULATED_UPSTREAM_SECONDS * 1000:.0f} ms upstream)")
+    print("-" * 50)
+    legacy = HTTPServer(('127.0.0.1', 0), SlowUpstreamHandler)
+    legacy_results = run_levels(serve_in_background(legacy), body)
+    legacy.shutdown()
+    legacy.server_close()
+
+    print(f"\n🚀 PooledHTTPServer ({workers} workers, HTTP/1.1 keep-alive)")
+    print("-" * 50)
+    pooled = PooledHTTPServer(('127.0.0.1', 0), keep_alive_handler(SlowUpstreamHandler), workers=workers)
+    pooled_results = run_levels(serve_in_background(pooled), body)
+    pooled.shutdown()
+    pooled.server_close()
+
+    top = max(CONCURRENCY_LEVELS)
+    speedup = pooled_results[top] / legacy_results[top]
+    scaling = pooled_results[top] / pooled_results[1]
+    print(f"\n📊 At {top} clients: {speedup:.1f}x the legacy throughput; pooled scales {scaling:.1f}x from 1 to {top} clients")
+    return scaling > top / 2
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+def prefork_test():
+    body = json.dumps({"message": "What fertilizer for wheat?"})
+    cores = os.cpu_count() or 1
+    levels = sorted({1, cores, 2 * cores, 4 * cores})
+    prefork_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prefork.py')
+
+    with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+        f.write(CPU_BOUND_APP)
+        app_path = f.name
+
+    results = {}
+    try:
+        for processes in sorted({1, cores}):
+            port = free_port()
+            env = dict(os.environ, PORT=str(port), HOST='127.0.0.1', PREFORK_WORKERS=str(processes), VECTOR_INDEX_ENABLED='false')
+            print(f"\n🧮 prefork.py with {processes} worker process(es), CPU-bound handler ({cores} cores)")
+            print("-" * 50)
+            master = subprocess.Popen([sys.executable, prefork_path, app_path], env=env,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                if not wait_for_port(port):
+                    print("❌ prefork.py did not start")
+                    return False
+                results[processes] = run_levels(f"http://127.0.0.1:{port}/api/chat", body, levels)
+            finally:
+                master.terminate()
+                master.wait(timeout=60)
+    finally:
+        os.unlink(app_path)
+
+    top = max(levels)
+    scaling = results[cores][top] / results[1][top]
+    print(f"\n📊 At {top} clients: {cores} processes give {scaling:.1f}x the throughput of 1")
+    if cores == 1:
+        print("ℹ️  Single-core machine: no multi-core scaling to measure")
+        return True
+    return scaling > cores / 2
+
+# --app: knowledge base, questions and embedding vocabulary of the stubbed upstreams
+APP_DOCUMENTS = [
+    ("NPK Fertilizer Basics", "NPK fertilizers supply nitrogen, phosphorus and potassium. Nitrogen drives leafy growth in wheat and maize. "
+     "Phosphorus supports root development early in the season. Potassium improves drought tolerance and grain quality.", None),
+    ("Wheat Fertilizer Schedule", "Apply half the nitrogen for wheat at sowing and the rest at crown root initiation. "
+     "Wheat needs about 120 kg nitrogen per hectare on most soils. Phosphorus and potassium for wheat go in fully at sowing.", None),
+    ("Organic Fertilizers", "Compost and farmyard manure add organic matter and release nutrients slowly. "
+     "Vermicompost improves soil structure and microbial activity. Green manure crops fix nitrogen before the main crop.", None),
+    ("FAQ: Soil Testing", "How often should I test my soil?\nTest soil every two to three years, before the main sowing season.", {"type": "faq"}),
+    ("Rice Nutrient Management", "Rice needs nitrogen in three splits: at transplanting, tillering and panicle initiation. "
+     "Zinc deficiency in rice shows as brown spots on older leaves. Flooded rice fields lose nitrogen to denitrification.", None),
+]
+APP_QUESTIONS = [
+    "How much nitrogen does wheat need per hectare?",
+    "What do NPK fertilizers supply?",
+    "How often should I test my soil?",
+    "Which organic fertilizers improve soil structure?",
+    "When should rice get nitrogen?",
+    "How does potassium help grain quality?",
+]
+APP_SUFFIXES = ["", " Thanks!", " I farm in Punjab.", " Please be brief."]
+APP_VOCABULARY = ["nitrogen", "phosphorus", "potassium", "npk", "wheat", "maize", "rice", "root", "drought", "grain",
+                  "sowing", "hectare", "compost", "manure", "organic", "vermicompost", "soil", "structure", "test",
+                  "zinc", "leaves", "tillering", "transplanting", "fertilizers", "quality"]
+
+
+def stub_embedding(text, dim=64):
+    """Deterministic unit vector of the vocabulary terms in text (a floor term keeps it non-zero)"""
+    import numpy as np
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[dim - 1] = 0.1
+    words = [word.strip('.,!?:;').lower() for word in text.split()]
+    for word in words:
+        if word in APP_VOCABULARY:
+            vector[zlib.crc32(word.encode()) % (dim - 1)] += 1.0
+    return vector / np.linalg.norm(vector)
+
+
+class StubEmbeddingService:
+    """EmbeddingService stand-in: stub_embedding after a simulated HuggingFace round trip"""
+
+    model_name = "load-test-stub"
+    api_url = "stub://embeddings"
+    embedding_dim = 64
+
+    def generate_embedding(self, text):
+        time.sleep(SIMULATED_UPSTREAM_SECONDS / 2)
+        return stub_embedding(text).tolist()
+
+    def generate_embeddings(self, texts, **kwargs):
+        import numpy as np
+        time.sleep(SIMULATED_UPSTREAM_SECONDS / 2)
+        return np.vstack([stub_embedding(text) for text in texts])
+
+
+class StubDatabaseService:
+    """DatabaseService stand-in serving APP_DOCUMENTS from memory"""
+
+    def __init__(self):
+        from chunking import split_sentences
+        self.documents = [
+            {"id": i, "title": title, "content": content, "metadata": metadata, "embedding": stub_embedding(f"{title} {content}")}
+            for i, (title, content, metadata) in enumerate(APP_DOCUMENTS, 1)
+        ]
+        self.sentences = {
+            doc["id"]: [(sentence, stub_embedding(sentence).tolist()) for sentence in split_sentences(doc["content"])]
+            for doc in self.documents
+        }
+
+    def warm_up(self):
+        pass
+
+    def pool_stats(self):
+        return {}
+
+    def kb_version(self):
+        return 1
+
+    def _row(self, doc, score):
+        return {"id": doc["id"], "title": doc["title"], "content": doc["content"], "metadata": doc["metadata"],
+                "similarity_score": score}
+
+    def search_similar_documents(self, query_embedding, limit=3, similarity_threshold=0.7, query_text=None):
+        import numpy as np
+        query = np.asarray(query_embedding, dtype=np.float32)
+        scored = [(float(doc["embedding"] @ query), doc) for doc in self.documents]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [self._row(doc, score) for score, doc in scored[:limit] if score > similarity_threshold]
+
+    def lexical_search_documents(self, query_text, query_embedding, limit=10):
+        import numpy as np
+        terms = {word.strip('.,!?:;').lower() for word in query_text.split()} & set(APP_VOCABULARY)
+        matches = [doc for doc in self.documents if terms & set(doc["content"].lower().replace('.', ' ').split())]
+        query = None if query_embedding is None else np.asarray(query_embedding, dtype=np.float32)
+        return [self._row(doc, 0.0 if query is None else float(doc["embedding"] @ query)) for doc in matches[:limit]]
+
+    def document_fingerprints(self, doc_ids):
+        return {doc["id"]: hashlib.md5(f"{doc['title']}\n{doc['content']}".encode("utf-8")).hexdigest()
+                for doc in self.documents if doc["id"] in doc_ids}
+
+    def document_sentences(self, doc_ids):
+        return {doc_id: self.sentences[doc_id] for doc_id in doc_ids if doc_id in self.sentences}
+
+
+def load_chat_module():
+    """Import api/chat.py by path (backend/api holds another index.py)"""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api', 'chat.py')
+    spec = importlib.util.spec_from_file_location('load_test_chat', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def app_test():
+    # No answer caches, so every request runs the embedding cache, retriever, FAQ router and an
+    # answerer; no disk tier, so nothing is left behind
+    os.environ.update(RESPONSE_CACHE_BACKEND='none', SEMANTIC_CACHE_ENABLED='false', EMBEDDING_CACHE_PATH='',
+                      VECTOR_INDEX_ENABLED='false', PASSAGE_RETRIEVAL_ENABLED='false')
+    chat = load_chat_module()
+    logging.getLogger().setLevel(logging.WARNING)  # api/chat.py logs every routing decision at INFO
+    generated = []
+    generated_lock = threading.Lock()
+
+    class StubGeminiService(chat.GeminiService):
+        """The real prompt building and context packing, then a simulated Gemini call"""
+
+        def generate_response(self, query, context_documents):
+            payload, sources = self.build_request(query, context_documents)
+            time.sleep(SIMULATED_UPSTREAM_SECONDS)
+            with generated_lock:
+                generated.append(query)
+            return {"answer": f"Answer from {len(sources)} documents.", "sources": sources, "context_used": len(sources)}
+
+        def stream_response(self, query, context_documents):
+            yield self.generate_response(query, context_documents)["answer"]
+
+    def create_chatbot():
+        with mock.patch('embeddings.EmbeddingService', StubEmbeddingService), \
+                mock.patch('database.DatabaseService', StubDatabaseService), \
+                mock.patch.object(chat, 'GeminiService', StubGeminiService):
+            return chat.RAGChatbot()
+
+    class AppHandler(chat.handler):
+        lazy_chatbot = chat.Lazy(create_chatbot)
+
+        def log_message(self, format, *args):
+            pass
+
+    def check(body, payload):
+        answer = json.loads(payload)
+        return bool(answer.get("response")) and answer.get("context_used", 0) > 0 and not answer.get("degraded")
+
+    bodies = [json.dumps({"message": question + suffix, "mode": mode})
+              for suffix in APP_SUFFIXES for question in APP_QUESTIONS for mode in ("generative", "extractive")]
+    workers = max(CONCURRENCY_LEVELS)
+    print(f"\n🌾 api/chat.py handler on PooledHTTPServer ({workers} workers, stubbed upstreams, {len(bodies)} distinct questions)")
+    print("-" * 50)
+    server = PooledHTTPServer(('127.0.0.1', 0), keep_alive_handler(AppHandler), workers=workers)
+    failures = []
+    run_levels(serve_in_background(server), bodies, check=check, failures=failures)
+    server.shutdown()
+    server.server_close()
+
+    # Every request is counted exactly once, however many threads raced on the shared services
+    chatbot = AppHandler.lazy_chatbot.get()
+    requests_sent = sum(CONCURRENCY_LEVELS) * REQUESTS_PER_CLIENT
+    embeddings = chatbot.embedding_service.stats()
+    embedding_lookups = embeddings["hits_memory"] + embeddings["hits_disk"] + embeddings["misses"]
+    faq_answers = chatbot.faq_router.stats()["decisions"].get("faq", 0) if chatbot.faq_router is not None else 0
+    extractive = chatbot.extractive.stats() if chatbot.extractive is not None else {"answered": 0, "declined": 0}
+    print(f"\n📊 embedding cache: {embedding_lookups} lookups for {requests_sent} requests "
+          f"({embeddings['hits_memory']} memory hits, {embeddings['misses']} embedded)")
+    print(f"📊 answers: {faq_answers} FAQ, {extractive['answered']} extractive ({extractive['declined']} declined), "
+          f"{len(generated)} Gemini")
+    counted = (embedding_lookups == requests_sent
+               and faq_answers + extractive["answered"] + len(generated) == requests_sent)
+    if not counted:
+        print("❌ Shared counters lost updates under concurrency")
+    return counted and not any(failures)
+
+def main():
+    print("🚀 HTTP Server Load Test")
+    print("=" * 50)
+    if '--app' in sys.argv:
+        success = app_test()
+        print("✅ Chat handler answered every request under concurrency" if success else "❌ Chat handler failed under concurrency")
+        return success
+    if '--prefork' in sys.argv:
+        success = prefork_test()
+        print("✅ Prefork load test passed" if success else "❌ Throughput did not scale with cores")
+        return success
+    if len(sys.argv) > 1:
+        url = sys.argv[1]
+        body = json.dumps({"message": sys.argv[2]}) if len(sys.argv) > 2 else None
+        print(f"\n🎯 {url}")
+        print("-" * 50)
+        run_levels(url, body)
+        return True
+
+    success = self_test()
+    print("✅ Throughput scales with concurrency" if success else "❌ Throughput did not scale with concurrency")
+    return success
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,176 @@
+import os
+import time
+import bisect
+import threading
+import contextvars
+
+# Stdlib only: the entry points import this at module load (see test_import_time.py)
+
+# Metrics configuration
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').strip().lower() in ('1', 'true', 'yes')
+
+# Log-spaced histogram bounds (seconds): 0.5 ms doubling every two buckets up to ~90 s,
+# so any latency lands in a bucket within ~41% of its value
+LATENCY_BUCKETS = tuple(0.0005 * 2 ** (i / 2) for i in range(36))
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_HELP = {
+    'rag_stage_duration_seconds': ('histogram', 'Time spent in each request stage'),
+    'rag_cache_requests_total': ('counter', 'Cache lookups by cache and result'),
+    'rag_upstream_retries_total': ('counter', 'Retried upstream calls'),
+    'rag_upstream_timeouts_total': ('counter', 'Upstream calls that timed out'),
+    'rag_upstream_hedges_total': ('counter', 'Hedged upstream calls by the attempt that answered first'),
+    'rag_deadline_exceeded_total': ('counter', 'Stages skipped or cut short by the request deadline'),
+    'rag_circuit_breaker_transitions_total': ('counter', 'Circuit breaker state changes by upstream and new state'),
+    'rag_circuit_breaker_rejections_total': ('counter', 'Upstream calls refused by an open circuit breaker'),
+}
+
+_lock = threading.Lock()
+_histograms = {}  # stage -> [bucket counts..., +Inf count], sum
+_counters = {}  # (name, labels) -> value
+_request_timings = contextvars.ContextVar('request_timings', default=None)  # (start, {stage: seconds})
+
+
+class _Timer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(stage):
+    """Context manager recording the duration of the block under stage"""
+    return _Timer(stage) if METRICS_ENABLED else _NULL_TIMER
+
+
+def observe(stage, seconds):
+    """Record one stage duration in its histogram and the current request's Server-Timing"""
+    if not METRICS_ENABLED:
+        return
+    index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0]
+        histogram[0][index] += 1
+        histogram[1] += seconds
+    current = _request_timings.get()
+    if current is not None:
+        stages = current[1]
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+def _increment(name, labels, amount=1):
+    if not METRICS_ENABLED or not amount:
+        return
+    key = (name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def count_cache(cache, hit, amount=1):
+    """Count lookups against a cache (response, semantic, embedding, faq)"""
+    _increment('rag_cache_requests_total', (('cache', cache), ('result', 'hit' if hit else 'miss')), amount)
+
+
+def count_retry(upstream):
+    _increment('rag_upstream_retries_total', (('upstream', upstream),))
+
+
+def count_timeout(upstream):
+    _increment('rag_upstream_timeouts_total', (('upstream', upstream),))
+
+
+def count_hedge(upstream, winner):
+    _increment('rag_upstream_hedges_total', (('upstream', upstream), ('winner', winner)))
+
+
+def count_deadline_exceeded(stage):
+    _increment('rag_deadline_exceeded_total', (('stage', stage),))
+
+
+def count_breaker_transition(upstream, state):
+    _increment('rag_circuit_breaker_transitions_total', (('upstream', upstream), ('state', state)))
+
+
+def count_breaker_rejection(upstream):
+    _increment('rag_circuit_breaker_rejections_total', (('upstream', upstream),))
+
+
+def begin_request():
+    """Start collecting stage timings for the request handled by this thread"""
+    _request_timings.set((time.perf_counter(), {}))
+
+
+def server_timing_header():
+    """Server-Timing value for the current request (stages in ms, in the order they ran), or None"""
+    current = _request_timings.get()
+    if current is None:
+        return None
+    start, stages = current
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in stages.items()]
+    parts.append(f"total;dur={(time.perf_counter() - start) * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def _format_labels(labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}" if labels else ""
+
+
+def render_prometheus():
+    """All metrics of this process in the Prometheus text exposition format"""
+    with _lock:
+        histograms = {stage: (list(counts), total) for stage, (counts, total) in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    if histograms:
+        name = 'rag_stage_duration_seconds'
+        kind, help_text = _HELP[name]
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for stage, (counts, total) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:.6g}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {cumulative}')
+
+    for name in sorted({name for name, _ in counters}):
+        kind, help_text = _HELP.get(name, ('counter', name))
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for (counter, labels), value in sorted(counters.items()):
+            if counter == name:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Drop every recorded metric (tests and benchmarks)"""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
@@ -0,0 +1,80 @@
+import os
+import time
+import logging
+
+import psycopg2.errors
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Passage retrieval configuration
+PASSAGE_RETRIEVAL_ENABLED = os.getenv('PASSAGE_RETRIEVAL_ENABLED', 'true').strip().lower() in ('1', 'true', 'yes')
+PASSAGE_CANDIDATES_PER_RESULT = int(os.getenv('PASSAGE_CANDIDATES_PER_RESULT', '3'))  # passages fetched per requested document
+PASSAGES_PER_DOCUMENT = int(os.getenv('PASSAGES_PER_DOCUMENT', '3'))  # matched passages assembled into each parent
+PASSAGE_RECHECK_INTERVAL = float(os.getenv('PASSAGE_RECHECK_INTERVAL', '60'))  # seconds before retrying a missing table
+
+
+class PassageRetriever:
+    """Retrieval over document_passages, assembled back into parent documents.
+
+    Each result is shaped like a documents row, but its content is only the
+    matched passages of that parent, in document order, so a hit on one
+    section of a long guide doesn't pull the whole guide into the prompt.
+    Exposes the same search_similar_documents interface as DatabaseService and
+    falls back to document-level search while the passages table is missing
+    or empty (run chunk_documents.py to backfill).
+    """
+
+    def __init__(self, db_service, candidates_per_result=PASSAGE_CANDIDATES_PER_RESULT,
+                 passages_per_document=PASSAGES_PER_DOCUMENT):
+        self.db_service = db_service
+        self.candidates_per_result = candidates_per_result
+        self.passages_per_document = passages_per_document
+        self._unavailable_since = None
+
+    def search_similar_documents(self, query_embedding, limit=3, similarity_threshold=0.7, query_text=None):
+        """Search passages and return their parents with assembled passage context"""
+        if self._unavailable_since is not None:
+            if time.monotonic() - self._unavailable_since < PASSAGE_RECHECK_INTERVAL:
+                return self.db_service.search_similar_documents(query_embedding, limit=limit, similarity_threshold=similarity_threshold)
+            self._unavailable_since = None
+
+        try:
+            passages = self.db_service.search_similar_passages(
+                query_embedding, limit=limit * self.candidates_per_result, similarity_threshold=similarity_threshold
+            )
+        except psycopg2.errors.UndefinedTable:
+            logger.warning("document_passages missing - using document-level search until setup_database() runs")
+            self._unavailable_since = time.monotonic()
+            passages = None
+
+        if not passages:
+            # Also covers a created-but-empty table (not backfilled yet)
+            return self.db_service.search_similar_documents(query_embedding, limit=limit, similarity_threshold=similarity_threshold)
+
+        # Group by parent, ranked by each parent's best passage
+        parents = {}
+        for passage in passages:
+            parent = parents.get(passage['id'])
+            if parent is None:
+                if len(parents) >= limit:
+                    continue
+                parent = parents[passage['id']] = {
+                    "id": passage['id'],
+                    "title": passage['title'],
+                    "metadata": passage['metadata'],
+                    "similarity_score": float(passage['similarity_score']),
+                    # Fingerprint of the whole parent, since content below is only part of it
+                    "fingerprint": passage['fingerprint'],
+                    "passages": []
+                }
+            if len(parent['passages']) < self.passages_per_document:
+                parent['passages'].append((passage['passage_index'], passage['content']))
+
+        results = []
+        for parent in parents.values():
+            ordered = sorted(parent.pop('passages'))
+            parent['content'] = "\n...\n".join(content for _, content in ordered)
+            parent['passage_indexes'] = [index for index, _ in ordered]
+            results.append(parent)
+        return results
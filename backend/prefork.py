@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Prefork launcher: N worker processes serving the chat API on one port.
+
+The master opens one SO_REUSEPORT listening socket per worker slot (the
+kernel spreads connections across them) and each worker serves its slot's
+socket with the same thread-pool, keep-alive server as `python api/chat.py`,
+so JSON encoding, prompt building and vector math use every core instead of
+one GIL. The master keeps the sockets open, so connections queued on a slot
+while its worker is replaced are picked up by the successor, not reset.
+
+With VECTOR_INDEX_ENABLED the master loads the document matrix once and
+publishes it to a snapshot file that every worker mmaps read-only, so N
+workers share one copy; it republishes every
+VECTOR_INDEX_FULL_RELOAD_INTERVAL. The file lives in a private (0700)
+directory the master creates on tmpfs for its lifetime, and its path reaches
+the workers through VECTOR_INDEX_SHARED_PATH.
+
+The response cache backend is not changed: with the default 'memory' backend
+every worker keeps its own cached answers. Set RESPONSE_CACHE_BACKEND=disk
+(or kv) to share them across workers (the SQLite embedding cache tier is
+shared already).
+
+Signals (to the master):
+    SIGHUP           republish the snapshot, start a new worker generation,
+                     then drain and stop the old one (zero-downtime reload;
+                     the app module is re-imported, shared backend modules
+                     the master imports need a full restart)
+    SIGTERM / SIGINT drain all workers and exit
+
+Usage:
+    python prefork.py [path/to/app.py]    (default: api/chat.py; PORT, HOST, PREFORK_WORKERS)
+"""
+
+import os
+import sys
+import time
+import shutil
+import select
+import signal
+import logging
+import tempfile
+import threading
+import traceback
+import importlib.util
+from dotenv import load_dotenv
+
+# Load environment variables before shared modules read their configuration
+load_dotenv()
+
+PORT = int(os.getenv('PORT', 8000))
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from http_server import PooledHTTPServer, keep_alive_handler, reuse_port_socket, SERVER_HOST, SERVER_WORKERS
+from db_pool import get_pool
+from database import DatabaseService
+from response_cache import RESPONSE_CACHE_BACKEND
+from vector_index import InMemoryVectorIndex, VECTOR_INDEX_ENABLED, VECTOR_INDEX_FULL_RELOAD_INTERVAL
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(levelname)s %(message)s')
+logger = logging.getLogger(__name__)
+
+# Prefork configuration
+PREFORK_WORKERS = int(os.getenv('PREFORK_WORKERS', str(os.cpu_count() or 1)))  # processes
+PREFORK_GRACEFUL_TIMEOUT = float(os.getenv('PREFORK_GRACEFUL_TIMEOUT', '30'))  # seconds a draining worker gets before SIGKILL
+PREFORK_READY_TIMEOUT = float(os.getenv('PREFORK_READY_TIMEOUT', '60'))  # seconds for a new worker to import the app and bind
+PREFORK_RESPAWN_DELAY = 1.0  # back-off when a worker dies right after starting
+PREFORK_SNAPSHOT_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()  # tmpfs where available
+
+DEFAULT_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api', 'chat.py')
+
+
+def load_app(app_path):
+    """Import the module that defines the `handler` class"""
+    spec = importlib.util.spec_from_file_location('rag_app', app_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_worker(app_path, listen_socket, threads, ready_fd):
+    """Worker process body: import the app, serve the slot's socket until SIGTERM"""
+    # Ctrl-C reaches the whole process group; the master coordinates the shutdown
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    module = load_app(app_path)
+    server = PooledHTTPServer(None, keep_alive_handler(module.handler), workers=threads, listen_socket=listen_socket)
+    # serve_forever() can only be stopped from another thread
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown, daemon=True).start())
+
+    try:
+        os.write(ready_fd, b'1')
+    except OSError:
+        pass  # respawned workers are not waited on
+    os.close(ready_fd)
+
+    server.serve_forever()
+    server.server_close()  # waits for in-flight requests
+
+
+def publish_snapshot(path):
+    """Load the document matrix from Postgres and publish it for workers to mmap"""
+    db_service = DatabaseService()
+    if not db_service.db_url:
+        return False
+    start = time.perf_counter()
+    index = InMemoryVectorIndex(db_service, shared_path='')
+    try:
+        published = index.load() and index.publish(path)
+    finally:
+        # Forked workers must not inherit the master's database sockets
+        get_pool(db_service.db_url).close_all()
+    if published:
+        logger.info(f"Published vector snapshot ({len(index)} documents) to {path} in {time.perf_counter() - start:.2f}s")
+    return published
+
+
+class PreforkMaster:
+    """Spawns, supervises and rolls generations of worker processes"""
+
+    def __init__(self, app_path, host=SERVER_HOST, port=PORT, workers=PREFORK_WORKERS, threads=SERVER_WORKERS,
+                 share_snapshot=VECTOR_INDEX_ENABLED):
+        self.app_path = app_path
+        self.host = host
+        self.port = port
+        self.num_workers = workers
+        self.threads = threads
+        self.share_snapshot = share_snapshot
+        self.snapshot_dir = None  # private directory holding the snapshot, created in run()
+        self.snapshot_path = None
+        self.generation = 0
+        self.sockets = []  # one SO_REUSEPORT listener per worker slot, outliving the workers
+        self.workers = {}  # pid -> (generation, slot, started_at)
+        self.draining = {}  # pid -> SIGKILL deadline
+        self.pending = []  # signals received, handled by the main loop
+
+    def spawn(self, slot):
+        """Fork one worker of the current generation for a socket slot; returns (pid, ready pipe read end)"""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            for other, sock in enumerate(self.sockets):
+                if other != slot:
+                    sock.close()
+            code = 0
+            try:
+                run_worker(self.app_path, self.sockets[slot], self.threads, write_fd)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(write_fd)
+        self.workers[pid] = (self.generation, slot, time.monotonic())
+        return pid, read_fd
+
+    def spawn_generation(self):
+        """Start a full generation of workers and wait until they are listening; returns their pids"""
+        self.generation += 1
+        spawned = dict(self.spawn(slot) for slot in range(self.num_workers))
+        waiting = {fd: pid for pid, fd in spawned.items()}
+        ready = []
+        deadline = time.monotonic() + PREFORK_READY_TIMEOUT
+        while waiting:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select(list(waiting), [], [], remaining)
+            for fd in readable:
+                if os.read(fd, 1):  # EOF without a byte: the worker died during startup
+                    ready.append(waiting[fd])
+                os.close(fd)
+                del waiting[fd]
+        for fd in waiting:
+            os.close(fd)
+        logger.info(f"Generation {self.generation}: {len(ready)}/{self.num_workers} workers listening on {self.host}:{self.port}")
+        return ready
+
+    def terminate(self, pids):
+        """Ask workers to drain and exit; they are killed if still alive after the graceful timeout"""
+        deadline = time.monotonic() + PREFORK_GRACEFUL_TIMEOUT
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                self.draining[pid] = deadline
+            except ProcessLookupError:
+                pass
+
+    def reload(self):
+        """Roll to a new generation: start it, then drain the old one"""
+        old = [pid for pid, (generation, _, _) in self.workers.items() if generation == self.generation]
+        if self.snapshot_path:
+            publish_snapshot(self.snapshot_path)
+        ready = self.spawn_generation()
+        if not ready:
+            logger.error("New generation failed to start; keeping the current workers")
+            self.terminate([pid for pid, (generation, _, _) in self.workers.items() if generation == self.generation])
+            self.generation -= 1
+            return
+        self.terminate(old)
+
+    def reap(self):
+        """Collect exited workers, respawning current-generation ones that died unexpectedly"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.draining.pop(pid, None)
+            generation, slot, started_at = self.workers.pop(pid, (None, None, 0.0))
+            if generation == self.generation:
+                logger.warning(f"Worker {pid} exited with status {status}; respawning")
+                if time.monotonic() - started_at < PREFORK_RESPAWN_DELAY:
+                    time.sleep(PREFORK_RESPAWN_DELAY)  # avoid a tight crash loop
+                _, read_fd = self.spawn(slot)
+                os.close(read_fd)
+
+    def kill_overdue(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.draining.items()):
+            if now >= deadline:
+                logger.warning(f"Worker {pid} did not drain in {PREFORK_GRACEFUL_TIMEOUT}s; killing")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                del self.draining[pid]
+
+    def stop(self):
+        """Drain every worker, then exit"""
+        self.generation += 1  # nothing running is current any more, so nothing respawns
+        self.terminate(list(self.workers))
+        while self.workers:
+            self.reap()
+            self.kill_overdue()
+            time.sleep(0.1)
+        for sock in self.sockets:
+            sock.close()
+        if self.snapshot_dir:
+            shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+
+    def run(self):
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda signum, frame: self.pending.append(signum))
+
+        self.sockets = [reuse_port_socket(self.host, self.port) for _ in range(self.num_workers)]
+        if self.share_snapshot:
+            # mkdtemp creates the directory 0700: no other user can plant or swap the file workers map
+            self.snapshot_dir = tempfile.mkdtemp(prefix=f'rag-vector-index-{self.port}-', dir=PREFORK_SNAPSHOT_DIR)
+            self.snapshot_path = os.path.join(self.snapshot_dir, 'snapshot.bin')
+            # Forked workers inherit the environment; their vector index reads the path from it
+            os.environ['VECTOR_INDEX_SHARED_PATH'] = self.snapshot_path
+        if RESPONSE_CACHE_BACKEND == 'memory' and self.num_workers > 1:
+            logger.info("RESPONSE_CACHE_BACKEND=memory: each worker caches answers separately (set 'disk' or 'kv' to share)")
+        if self.snapshot_path and not publish_snapshot(self.snapshot_path):
+            logger.warning("Vector snapshot not published; workers will load their own copies")
+        if not self.spawn_generation():
+            logger.error("No worker started")
+            self.stop()
+            return False
+        next_publish = time.monotonic() + VECTOR_INDEX_FULL_RELOAD_INTERVAL
+
+        while True:
+            while self.pending:
+                signum = self.pending.pop(0)
+                if signum == signal.SIGHUP:
+                    logger.info("SIGHUP: reloading workers")
+                    self.reload()
+                    next_publish = time.monotonic() + VECTOR_INDEX_FULL_RELOAD_INTERVAL
+                else:
+                    logger.info("Shutting down")
+                    self.stop()
+                    return True
+            if self.snapshot_path and time.monotonic() >= next_publish:
+                # Workers pick up the new file on their next refresh check
+                publish_snapshot(self.snapshot_path)
+                next_publish = time.monotonic() + VECTOR_INDEX_FULL_RELOAD_INTERVAL
+            self.reap()
+            self.kill_overdue()
+            try:
+                time.sleep(0.5)
+            except InterruptedError:
+                pass
+
+
+def main():
+    app_path = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_APP
+    master = PreforkMaster(app_path)
+    print(f"RAG Chatbot prefork master {os.getpid()}: {master.num_workers} workers x {master.threads} threads on http://{master.host}:{master.port}")
+    return master.run()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,642 @@
+import json
+import logging
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler
+
+from metrics import timed, count_cache, count_deadline_exceeded, begin_request, server_timing_header, render_prometheus, PROMETHEUS_CONTENT_TYPE
+from deadline import (deadline_scope, stage_timeout, sources_only_response, DeadlineExceeded,
+                      DEADLINE_CHAT, DEADLINE_CHAT_STREAM, DEADLINE_MIN_GENERATION)
+from circuit_breaker import breaker_stats, all_closed, UpstreamUnavailable
+
+# Stdlib only at import: the entry points import this at module load (see
+# test_import_time.py); the service modules load when a RAGChatbot is built.
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Per-request "mode": generated by Gemini, or quoted sentences (see extractive.py)
+ANSWER_MODES = ('generative', 'extractive')
+
+
+class RAGChatbot:
+    """Retrieval, caching, routing and answering shared by the entry points.
+
+    The entry points differ only in their Gemini client (api/chat.py calls the
+    REST API, backend/api/index.py the SDK), passed in as gemini_service: an
+    object with generate_response(query, documents), stream_response(query,
+    documents) and a packer (or None).
+    """
+
+    def __init__(self, gemini_service, top_k=5, similarity_threshold=0.5,
+                 no_documents_answer="I don't have information about that topic in my knowledge base."):
+        from embeddings import EmbeddingService
+        from database import DatabaseService
+        from vector_index import InMemoryVectorIndex, VECTOR_INDEX_ENABLED
+        from hybrid_search import HybridRetriever, HYBRID_SEARCH_ENABLED
+        from passage_retrieval import PassageRetriever, PASSAGE_RETRIEVAL_ENABLED
+        from embedding_cache import CachedEmbeddingService
+        from embedding_batcher import EmbeddingBatcher
+        from semantic_cache import SemanticAnswerCache, SEMANTIC_CACHE_ENABLED
+        from response_cache import create_response_cache
+        from faq_router import FAQRouter, FAQ_FAST_PATH_ENABLED
+        from extractive import ExtractiveAnswerer, EXTRACTIVE_ENABLED
+
+        self.top_k = top_k
+        self.similarity_threshold = similarity_threshold
+        self.no_documents_answer = no_documents_answer
+        self.embedding_service = CachedEmbeddingService(EmbeddingBatcher(EmbeddingService()))
+        self.db_service = DatabaseService()
+        # Optional in-process snapshot or passage-level search, all serving the same interface
+        self.vector_index = InMemoryVectorIndex(self.db_service) if VECTOR_INDEX_ENABLED else None
+        if self.vector_index is not None:
+            self.retriever = self.vector_index
+        elif PASSAGE_RETRIEVAL_ENABLED:
+            self.retriever = PassageRetriever(self.db_service)
+        else:
+            self.retriever = self.db_service
+        if HYBRID_SEARCH_ENABLED:
+            self.retriever = HybridRetriever(self.retriever, self.db_service)
+        # Answers for paraphrased questions, invalidated when a contributing document changes
+        self.answer_cache = SemanticAnswerCache(validator=self.db_service.document_fingerprints) if SEMANTIC_CACHE_ENABLED else None
+        # Exact-match responses keyed on the knowledge-base version (memory, disk or shared KV)
+        self.response_cache = create_response_cache(self.db_service.kb_version)
+        # Confident FAQ matches are answered from the stored text without an LLM call
+        self.faq_router = FAQRouter() if FAQ_FAST_PATH_ENABLED else None
+        # Quotes stored sentences: mode="extractive", and the answer when Gemini can't be used
+        self.extractive = ExtractiveAnswerer(self.db_service) if EXTRACTIVE_ENABLED else None
+        self.gemini_service = gemini_service
+
+    def warm_up(self):
+        """Open database connections and load the vector snapshot"""
+        self.db_service.warm_up()
+        if self.vector_index is not None:
+            self.vector_index.warm_up()
+
+    def start_warm_up(self):
+        """Warm up on a background thread, overlapping the first request's embedding call"""
+        threading.Thread(target=self.warm_up, name="chatbot-warm-up", daemon=True).start()
+
+    def setup(self):
+        """Setup the chatbot (database, etc.)"""
+        return self.db_service.setup_database()
+
+    def add_document(self, title, content, metadata=None):
+        """Add a document to the knowledge base"""
+        from passage_retrieval import PASSAGE_RETRIEVAL_ENABLED
+        from chunking import index_document_passages, index_document_sentences
+        try:
+            # Generate embedding for the document
+            embedding = self.embedding_service.generate_embedding(content)
+            if embedding is None:
+                return False
+
+            # Store in database
+            success = self.db_service.insert_document(title, content, embedding, metadata)
+            if success and PASSAGE_RETRIEVAL_ENABLED:
+                index_document_passages(self.db_service, self.embedding_service, success, title, content)
+            if success and self.extractive is not None:
+                index_document_sentences(self.db_service, self.embedding_service, success, title, content)
+            if success and self.answer_cache is not None:
+                # A new document can change the best answer to any cached question
+                self.answer_cache.clear()
+            return success
+
+        except Exception as e:
+            logger.error(f"Error adding document: {str(e)}")
+            return False
+
+    def add_documents(self, documents, replace=False):
+        """Upsert many documents by title (unchanged content is not re-embedded); returns a throughput report"""
+        from passage_retrieval import PASSAGE_RETRIEVAL_ENABLED
+        from bulk_ingest import BulkIngestor
+        ingestor = BulkIngestor(self.db_service, self.embedding_service, with_passages=PASSAGE_RETRIEVAL_ENABLED,
+                                with_sentences=self.extractive is not None)
+        report = ingestor.ingest(documents, replace=replace)
+        if report.get("changed") and self.answer_cache is not None:
+            self.answer_cache.clear()
+        return report
+
+    def retrieve(self, query, mode='generative'):
+        """Embed the query and fetch context; returns (query_embedding, documents, early_response).
+
+        Without an embedding (HuggingFace down or its breaker open) the context
+        comes from full-text search alone and query_embedding is None. The
+        semantic answer cache only holds generated answers, so it is consulted
+        for generative requests only.
+        """
+        # Step 1: Generate embedding for the query
+        with timed('embed'):
+            query_embedding = self.embedding_service.generate_embedding(query)
+        if query_embedding is None:
+            with timed('search'):
+                similar_docs = self.lexical_retrieve(query)
+            if similar_docs:
+                return None, similar_docs, None
+            return None, [], {
+                "answer": "Sorry, I couldn't process your question at this time.",
+                "sources": [],
+                "context_used": 0,
+                "error": "Failed to generate query embedding"
+            }
+
+        # Near-identical earlier question: answer without retrieval or Gemini
+        if self.answer_cache is not None and mode == 'generative':
+            cached = self.answer_cache.lookup(query_embedding)
+            count_cache('semantic', cached is not None)
+            if cached is not None:
+                return query_embedding, [], cached
+
+        # Step 2: Search for similar documents above the similarity threshold (top-K)
+        with timed('search'):
+            similar_docs = self.retriever.search_similar_documents(
+                query_embedding,
+                limit=self.top_k,
+                similarity_threshold=self.similarity_threshold,
+                query_text=query
+            )
+
+        if not similar_docs:
+            return query_embedding, [], {
+                "answer": self.no_documents_answer,
+                "sources": [],
+                "context_used": 0
+            }
+
+        if self.answer_cache is not None:
+            self.answer_cache.observe_documents(similar_docs)
+        return query_embedding, similar_docs, None
+
+    def lexical_retrieve(self, query, limit=None):
+        """Full-text search for when the query cannot be embedded; [] if that fails too"""
+        try:
+            similar_docs = self.db_service.lexical_search_documents(query, None, limit=limit or self.top_k)
+        except Exception as e:
+            logger.error(f"Lexical fallback search failed: {str(e)}")
+            return []
+        if similar_docs:
+            logger.warning(f"Query embedding unavailable; answering from {len(similar_docs)} full-text matches")
+        return similar_docs
+
+    def lookup_response(self, namespace, query, top_k=None, similarity_threshold=None):
+        """Exact response cache lookup; returns (key, response)"""
+        if self.response_cache is None:
+            return None, None
+        top_k = top_k or self.top_k
+        similarity_threshold = self.similarity_threshold if similarity_threshold is None else similarity_threshold
+        with timed('cache_lookup'):
+            key, response = self.response_cache.lookup(namespace, query, top_k, similarity_threshold)
+        count_cache('response', response is not None)
+        return key, response
+
+    def store_response(self, key, response):
+        """Cache a successful response under a key from lookup_response"""
+        if self.response_cache is not None and key and response.get("context_used") and not response.get("error") and not response.get("degraded"):
+            self.response_cache.store(key, response)
+
+    def route_faq(self, query, similar_docs):
+        """Stored FAQ answer for a confident top hit, or None to use Gemini"""
+        if self.faq_router is None:
+            return None
+        response = self.faq_router.route(query, similar_docs)
+        count_cache('faq', response is not None)
+        return response
+
+    def extract(self, query_embedding, similar_docs):
+        """Extractive answer quoting the best stored sentences, or None if none is close enough"""
+        if self.extractive is None or query_embedding is None:
+            return None
+        with timed('extract'):
+            return self.extractive.answer(query_embedding, similar_docs)
+
+    def answer_without_gemini(self, query_embedding, similar_docs, reason):
+        """Extractive answer, else the top FAQ/excerpt answer, marked degraded with reason"""
+        from faq_router import fallback_response
+        response = self.extract(query_embedding, similar_docs)
+        if response is not None:
+            response["degraded"] = reason
+            return response
+        return fallback_response(similar_docs, reason)
+
+    def generation_budget(self):
+        """Seconds generation needs: Gemini's median latency, at least DEADLINE_MIN_GENERATION"""
+        from hedging import tracker
+        return max(DEADLINE_MIN_GENERATION, tracker('gemini').percentile(50) or 0.0)
+
+    def generate(self, query, similar_docs, query_embedding=None):
+        """Gemini answer, or an answer without it when Gemini is unavailable or would overrun the deadline"""
+        try:
+            # Skip generation that would not finish in time, rather than start it and cut it off
+            stage_timeout(minimum=self.generation_budget())
+            return self.gemini_service.generate_response(query, similar_docs)
+        except DeadlineExceeded as e:
+            count_deadline_exceeded('generate')
+            logger.warning(f"Answering without Gemini: {str(e)}")
+            return self.answer_without_gemini(query_embedding, similar_docs, "deadline")
+        except UpstreamUnavailable as e:
+            logger.warning(f"Answering without Gemini: {str(e)}")
+            return self.answer_without_gemini(query_embedding, similar_docs, "gemini_unavailable")
+
+    def answer_directly(self, query, query_embedding, similar_docs, mode):
+        """Answer that needs no generation: a confident FAQ match, or quoted sentences in extractive mode"""
+        response = self.route_faq(query, similar_docs)
+        if response is None and mode == 'extractive':
+            response = self.extract(query_embedding, similar_docs)
+        return response
+
+    def remember_answer(self, query_embedding, similar_docs, response):
+        """Cache a generated answer unless generation failed (extractive answers are not served for generative requests)"""
+        if (self.answer_cache is not None and response.get("context_used") and not response.get("error")
+                and not response.get("degraded") and response.get("route") != "extractive"):
+            self.answer_cache.store(query_embedding, similar_docs, response)
+
+    def chat(self, query, deadline=None, mode='generative'):
+        """Process a chat query using RAG pipeline, within deadline seconds if given.
+
+        mode="extractive" answers with quoted sentences when one is close
+        enough, and only generates when none is.
+        """
+        with timed('chat'), deadline_scope(deadline):
+            try:
+                # Identical question against an unchanged knowledge base: skip the whole pipeline
+                cache_key, cached = self.lookup_response(response_namespace('chat', mode), query)
+                if cached is not None:
+                    return cached
+
+                query_embedding, similar_docs, early_response = self.retrieve(query, mode)
+                if early_response:
+                    self.store_response(cache_key, early_response)
+                    return early_response
+
+                # Step 3: Generate response using context
+                response = self.answer_directly(query, query_embedding, similar_docs, mode) or self.generate(query, similar_docs, query_embedding)
+                if query_embedding is None and not response.get("degraded"):
+                    # Full-text context only: serve it, but do not cache it past the outage
+                    response = dict(response, degraded="lexical_retrieval")
+                self.remember_answer(query_embedding, similar_docs, response)
+                self.store_response(cache_key, response)
+
+                return response
+
+            except Exception as e:
+                logger.error(f"Error in chat processing: {str(e)}")
+                return {
+                    "answer": "An error occurred while processing your question.",
+                    "sources": [],
+                    "context_used": 0,
+                    "error": str(e)
+                }
+
+    def chat_stream(self, query, deadline=None, mode='generative'):
+        """Streaming variant of chat: yields one sources event, token events and a done (or error) event"""
+        with timed('chat_stream'), deadline_scope(deadline):
+            try:
+                cache_key, cached = self.lookup_response(response_namespace('chat', mode), query)
+                if cached is not None:
+                    query_embedding, similar_docs, early_response = None, [], cached
+                else:
+                    query_embedding, similar_docs, early_response = self.retrieve(query, mode)
+                    if early_response:
+                        self.store_response(cache_key, early_response)
+                if early_response:
+                    yield from stream_whole(early_response)
+                    return
+
+                direct_response = self.answer_directly(query, query_embedding, similar_docs, mode)
+                if direct_response:
+                    if query_embedding is None and not direct_response.get("degraded"):
+                        direct_response = dict(direct_response, degraded="lexical_retrieval")
+                    yield from stream_whole(direct_response)
+                    self.remember_answer(query_embedding, similar_docs, direct_response)
+                    self.store_response(cache_key, direct_response)
+                    return
+
+                yield {
+                    "type": "sources",
+                    "sources": [doc['title'] for doc in similar_docs],
+                    "context_used": len(similar_docs)
+                }
+                parts = []
+                try:
+                    stage_timeout(minimum=self.generation_budget())
+                    for text in self.gemini_service.stream_response(query, similar_docs):
+                        parts.append(text)
+                        yield {"type": "token", "text": text}
+                except (DeadlineExceeded, UpstreamUnavailable) as e:
+                    reason = "deadline" if isinstance(e, DeadlineExceeded) else "gemini_unavailable"
+                    if reason == "deadline":
+                        count_deadline_exceeded('generate')
+                    logger.warning(f"Stream answered without Gemini: {str(e)}")
+                    if parts:
+                        # Tokens already sent stand; the sources follow them
+                        fallback = sources_only_response(similar_docs, reason)
+                    else:
+                        # Nothing generated yet; the sources event stands and the citations go in done
+                        fallback = self.answer_without_gemini(query_embedding, similar_docs, reason)
+                    yield {"type": "token", "text": ("\n\n" if parts else "") + fallback["answer"]}
+                    yield stream_done(fallback)
+                    return
+                if query_embedding is None:
+                    yield {"type": "done", "degraded": "lexical_retrieval"}
+                    return
+                yield {"type": "done"}
+
+                response = {
+                    "answer": "".join(parts),
+                    "sources": [doc['title'] for doc in similar_docs],
+                    "context_used": len(similar_docs)
+                }
+                self.remember_answer(query_embedding, similar_docs, response)
+                self.store_response(cache_key, response)
+
+            except Exception as e:
+                logger.error(f"Error in streaming chat: {str(e)}")
+                yield {"type": "error", "error": str(e)}
+
+
+def response_namespace(endpoint, mode):
+    """Response cache namespace; generative keeps the plain endpoint name so existing entries stay valid"""
+    return endpoint if mode == 'generative' else f"{endpoint}:{mode}"
+
+
+def stream_done(response):
+    """Final stream event for an answer, with its citations, degraded reason and error if any"""
+    event = {"type": "done"}
+    for field in ("citations", "degraded", "error"):
+        if response.get(field):
+            event[field] = response[field]
+    return event
+
+
+def stream_whole(response):
+    """Events for an answer that is complete before streaming starts: sources, one token, done"""
+    yield {
+        "type": "sources",
+        "sources": response.get("sources", []),
+        "context_used": response.get("context_used", 0)
+    }
+    yield {"type": "token", "text": response["answer"]}
+    yield stream_done(response)
+
+
+def format_chat_response(result):
+    """Shape a chatbot result like the widget's /api/chat response"""
+    formatted_result = {
+        "response": result.get("answer", ""),
+        "context": result.get("sources", []),
+        "context_used": result.get("context_used", 0)
+    }
+    if result.get("citations"):
+        # Extractive answer: the quoted sentences and the source each [n] refers to
+        formatted_result["citations"] = result["citations"]
+    if result.get("degraded"):
+        # Answered without Gemini or without embedding search (deadline reached, upstream down)
+        formatted_result["degraded"] = result["degraded"]
+    return formatted_result
+
+
+class ChatRequestHandler(BaseHTTPRequestHandler):
+    """HTTP endpoints shared by the entry points.
+
+    Subclasses set lazy_chatbot to their Lazy chatbot, and may add endpoints
+    by extending route_post (and the endpoints listing).
+    """
+
+    lazy_chatbot = None
+    endpoints = {
+        "chat": "POST /api/chat",
+        "chat_stream": "POST /api/chat/stream",
+        "health": "GET /api/health",
+        "metrics": "GET /api/metrics",
+        "setup": "POST /api/setup",
+        "add_document": "POST /api/add-document",
+        "add_documents": "POST /api/add-documents (NDJSON)"
+    }
+
+    def get_chatbot(self):
+        """Return the process-wide chatbot, building it on first use"""
+        return self.lazy_chatbot.get()
+
+    def _set_headers(self, status_code=200, content_length=0, content_type='application/json'):
+        """Set HTTP headers"""
+        self.send_response(status_code)
+        self.send_header('Content-type', content_type)
+        # Explicit length lets HTTP/1.1 clients reuse the connection (keep-alive)
+        self.send_header('Content-Length', str(content_length))
+        # Per-stage durations of this request, shown in the browser's network panel
+        timing = server_timing_header()
+        if timing:
+            self.send_header('Server-Timing', timing)
+            self.send_header('Timing-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
+
+    def _send_json(self, response, status_code=200):
+        """Send a JSON response with its Content-Length"""
+        body = json.dumps(response).encode()
+        self._set_headers(status_code, len(body))
+        self.wfile.write(body)
+
+    def _start_event_stream(self):
+        """Send headers for a Server-Sent Events response"""
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')  # stop proxies from buffering the stream
+        # No length up front, so the end of the stream is marked by closing the connection
+        self.send_header('Connection', 'close')
+        self.close_connection = True
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
+
+    def _send_event(self, event):
+        """Write one SSE frame and flush it to the client immediately"""
+        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+        self.wfile.flush()
+
+    def _read_chat_request(self, post_data):
+        """(query, mode) from a chat request body, or None after sending a 400"""
+        data = json.loads(post_data.decode())
+        # Support both 'query' and 'message' parameters
+        query = data.get('query', data.get('message', '')).strip()
+
+        if not query:
+            response = {"error": "Query or message is required"}
+            self._send_json(response, 400)
+            return None
+
+        mode = data.get('mode', 'generative')
+        if mode not in ANSWER_MODES:
+            response = {"error": f"mode must be one of: {', '.join(ANSWER_MODES)}"}
+            self._send_json(response, 400)
+            return None
+        return query, mode
+
+    def do_OPTIONS(self):
+        """Handle preflight requests"""
+        begin_request()
+        self._set_headers()
+
+    def do_GET(self):
+        """Handle GET requests"""
+        begin_request()
+        try:
+            if self.path == '/':
+                response = {
+                    "message": "RAG Chatbot API is running",
+                    "endpoints": self.endpoints
+                }
+                self._send_json(response)
+
+            elif self.path == '/api/health':
+                if not self.lazy_chatbot.initialized:
+                    # A cold instance is healthy; probing it must not pay for service start-up
+                    response = {"status": "healthy", "service": "RAG Chatbot API", "initialized": False}
+                    self._send_json(response)
+                    return
+                chatbot = self.get_chatbot()
+                response = {
+                    # Still serving while a breaker is open, from full-text search or FAQ/excerpt answers
+                    "status": "healthy" if all_closed() else "degraded",
+                    "service": "RAG Chatbot API",
+                    "initialized": True,
+                    "circuit_breakers": breaker_stats(),
+                    "database_pool": chatbot.db_service.pool_stats(),
+                    "answer_cache": chatbot.answer_cache.stats() if chatbot.answer_cache is not None else None,
+                    "response_cache": chatbot.response_cache.stats() if chatbot.response_cache is not None else None,
+                    "faq_router": chatbot.faq_router.stats() if chatbot.faq_router is not None else None,
+                    "context_packer": chatbot.gemini_service.packer.stats() if chatbot.gemini_service.packer is not None else None,
+                    "extractive": chatbot.extractive.stats() if chatbot.extractive is not None else None
+                }
+                self._send_json(response)
+
+            elif self.path == '/api/metrics':
+                # Prometheus text format; per process, like the stats in /api/health
+                body = render_prometheus().encode()
+                self._set_headers(200, len(body), PROMETHEUS_CONTENT_TYPE)
+                self.wfile.write(body)
+
+            else:
+                response = {"error": "Endpoint not found"}
+                self._send_json(response, 404)
+
+        except Exception as e:
+            response = {"error": str(e)}
+            self._send_json(response, 500)
+
+    def route_post(self, post_data):
+        """Serve a POST to one of the shared endpoints; returns False if the path is not one of them"""
+        if self.path == '/api/chat/stream':
+            request = self._read_chat_request(post_data)
+            if request is None:
+                return True
+            query, mode = request
+
+            # Headers go out before retrieval so the client can render as soon as tokens arrive
+            self._start_event_stream()
+            try:
+                for event in self.get_chatbot().chat_stream(query, deadline=DEADLINE_CHAT_STREAM, mode=mode):
+                    self._send_event(event)
+            except (BrokenPipeError, ConnectionResetError):
+                logger.info("Client disconnected during stream")
+
+        elif urlparse(self.path).path in ('/api/chat', '/chat'):
+            request = self._read_chat_request(post_data)
+            if request is None:
+                return True
+            query, mode = request
+
+            # Process the chat query
+            result = self.get_chatbot().chat(query, deadline=DEADLINE_CHAT, mode=mode)
+            self._send_json(format_chat_response(result))
+
+        elif self.path == '/api/setup':
+            # Setup database
+            success = self.get_chatbot().setup()
+
+            if success:
+                status_code = 200
+                response = {"message": "Database setup completed successfully"}
+            else:
+                status_code = 500
+                response = {"error": "Database setup failed"}
+
+            self._send_json(response, status_code)
+
+        elif urlparse(self.path).path == '/api/add-documents':
+            # NDJSON body: one {"title", "content", "metadata"} object per line
+            from bulk_ingest import parse_documents, replace_authorized, BULK_INGEST_MAX_DOCUMENTS
+            params = parse_qs(urlparse(self.path).query)
+            replace = params.get('replace', ['false'])[0].strip().lower() in ('1', 'true', 'yes')
+            if replace and not replace_authorized(self.headers.get('Authorization')):
+                # Deletes every document not in the body: only with BULK_INGEST_ADMIN_TOKEN, else from the CLI
+                response = {"error": "replace requires the admin token (BULK_INGEST_ADMIN_TOKEN); or run ingest_jsonl.py --replace"}
+                self._send_json(response, 403)
+                return True
+            documents, errors = parse_documents(post_data.decode().splitlines())
+
+            if not documents or (replace and errors):
+                # Never replace the knowledge base with a partial load
+                response = {"error": "No valid documents in request body" if not documents else "Invalid lines; nothing replaced", "errors": errors}
+                self._send_json(response, 400)
+                return True
+            if len(documents) > BULK_INGEST_MAX_DOCUMENTS:
+                response = {"error": f"At most {BULK_INGEST_MAX_DOCUMENTS} documents per request"}
+                self._send_json(response, 413)
+                return True
+
+            report = self.get_chatbot().add_documents(documents, replace=replace)
+            report["errors"] = errors
+            self._send_json(report, 500 if report.get("error") else 200)
+
+        elif self.path == '/api/add-document':
+            data = json.loads(post_data.decode())
+            title = data.get('title', '').strip()
+            content = data.get('content', '').strip()
+            metadata = data.get('metadata', {})
+
+            if not title or not content:
+                response = {"error": "Title and content are required"}
+                self._send_json(response, 400)
+                return True
+
+            success = self.get_chatbot().add_document(title, content, metadata)
+
+            if success:
+                status_code = 200
+                response = {"message": "Document added successfully"}
+            else:
+                status_code = 500
+                response = {"error": "Failed to add document"}
+
+            self._send_json(response, status_code)
+
+        else:
+            return False
+        return True
+
+    def do_POST(self):
+        """Handle POST requests"""
+        begin_request()
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            post_data = self.rfile.read(content_length)
+
+            if not self.route_post(post_data):
+                response = {"error": "Endpoint not found"}
+                self._send_json(response, 404)
+
+        except json.JSONDecodeError:
+            response = {"error": "Invalid JSON in request body"}
+            self._send_json(response, 400)
+        except TimeoutError:
+            # The request's work outlasted its deadline and was cancelled
+            response = {"error": "Request deadline exceeded"}
+            self._send_json(response, 504)
+        except Exception as e:
+            response = {"error": str(e)}
+            self._send_json(response, 500)
@@ -1,9 +1,9 @@
 import os
-import google.generativeai as genai
 import asyncio
 from sqlalchemy.orm import Session
-from search import search_similar_documents
+from search import async_search_similar_documents
 from dotenv import load_dotenv
+from lazy_init import Lazy
 import logging
 
 # Load environment variables
@@ -13,13 +13,17 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable not set")
+def _create_model():
+    import google.generativeai as genai
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY environment variable not set")
+    # Configure Gemini API
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel('models/gemini-1.5-flash-latest')
 
-# Configure Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('models/gemini-1.5-flash-latest')
+# The SDK is imported and configured on the first generation, not at import
+_model = Lazy(_create_model)
 
 def is_meaningful_query(query: str) -> bool:
     """Check if the query is meaningful and complete enough to process"""
@@ -50,8 +54,8 @@ async def get_rag_response(query: str, db: Session) -> str:
     if not is_meaningful_query(query):
         return "Please ask a complete and clear question. Your query seems too short or incomplete."
     
-    # Search for similar documents using vector search
-    similar_docs = search_similar_documents(query, db, top_k=5)
+    # Search for similar documents using vector search (non-blocking)
+    similar_docs = await async_search_similar_documents(query, db, top_k=5)
     
     if not similar_docs:
         return "I don't have any documents in my knowledge base. Please upload some documents first."
@@ -98,7 +102,7 @@ async def get_rag_response(query: str, db: Session) -> str:
     """
     
     try:
-        response = await asyncio.to_thread(model.generate_content, prompt)
+        response = await _model.get().generate_content_async(prompt)
         return response.text.strip()
     except Exception as e:
         error_message = f"Error generating response: {str(e)}"
@@ -119,8 +123,8 @@ async def get_enhanced_rag_response(query: str, db: Session) -> dict:
             "error": "Invalid query"
         }
     
-    # Search for similar documents using vector search
-    similar_docs = search_similar_documents(query, db, top_k=5)
+    # Search for similar documents using vector search (non-blocking)
+    similar_docs = await async_search_similar_documents(query, db, top_k=5)
     
     if not similar_docs:
         return {
@@ -187,7 +191,7 @@ async def get_enhanced_rag_response(query: str, db: Session) -> dict:
     """
     
     try:
-        response = await asyncio.to_thread(model.generate_content, prompt)
+        response = await _model.get().generate_content_async(prompt)
         answer = response.text.strip()
         
         return {
@@ -208,29 +212,6 @@ async def get_enhanced_rag_response(query: str, db: Session) -> dict:
             "error": str(e)
         }
 
-def validate_document_relevance(query: str, document_content: str) -> float:
-    """
-    Validate if a document is relevant to the query.
-    Returns a relevance score between 0 and 1.
-    """
-    query_words = set(query.lower().split())
-    doc_words = set(document_content.lower().split())
-    
-    # Calculate word overlap
-    common_words = query_words.intersection(doc_words)
-    if not query_words:
-        return 0.0
-    
-    # Basic relevance score based on word overlap
-    relevance_score = len(common_words) / len(query_words)
-    
-    # Boost score for question words and important terms
-    question_words = {'what', 'where', 'when', 'who', 'why', 'how', 'which', 'is', 'are', 'can', 'do', 'does'}
-    if any(word in query_words for word in question_words):
-        relevance_score *= 1.2
-    
-    return min(relevance_score, 1.0)
-
 # Example usage function
 async def example_usage():
     """Example of how to use the RAG response functions"""
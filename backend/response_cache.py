@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+
+from embedding_cache import normalize_text
+from http_client import get_session
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Response cache configuration
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory').strip().lower()  # memory, disk, kv or none
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', str(24 * 3600)))  # seconds, 0 = never expire
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '4096'))
+RESPONSE_CACHE_PATH = os.getenv(
+    'RESPONSE_CACHE_PATH',
+    os.path.join(tempfile.gettempdir(), 'response_cache.sqlite3')
+)
+# Redis-over-REST protocol (Vercel KV / Upstash); run kv_server.py for a local stand-in
+KV_REST_API_URL = os.getenv('KV_REST_API_URL', '').rstrip('/')
+KV_REST_API_TOKEN = os.getenv('KV_REST_API_TOKEN', '')
+KV_TIMEOUT = float(os.getenv('KV_TIMEOUT', '0.5'))  # a slow cache must never be slower than a miss
+
+
+class MemoryBackend:
+    """In-process LRU of JSON-able responses with TTL.
+
+    Entries are held serialized, like the disk and KV backends, so every hit is
+    a fresh copy: a caller adding fields to its response cannot change what
+    later hits get.
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (JSON text, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return json.loads(value)
+
+    def set(self, key, value, ttl):
+        expires_at = time.time() + ttl if ttl else 0
+        value = json.dumps(value)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskBackend:
+    """SQLite-backed store shared by processes on the same host (survives restarts)"""
+
+    name = 'disk'
+    EVICT_EVERY = 256  # writes between expiry/size sweeps
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._conn = None
+        self._disabled = not path
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open the database lazily so importing the module does no I/O"""
+        if self._conn is None and not self._disabled:
+            try:
+                conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL;")
+                conn.execute("PRAGMA synchronous=NORMAL;")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        expires_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    );
+                """)
+                conn.commit()
+                self._conn = conn
+            except Exception as e:
+                logger.warning(f"Response disk cache disabled ({self.path}): {str(e)}")
+                self._disabled = True
+        return self._conn
+
+    def get(self, key):
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                value, expires_at = row
+                now = time.time()
+                if expires_at and expires_at < now:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+                return json.loads(value)
+            except Exception as e:
+                logger.warning(f"Response disk cache read error: {str(e)}")
+                return None
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now + ttl if ttl else 0, now)
+                )
+                self._writes += 1
+                if self._writes % self.EVICT_EVERY == 0:
+                    conn.execute("DELETE FROM responses WHERE expires_at > 0 AND expires_at < ?", (now,))
+                    conn.execute("""
+                        DELETE FROM responses WHERE key IN (
+                            SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                        )
+                    """, (self.max_entries,))
+                conn.commit()
+            except Exception as e:
+                logger.warning(f"Response disk cache write error: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            if conn is not None:
+                conn.execute("DELETE FROM responses;")
+                conn.commit()
+
+
+class KVBackend:
+    """Shared network KV speaking the Redis-over-REST protocol (Vercel KV / Upstash).
+
+    Lets every warm serverless instance share hits. Errors and timeouts are
+    treated as misses.
+    """
+
+    name = 'kv'
+    PREFIX = 'rag:response:'
+
+    def __init__(self, url=KV_REST_API_URL, token=KV_REST_API_TOKEN, timeout=KV_TIMEOUT):
+        if not url:
+            raise ValueError("KV_REST_API_URL must be set for the kv response cache backend")
+        self.url = url
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.timeout = timeout
+
+    def _command(self, *args):
+        response = get_session("kv").post(self.url, json=list(args), headers=self.headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get("result")
+
+    def get(self, key):
+        try:
+            value = self._command("GET", self.PREFIX + key)
+            return json.loads(value) if value is not None else None
+        except Exception as e:
+            logger.warning(f"Response KV cache read error: {str(e)}")
+            return None
+
+    def set(self, key, value, ttl):
+        try:
+            if ttl:
+                self._command("SET", self.PREFIX + key, json.dumps(value), "EX", int(ttl))
+            else:
+                self._command("SET", self.PREFIX + key, json.dumps(value))
+        except Exception as e:
+            logger.warning(f"Response KV cache write error: {str(e)}")
+
+    def clear(self):
+        # Keys are versioned, so stale entries simply stop being read and expire
+        pass
+
+
+class ResponseCache:
+    """Exact-match cache of final chat responses, keyed on the knowledge-base version.
+
+    The key covers the normalized query, retrieval parameters and the current
+    KB version, so any write to the documents table makes every older entry
+    unreachable without an explicit purge.
+    """
+
+    def __init__(self, backend, version_source, ttl=RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.version_source = version_source  # callable returning the KB version or None
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self._lock = threading.Lock()  # counters are bumped from every server worker thread
+
+    def make_key(self, namespace, query, top_k, threshold):
+        """Return the cache key, or None when the KB version is unknown"""
+        version = self.version_source()
+        if version is None:
+            return None
+        raw = json.dumps([namespace, normalize_text(query), top_k, threshold, version])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, namespace, query, top_k, threshold):
+        """Return (key, cached_response); key is None when caching is unavailable"""
+        key = self.make_key(namespace, query, top_k, threshold)
+        if key is None:
+            with self._lock:
+                self.bypassed += 1
+            return None, None
+        response = self.backend.get(key)
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return key, response
+
+    def store(self, key, response):
+        if key is None:
+            return
+        self.backend.set(key, response, self.ttl)
+        with self._lock:
+            self.stores += 1
+
+    def stats(self):
+        """Return backend name and hit-rate metrics"""
+        with self._lock:
+            hits, misses, bypassed, stores = self.hits, self.misses, self.bypassed, self.stores
+        lookups = hits + misses
+        return {
+            "backend": self.backend.name,
+            "hits": hits,
+            "misses": misses,
+            "bypassed": bypassed,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "stores": stores
+        }
+
+
+def create_response_cache(version_source, backend=RESPONSE_CACHE_BACKEND):
+    """Build the configured response cache, or None when disabled"""
+    if backend in ('', 'none', 'off'):
+        return None
+    if backend == 'memory':
+        return ResponseCache(MemoryBackend(), version_source)
+    if backend == 'disk':
+        return ResponseCache(DiskBackend(), version_source)
+    if backend == 'kv':
+        return ResponseCache(KVBackend(), version_source)
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend}")
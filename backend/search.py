@@ -1,76 +1,70 @@
-import os
-import json
-import requests
-import numpy as np
-from sqlalchemy.orm import Session
-from dotenv import load_dotenv
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import asyncio
 import logging
+from typing import TYPE_CHECKING
 
-# Load environment variables
-load_dotenv()
+from lazy_init import Lazy, load_environment
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+# Load environment variables before shared modules read their configuration
+load_environment(__file__)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class EmbeddingService:
-    """Service for generating text embeddings using HuggingFace API"""
-    
+
+class SearchServices:
+    """Embedding, database and retrieval services behind this module's functions"""
+
     def __init__(self):
-        self.api_url = "https://api-inference.huggingface.co/models/BAAI/bge-large-en-v1.5"
-        token = os.getenv('HUGGINGFACE_API_TOKEN', '').strip()
-        self.headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-        self.embedding_dim = 1024  # BAAI/bge-large-en-v1.5 dimensions
-    
-    def generate_embedding(self, text):
-        """Generate embedding for given text"""
-        try:
-            payload = {
-                "inputs": text,
-                "options": {"wait_for_model": True}
-            }
-            response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=30)
-            
-            # Check for different error types
-            if response.status_code == 401:
-                logger.error("HuggingFace API authentication failed. Check your token.")
-                return None
-            elif response.status_code == 503:
-                logger.warning("Model is loading, waiting...")
-                # Model might be loading, try again after a short wait
-                import time
-                time.sleep(5)
-                response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=30)
-            
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            # Handle different response formats
-            if isinstance(result, list) and len(result) > 0:
-                # Check if it's a nested list (batch response)
-                if isinstance(result[0], list):
-                    return result[0]  # First embedding in batch
-                else:
-                    return result  # Direct embedding
-            elif isinstance(result, dict) and 'error' in result:
-                logger.error(f"HuggingFace API error: {result['error']}")
-                return None
-            else:
-                logger.error(f"Unexpected response format: {result}")
-                return None
-                
-        except requests.exceptions.Timeout:
-            logger.error("HuggingFace API timeout")
-            return None
-        except Exception as e:
-            logger.error(f"Error generating embedding: {str(e)}")
-            return None
+        from embeddings import EmbeddingService
+        from database import DatabaseService
+        from vector_index import InMemoryVectorIndex, VECTOR_INDEX_ENABLED
+        from hybrid_search import HybridRetriever, HYBRID_SEARCH_ENABLED
+        from passage_retrieval import PassageRetriever, PASSAGE_RETRIEVAL_ENABLED
+        from embedding_cache import CachedEmbeddingService
+        from embedding_batcher import EmbeddingBatcher
+
+        # Shared, cached embedding service so repeated queries skip the HuggingFace round-trip
+        self.query_embedding_service = CachedEmbeddingService(EmbeddingBatcher(EmbeddingService()))
+        # httpx/asyncpg are only needed (and only installed with backend/requirements.txt) for the async path
+        self._async_query_embedding_service = Lazy(self._create_async_embedding_service)
+        self.db_service = DatabaseService()
+        # Optional in-process snapshot or passage-level search, all serving the same interface
+        if VECTOR_INDEX_ENABLED:
+            self.retriever = InMemoryVectorIndex(self.db_service)
+        elif PASSAGE_RETRIEVAL_ENABLED:
+            self.retriever = PassageRetriever(self.db_service)
+        else:
+            self.retriever = self.db_service
+        # Fuse with full-text ranking so exact product/crop names are not lost to embedding blur
+        if HYBRID_SEARCH_ENABLED:
+            self.retriever = HybridRetriever(self.retriever, self.db_service)
+
+    def _create_async_embedding_service(self):
+        from async_clients import AsyncEmbeddingService
+        return AsyncEmbeddingService(cache=self.query_embedding_service)
+
+    @property
+    def async_query_embedding_service(self):
+        """Async embedding client sharing the query cache, built by the first async search"""
+        return self._async_query_embedding_service.get()
+
+# Built by the first search, not at import: importing this module stays free of
+# numpy, psycopg2 and network clients, like the entry points
+_services = Lazy(SearchServices)
+
+def get_services():
+    """Return the process-wide search services, building them on first use"""
+    return _services.get()
+
+def __getattr__(name):
+    # Keeps `from search import db_service` (and the other services) working without building them at import
+    if name in ('query_embedding_service', 'async_query_embedding_service', 'db_service', 'retriever'):
+        return getattr(get_services(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class Document:
     """Simple document class to represent search results"""
@@ -80,7 +74,7 @@ class Document:
         self.similarity_score = similarity_score
         self.metadata = metadata or {}
 
-def search_similar_documents(query: str, db: Session, top_k: int = 5, similarity_threshold: float = 0.3):
+def search_similar_documents(query: str, db: 'Session', top_k: int = 5, similarity_threshold: float = 0.3):
     """
     Search for similar documents using vector similarity search.
     
@@ -94,42 +88,67 @@ def search_similar_documents(query: str, db: Session, top_k: int = 5, similarity
         List of tuples: (Document, similarity_score)
     """
     try:
-        # Initialize embedding service
-        embedding_service = EmbeddingService()
-        
-        # Generate embedding for the query
-        query_embedding = embedding_service.generate_embedding(query)
+        services = get_services()
+        # Generate embedding for the query (cached)
+        query_embedding = services.query_embedding_service.generate_embedding(query)
         if query_embedding is None:
             logger.error("Failed to generate query embedding")
             return []
         
-        # Get database connection
-        db_url = os.getenv('DATABASE_URL')
-        if not db_url:
-            logger.error("DATABASE_URL environment variable not set")
-            return []
+        # Search for similar documents using cosine similarity
+        results = services.retriever.search_similar_documents(
+            query_embedding,
+            limit=top_k,
+            similarity_threshold=similarity_threshold,
+            query_text=query
+        )
         
-        conn = psycopg2.connect(db_url)
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        # Convert results to Document objects with similarity scores
+        documents = []
+        for row in results:
+            doc = Document(
+                title=row['title'],
+                content=row['content'],
+                similarity_score=float(row['similarity_score']),
+                metadata=row.get('metadata', {})
+            )
+            documents.append((doc, doc.similarity_score))
         
-        # Convert embedding to string format for PostgreSQL
-        embedding_str = f"[{','.join(map(str, query_embedding))}]"
+        # Keep the retriever's order (similarity, or fused rank for hybrid search)
         
-        # Search for similar documents using cosine similarity
-        cursor.execute("""
-            SELECT title, content, metadata,
-                   (1 - (embedding <=> %s::vector)) as similarity_score
-            FROM documents
-            WHERE (1 - (embedding <=> %s::vector)) >= %s
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s;
-        """, (embedding_str, embedding_str, similarity_threshold, embedding_str, top_k))
-        
-        results = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        logger.info(f"Found {len(documents)} similar documents for query: {query}")
+        return documents
+        
+    except Exception as e:
+        logger.error(f"Error searching similar documents: {str(e)}")
+        return []
+
+async def async_search_similar_documents(query: str, db: 'Session', top_k: int = 5, similarity_threshold: float = 0.3):
+    """
+    Async counterpart of search_similar_documents.
+    
+    Embedding and Postgres calls use non-blocking clients, so many searches can
+    be in flight on one event loop.
+    
+    Returns:
+        List of tuples: (Document, similarity_score)
+    """
+    try:
+        # The first call imports and constructs every service, so it runs on a worker thread
+        services = get_services() if _services.initialized else await asyncio.to_thread(get_services)
+        from async_clients import async_search_documents
+        # Generate embedding for the query (cached)
+        query_embedding = await services.async_query_embedding_service.generate_embedding(query)
+        if query_embedding is None:
+            logger.error("Failed to generate query embedding")
+            return []
+        
+        if services.retriever is not services.db_service:
+            # In-memory index / hybrid fusion use blocking clients, so keep them off the loop
+            results = await asyncio.to_thread(services.retriever.search_similar_documents, query_embedding, top_k, similarity_threshold, query)
+        else:
+            results = await async_search_documents(query_embedding, limit=top_k, similarity_threshold=similarity_threshold)
         
-        # Convert results to Document objects with similarity scores
         documents = []
         for row in results:
             doc = Document(
@@ -140,8 +159,7 @@ def search_similar_documents(query: str, db: Session, top_k: int = 5, similarity
             )
             documents.append((doc, doc.similarity_score))
         
-        # Sort by similarity score (highest first)
-        documents.sort(key=lambda x: x[1], reverse=True)
+        # Keep the retriever's order (similarity, or fused rank for hybrid search)
         
         logger.info(f"Found {len(documents)} similar documents for query: {query}")
         return documents
@@ -162,9 +180,13 @@ def add_document_to_knowledge_base(title: str, content: str, metadata: dict = No
     Returns:
         bool: True if successful, False otherwise
     """
+    from passage_retrieval import PASSAGE_RETRIEVAL_ENABLED
+    from extractive import EXTRACTIVE_ENABLED
+    from chunking import index_document_passages, index_document_sentences
     try:
-        # Initialize embedding service
-        embedding_service = EmbeddingService()
+        services = get_services()
+        # The shared cached service: a document whose text was embedded before is not sent again
+        embedding_service = services.query_embedding_service
         
         # Generate embedding for the document
         embedding = embedding_service.generate_embedding(content)
@@ -172,28 +194,18 @@ def add_document_to_knowledge_base(title: str, content: str, metadata: dict = No
             logger.error("Failed to generate document embedding")
             return False
         
-        # Get database connection
-        db_url = os.getenv('DATABASE_URL')
-        if not db_url:
-            logger.error("DATABASE_URL environment variable not set")
+        # Insert document with embedding
+        document_id = services.db_service.insert_document(title, content, embedding, metadata)
+        if not document_id:
             return False
         
-        conn = psycopg2.connect(db_url)
-        cursor = conn.cursor()
-        
-        # Convert embedding to string format for PostgreSQL
-        embedding_str = f"[{','.join(map(str, embedding))}]"
-        metadata_json = json.dumps(metadata or {})
-        
-        # Insert document with embedding
-        cursor.execute("""
-            INSERT INTO documents (title, content, embedding, metadata)
-            VALUES (%s, %s, %s, %s)
-        """, (title, content, embedding_str, metadata_json))
+        # Passage-level embeddings for section-precise retrieval
+        if PASSAGE_RETRIEVAL_ENABLED:
+            index_document_passages(services.db_service, embedding_service, document_id, title, content)
         
-        conn.commit()
-        cursor.close()
-        conn.close()
+        # Sentence embeddings the extractive answerer quotes from
+        if EXTRACTIVE_ENABLED:
+            index_document_sentences(services.db_service, embedding_service, document_id, title, content)
         
         logger.info(f"Successfully added document: {title}")
         return True
@@ -204,44 +216,4 @@ def add_document_to_knowledge_base(title: str, content: str, metadata: dict = No
 
 def setup_database():
     """Setup database schema with pgvector extension"""
-    try:
-        db_url = os.getenv('DATABASE_URL')
-        if not db_url:
-            logger.error("DATABASE_URL environment variable not set")
-            return False
-        
-        conn = psycopg2.connect(db_url)
-        cursor = conn.cursor()
-        
-        # Enable pgvector extension
-        cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-        
-        # Create documents table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS documents (
-                id SERIAL PRIMARY KEY,
-                title VARCHAR(255) NOT NULL,
-                content TEXT NOT NULL,
-                embedding vector(1024),
-                metadata JSONB DEFAULT '{}',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        
-        # Create index for vector similarity search
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS documents_embedding_idx 
-            ON documents USING ivfflat (embedding vector_cosine_ops)
-            WITH (lists = 100);
-        """)
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        logger.info("Database setup completed successfully")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Database setup error: {str(e)}")
-        return False
+    return get_services().db_service.setup_database()
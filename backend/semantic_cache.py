@@ -0,0 +1,206 @@
+import os
+import time
+import hashlib
+import threading
+import logging
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Semantic answer cache configuration
+SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'true').strip().lower() in ('1', 'true', 'yes')
+# bge-large cosines sit high even for loosely related text, so keep the radius tight
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.95'))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '1024'))
+SEMANTIC_CACHE_TTL = int(os.getenv('SEMANTIC_CACHE_TTL', str(24 * 3600)))  # seconds, 0 = never expire
+SEMANTIC_CACHE_POLICY = os.getenv('SEMANTIC_CACHE_POLICY', 'lru').strip().lower()  # 'lru' or 'lfu'
+SEMANTIC_CACHE_VALIDATE_INTERVAL = float(os.getenv('SEMANTIC_CACHE_VALIDATE_INTERVAL', '60'))  # re-check contributing docs on hit
+
+
+def document_fingerprint(title, content):
+    """Content hash matching DatabaseService.document_fingerprints (md5 of title, newline, content)"""
+    return hashlib.md5(f"{title}\n{content}".encode("utf-8")).hexdigest()
+
+
+def _fingerprint(doc):
+    # Passage retrieval returns partial content along with the parent's fingerprint
+    return doc.get('fingerprint') or document_fingerprint(doc['title'], doc['content'])
+
+
+class _Entry:
+    __slots__ = ('response', 'fingerprints', 'created_at', 'last_used', 'validated_at', 'hits')
+
+    def __init__(self, response, fingerprints):
+        self.response = response
+        self.fingerprints = fingerprints  # doc id -> fingerprint at answer time
+        self.created_at = self.last_used = self.validated_at = time.time()
+        self.hits = 0
+
+
+class SemanticAnswerCache:
+    """Answers keyed by query embedding, served for any query within a cosine radius.
+
+    Query vectors live L2-normalized in one preallocated matrix, so a lookup is
+    a single matrix-vector product. Each entry remembers the ids and content
+    fingerprints of the documents its answer was generated from; it is dropped
+    when retrieval sees a changed copy of one of them, when a periodic check
+    against the database finds a change, or via invalidate_documents().
+    """
+
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+                 ttl=SEMANTIC_CACHE_TTL, policy=SEMANTIC_CACHE_POLICY,
+                 validator=None, validate_interval=SEMANTIC_CACHE_VALIDATE_INTERVAL):
+        if policy not in ('lru', 'lfu'):
+            raise ValueError(f"Unknown semantic cache policy: {policy}")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.policy = policy
+        self.validator = validator  # ids -> {id: fingerprint} or None when unavailable
+        self.validate_interval = validate_interval
+        self._matrix = None
+        self._active = np.zeros(max_entries, dtype=bool)
+        self._entries = {}  # slot -> _Entry
+        self._doc_slots = {}  # doc id -> set of slots
+        self._lock = threading.Lock()
+        # Metrics
+        self.lookups = 0
+        self.hits = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _normalize(self, embedding):
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _remove(self, slot):
+        entry = self._entries.pop(slot)
+        self._active[slot] = False
+        for doc_id in entry.fingerprints:
+            slots = self._doc_slots.get(doc_id)
+            if slots is not None:
+                slots.discard(slot)
+                if not slots:
+                    del self._doc_slots[doc_id]
+
+    def _victim(self):
+        if self.policy == 'lfu':
+            return min(self._entries, key=lambda s: (self._entries[s].hits, self._entries[s].last_used))
+        return min(self._entries, key=lambda s: self._entries[s].last_used)
+
+    def lookup(self, query_embedding):
+        """Return a copy of the cached answer for a near-identical query, or None"""
+        query = self._normalize(query_embedding)
+        with self._lock:
+            self.lookups += 1
+            if query is None or not self._entries:
+                return None
+            scores = self._matrix @ query
+            scores[~self._active] = -np.inf
+            slot = int(np.argmax(scores))
+            score = float(scores[slot])
+            if score < self.threshold:
+                return None
+            entry = self._entries[slot]
+            now = time.time()
+            if self.ttl and entry.created_at + self.ttl < now:
+                self._remove(slot)
+                return None
+            needs_validation = self.validator is not None and now - entry.validated_at >= self.validate_interval
+
+        if needs_validation:
+            # Outside the lock: this is a database round trip
+            current = self.validator(list(entry.fingerprints))
+            with self._lock:
+                if current is not None and current != entry.fingerprints:
+                    if self._entries.get(slot) is entry:
+                        self._remove(slot)
+                        self.invalidations += 1
+                    return None
+                entry.validated_at = now
+
+        with self._lock:
+            entry.hits += 1
+            entry.last_used = now
+            self.hits += 1
+            response = dict(entry.response)
+        response["cache_similarity"] = score
+        return response
+
+    def store(self, query_embedding, context_documents, response):
+        """Cache an answer together with fingerprints of the documents it used"""
+        query = self._normalize(query_embedding)
+        if query is None:
+            return
+        fingerprints = {
+            doc['id']: _fingerprint(doc)
+            for doc in context_documents if doc.get('id') is not None
+        }
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, query.shape[0]), dtype=np.float32)
+            if len(self._entries) >= self.max_entries:
+                self._remove(self._victim())
+                self.evictions += 1
+            slot = int(np.argmin(self._active))
+            self._matrix[slot] = query
+            self._active[slot] = True
+            self._entries[slot] = _Entry(dict(response), fingerprints)
+            for doc_id in fingerprints:
+                self._doc_slots.setdefault(doc_id, set()).add(slot)
+            self.stores += 1
+
+    def observe_documents(self, documents):
+        """Drop entries built from older versions of freshly retrieved documents"""
+        with self._lock:
+            for doc in documents:
+                slots = self._doc_slots.get(doc.get('id'))
+                if not slots:
+                    continue
+                fingerprint = _fingerprint(doc)
+                stale = [s for s in slots if self._entries[s].fingerprints.get(doc['id']) != fingerprint]
+                for slot in stale:
+                    self._remove(slot)
+                    self.invalidations += 1
+
+    def invalidate_documents(self, doc_ids):
+        """Drop every entry whose answer used any of doc_ids"""
+        with self._lock:
+            slots = set()
+            for doc_id in doc_ids:
+                slots |= self._doc_slots.get(doc_id, set())
+            for slot in slots:
+                self._remove(slot)
+            self.invalidations += len(slots)
+            return len(slots)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._doc_slots.clear()
+            self._active[:] = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Return cache size and hit-rate metrics"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "policy": self.policy,
+                "threshold": self.threshold,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "misses": self.lookups - self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
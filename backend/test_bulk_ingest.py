@@ -0,0 +1,179 @@
+"""
+Tests for bulk_ingest.BulkIngestor.ingest against in-memory stand-ins for
+DatabaseService and the embedding service: which documents are inserted,
+updated or skipped, which texts are embedded, and what reaches
+bulk_sync_documents.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bulk_ingest import BulkIngestor, content_hash
+
+
+class FakeEmbeddings:
+    """generate_embeddings returning a distinct vector per text, recording every text sent"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    def generate_embeddings(self, texts, batch_size=None):
+        if self.fail:
+            return None
+        self.sent.extend(texts)
+        return np.asarray([[float(len(text)), float(sum(map(ord, text)))] for text in texts], dtype=np.float32)
+
+
+class FakeDatabase:
+    """The DatabaseService calls BulkIngestor makes, over a dict of rows keyed by title"""
+
+    def __init__(self):
+        self.rows = {}
+        self.next_id = 1
+        self.syncs = []
+
+    def existing_documents(self, titles):
+        return {title: {"id": row["id"], "title": title, "content_hash": content_hash(row["content"]), "metadata": row["metadata"]}
+                for title, row in self.rows.items() if title in titles}
+
+    def embeddings_for_hashes(self, hashes):
+        return {content_hash(row["content"]): row["embedding"] for row in self.rows.values()
+                if content_hash(row["content"]) in hashes}
+
+    def bulk_sync_documents(self, inserts, updates=(), metadata_updates=(), passages=None, keep_ids=None, sentences=None):
+        self.syncs.append({"inserts": inserts, "updates": updates, "metadata_updates": metadata_updates,
+                           "passages": passages, "keep_ids": keep_ids, "sentences": sentences})
+        deleted = 0
+        if keep_ids is not None:
+            for title in [t for t, row in self.rows.items() if row["id"] not in keep_ids]:
+                del self.rows[title]
+                deleted += 1
+        by_id = {row["id"]: row for row in self.rows.values()}
+        for document_id, content, embedding, metadata in updates:
+            by_id[document_id].update(content=content, embedding=embedding, metadata=metadata)
+        for document_id, metadata in metadata_updates:
+            by_id[document_id]["metadata"] = metadata
+        for title, content, embedding, metadata in inserts:
+            self.rows[title] = {"id": self.next_id, "content": content, "embedding": embedding, "metadata": metadata}
+            self.next_id += 1
+        return {"inserted": len(inserts), "updated": len(updates), "metadata_updated": len(metadata_updates),
+                "deleted": deleted, "passages": sum(map(len, passages or [])), "sentences": sum(map(len, sentences or []))}
+
+
+def doc(title, content, metadata=None):
+    return {"title": title, "content": content, "metadata": metadata or {}}
+
+
+@pytest.fixture
+def db():
+    return FakeDatabase()
+
+
+@pytest.fixture
+def embeddings():
+    return FakeEmbeddings()
+
+
+def ingest(db, embeddings, documents, replace=False, **kwargs):
+    kwargs.setdefault("with_passages", False)
+    return BulkIngestor(db, embeddings, **kwargs).ingest(documents, replace=replace)
+
+
+def test_first_load_inserts_and_embeds_everything(db, embeddings):
+    report = ingest(db, embeddings, [doc("Urea", "Apply urea in splits."), doc("Zinc", "Zinc for rice.")])
+    assert (report["inserted"], report["updated"], report["unchanged"], report["embedded"]) == (2, 0, 0, 2)
+    assert sorted(embeddings.sent) == ["Apply urea in splits.", "Zinc for rice."]
+    assert report["changed"] is True
+
+
+def test_unchanged_documents_skip_embedding(db, embeddings):
+    documents = [doc("Urea", "Apply urea in splits."), doc("Zinc", "Zinc for rice.")]
+    ingest(db, embeddings, documents)
+    embeddings.sent.clear()
+    report = ingest(db, embeddings, [dict(d) for d in documents])
+    assert report["unchanged"] == 2 and report["embedded"] == 0
+    assert embeddings.sent == []
+    assert db.syncs[-1]["inserts"] == [] and db.syncs[-1]["updates"] == []
+    assert report["changed"] is False
+
+
+def test_changed_content_is_reembedded(db, embeddings):
+    ingest(db, embeddings, [doc("Urea", "Apply urea in splits."), doc("Zinc", "Zinc for rice.")])
+    embeddings.sent.clear()
+    report = ingest(db, embeddings, [doc("Urea", "Apply urea in three splits."), doc("Zinc", "Zinc for rice.")])
+    assert (report["updated"], report["unchanged"], report["embedded"]) == (1, 1, 1)
+    assert embeddings.sent == ["Apply urea in three splits."]
+    (document_id, content, _, _), = db.syncs[-1]["updates"]
+    assert document_id == db.rows["Urea"]["id"] and content == "Apply urea in three splits."
+
+
+def test_metadata_only_change_is_not_reembedded(db, embeddings):
+    ingest(db, embeddings, [doc("Urea", "Apply urea in splits.", {"type": "guide"})])
+    embeddings.sent.clear()
+    report = ingest(db, embeddings, [doc("Urea", "Apply urea in splits.", {"type": "faq"})])
+    assert (report["metadata_updated"], report["updated"], report["embedded"]) == (1, 0, 0)
+    assert db.rows["Urea"]["metadata"] == {"type": "faq"}
+
+
+def test_identical_content_is_embedded_once(db, embeddings):
+    report = ingest(db, embeddings, [doc("Urea A", "Apply urea in splits."), doc("Urea B", "Apply urea in splits.")])
+    assert report["inserted"] == 2
+    assert embeddings.sent == ["Apply urea in splits."]
+    assert (report["embedded"], report["reused"]) == (1, 1)
+
+
+def test_content_stored_under_another_title_is_reused(db, embeddings):
+    ingest(db, embeddings, [doc("Urea", "Apply urea in splits.")])
+    embeddings.sent.clear()
+    report = ingest(db, embeddings, [doc("Urea (copy)", "Apply urea in splits.")])
+    assert report["inserted"] == 1 and report["embedded"] == 0 and report["reused"] == 1
+    assert embeddings.sent == []
+    np.testing.assert_array_equal(db.rows["Urea (copy)"]["embedding"], db.rows["Urea"]["embedding"])
+
+
+def test_replace_deletes_documents_missing_from_the_batch(db, embeddings):
+    ingest(db, embeddings, [doc("Urea", "Apply urea in splits."), doc("Zinc", "Zinc for rice.")])
+    report = ingest(db, embeddings, [doc("Urea", "Apply urea in splits."), doc("Potash", "Potash before flowering.")],
+                    replace=True)
+    assert db.syncs[-1]["keep_ids"] == [db.rows["Urea"]["id"]]
+    assert (report["deleted"], report["inserted"], report["unchanged"]) == (1, 1, 1)
+    assert sorted(db.rows) == ["Potash", "Urea"]
+
+
+def test_without_replace_nothing_is_deleted(db, embeddings):
+    ingest(db, embeddings, [doc("Urea", "Apply urea in splits."), doc("Zinc", "Zinc for rice.")])
+    ingest(db, embeddings, [doc("Potash", "Potash before flowering.")])
+    assert db.syncs[-1]["keep_ids"] is None
+    assert sorted(db.rows) == ["Potash", "Urea", "Zinc"]
+
+
+def test_last_occurrence_of_a_title_wins(db, embeddings):
+    report = ingest(db, embeddings, [doc("Urea", "Old text."), doc("Zinc", "Zinc for rice."), doc("Urea", "New text.")])
+    assert report["received"] == 3 and report["inserted"] == 2
+    assert db.rows["Urea"]["content"] == "New text."
+    assert "Old text." not in embeddings.sent
+
+
+def test_embedding_failure_writes_nothing(db):
+    report = ingest(db, FakeEmbeddings(fail=True), [doc("Urea", "Apply urea in splits.")])
+    assert report["error"] == "Failed to generate document embeddings"
+    assert db.syncs == [] and db.rows == {}
+
+
+def test_sentences_follow_inserts_then_updates(db, embeddings):
+    ingest(db, embeddings, [doc("Urea", "Apply urea in two equal splits. Irrigate before the first split.")])
+    report = ingest(db, embeddings, [doc("Zinc", "Apply zinc sulphate at 25 kg per hectare."),
+                                     doc("Urea", "Apply urea in three equal splits after irrigation.")],
+                    with_sentences=True)
+    sentences = db.syncs[-1]["sentences"]
+    assert [[text for text, _ in chunks] for chunks in sentences] == [
+        ["Apply zinc sulphate at 25 kg per hectare."],
+        ["Apply urea in three equal splits after irrigation."],
+    ]
+    assert report["sentences"] == 2
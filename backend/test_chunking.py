@@ -0,0 +1,69 @@
+"""
+Tests for chunking.split_passages: documents are cut along their heading and
+bullet structure, small sections merge forward, and consecutive passages
+overlap by the configured number of trailing blocks.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from chunking import split_passages
+from context_packer import estimate_tokens
+
+BULLETS = "\n".join(f"- Step {i}: apply {10 * i} kg of urea per acre after the first irrigation." for i in range(1, 9))
+
+DOCUMENT = f"""WHEAT FERTILIZER APPLICATION
+Wheat responds strongly to nitrogen during tillering and jointing.
+
+Basal Dose:
+{BULLETS}
+
+Top Dressing:
+Apply the remaining nitrogen in two equal splits after irrigation.
+"""
+
+def test_short_document_is_one_passage():
+    """A document within the budget is kept whole"""
+    content = "Apply compost before sowing.\nWater lightly afterwards."
+    assert split_passages(content, max_tokens=100) == [content]
+
+def test_passages_respect_budget():
+    """No passage exceeds max_tokens by more than one block"""
+    passages = split_passages(DOCUMENT, max_tokens=60, min_tokens=10, overlap_blocks=1)
+    assert len(passages) > 1, passages
+    largest_block = max(estimate_tokens(line) for line in DOCUMENT.splitlines() if line.strip())
+    for passage in passages:
+        assert estimate_tokens(passage.replace("\n", " ")) <= 60 + largest_block, passage
+
+def test_headings_start_sections():
+    """A heading starts a new passage once the current one is big enough"""
+    passages = split_passages(DOCUMENT, max_tokens=60, min_tokens=10, overlap_blocks=1)
+    assert passages[0].startswith("WHEAT FERTILIZER APPLICATION")
+    assert any(p.startswith("Basal Dose:") for p in passages), passages
+    assert passages[-1].startswith("Top Dressing:"), passages[-1]
+    # The new section does not drag the previous section's blocks along
+    assert "Step 8" not in passages[-1]
+
+def test_overlap_carries_heading_and_last_block():
+    """A passage split mid-section repeats the section heading and the previous passage's last block"""
+    passages = split_passages(DOCUMENT, max_tokens=60, min_tokens=10, overlap_blocks=1)
+    basal = [p for p in passages if "Step" in p]
+    assert len(basal) > 1, basal
+    for previous, current in zip(basal, basal[1:]):
+        lines = current.split("\n")
+        assert lines[0] == "Basal Dose:", current
+        assert lines[1] == previous.split("\n")[-1], (previous, current)
+
+def test_no_overlap():
+    """overlap_blocks=0 repeats only the heading"""
+    passages = split_passages(DOCUMENT, max_tokens=60, min_tokens=10, overlap_blocks=0)
+    steps = [line for p in passages for line in p.split("\n") if line.startswith("- Step")]
+    assert len(steps) == len(set(steps)) == 8, steps
+
+def test_small_sections_merge():
+    """A section under min_tokens is merged with the next instead of standing alone"""
+    content = "Intro:\nShort note.\n\nDetails:\n" + BULLETS
+    passages = split_passages(content, max_tokens=60, min_tokens=40, overlap_blocks=1)
+    assert passages[0].startswith("Intro:\nShort note.\nDetails:"), passages[0]
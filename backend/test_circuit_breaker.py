@@ -0,0 +1,136 @@
+"""
+Tests for circuit_breaker.CircuitBreaker: closed -> open on failed or slow
+calls, fail-fast while open, half-open probes after the cool-down, and back
+to closed (or open again) on how the probes end. Also checks the answer
+served without Gemini (faq_router.fallback_response).
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from circuit_breaker import CircuitBreaker, CircuitOpen, CLOSED, OPEN, HALF_OPEN
+from deadline import DeadlineExceeded
+from faq_router import fallback_response
+
+OPEN_SECONDS = 0.05
+
+def make_breaker(**kwargs):
+    options = dict(slow_call_seconds=1.0, window=4, min_calls=4, failure_rate=0.5, slow_call_rate=0.5,
+                   open_seconds=OPEN_SECONDS, half_open_probes=2)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+def fail():
+    raise ConnectionError("upstream down")
+
+def call_failing(breaker, times):
+    for _ in range(times):
+        try:
+            breaker.call(fail)
+        except ConnectionError:
+            pass
+
+def test_opens_at_failure_rate():
+    """Stays closed below min_calls, opens once half of the window failed"""
+    breaker = make_breaker()
+    breaker.call(lambda: "ok")
+    call_failing(breaker, 1)
+    assert breaker.state == CLOSED, "tripped before min_calls"
+    breaker.call(lambda: "ok")
+    call_failing(breaker, 1)
+    assert breaker.state == OPEN
+
+def test_open_fails_fast():
+    """While open, calls raise CircuitOpen without running"""
+    breaker = make_breaker()
+    call_failing(breaker, 4)
+    ran = []
+    with pytest.raises(CircuitOpen):
+        breaker.call(lambda: ran.append(True))
+    assert not ran
+    assert breaker.stats()["rejected"] == 1
+
+def test_half_open_probes_close():
+    """After the cool-down, enough successful probes close the breaker"""
+    breaker = make_breaker()
+    call_failing(breaker, 4)
+    time.sleep(OPEN_SECONDS * 2)
+    assert breaker.state == HALF_OPEN
+    breaker.call(lambda: "ok")
+    assert breaker.state == HALF_OPEN, "closed after one of two probes"
+    breaker.call(lambda: "ok")
+    assert breaker.state == CLOSED
+    assert breaker.stats()["calls"] == 0, "closing should start a fresh window"
+
+def test_failed_probe_reopens():
+    """A failed probe opens the breaker again"""
+    breaker = make_breaker()
+    call_failing(breaker, 4)
+    time.sleep(OPEN_SECONDS * 2)
+    call_failing(breaker, 1)
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+
+def test_probe_limit():
+    """Only half_open_probes calls are admitted while half-open"""
+    breaker = make_breaker(half_open_probes=1)
+    call_failing(breaker, 4)
+    time.sleep(OPEN_SECONDS * 2)
+    outcomes = []
+
+    def probe():
+        # A second call arriving while the probe is in flight is rejected
+        try:
+            breaker.call(lambda: None)
+            outcomes.append("admitted")
+        except CircuitOpen:
+            outcomes.append("rejected")
+
+    breaker.call(probe)
+    assert outcomes == ["rejected"], outcomes
+    assert breaker.state == CLOSED
+
+def test_slow_calls_open():
+    """Calls slower than slow_call_seconds count against the upstream even when they succeed"""
+    breaker = make_breaker(slow_call_seconds=0.01)
+    for _ in range(4):
+        breaker.call(time.sleep, 0.02)
+    assert breaker.state == OPEN
+
+def test_deadline_is_not_a_verdict():
+    """A fast call cut off by our own deadline is not counted as a failure"""
+    breaker = make_breaker()
+
+    def out_of_time():
+        raise DeadlineExceeded("request deadline")
+
+    for _ in range(8):
+        try:
+            breaker.call(out_of_time)
+        except DeadlineExceeded:
+            pass
+    assert breaker.state == CLOSED
+    assert breaker.stats()["calls"] == 0
+
+def test_failed_result():
+    """failed(result) marks a returned result as a failure"""
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.call(lambda: None, failed=lambda result: result is None)
+    assert breaker.state == OPEN
+
+def test_fallback_response():
+    """Without Gemini the top document's stored FAQ answer, else its opening, is served as degraded"""
+    faq = {"title": "FAQ: Soil Testing", "content": "How often should I test my soil?\nEvery two to three years.",
+           "metadata": {"type": "faq"}}
+    guide = {"title": "Wheat Guide", "content": "Wheat needs 120 kg nitrogen per hectare.", "metadata": None}
+    answer = fallback_response([faq, guide], "gemini_unavailable")
+    assert answer["route"] == "faq" and answer["answer"] == "Every two to three years."
+    assert answer["sources"] == ["FAQ: Soil Testing"] and answer["degraded"] == "gemini_unavailable"
+    answer = fallback_response([guide, faq], "deadline")
+    assert answer["route"] == "excerpt" and answer["answer"].startswith("Wheat needs 120 kg")
@@ -0,0 +1,114 @@
+"""
+Tests for extractive.ExtractiveAnswerer and chunking.split_sentences: the
+best stored sentences are quoted when the top one reaches min_score, others
+only within margin of it, duplicates once, and citations numbered by first
+use. The sentence matrices are cached until the knowledge-base version
+changes.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from chunking import split_sentences
+from extractive import ExtractiveAnswerer
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def towards(score):
+    """A vector whose cosine similarity to the query (1, 0) is score"""
+    return [score, float(np.sqrt(1 - score ** 2))]
+
+QUERY = unit(1, 0)
+
+class FakeDatabase:
+    """document_sentences/kb_version as DatabaseService serves them, counting reads"""
+
+    def __init__(self, sentences):
+        self.sentences = sentences
+        self.version = 1
+        self.reads = 0
+
+    def kb_version(self):
+        return self.version
+
+    def document_sentences(self, doc_ids):
+        self.reads += 1
+        return {doc_id: self.sentences[doc_id] for doc_id in doc_ids if doc_id in self.sentences}
+
+def documents(*ids):
+    return [{"id": doc_id, "title": f"Doc {doc_id}", "content": ""} for doc_id in ids]
+
+def test_quotes_best_sentences_with_citations():
+    """Sentences within margin of the best are quoted, best first, citations numbered by first use"""
+    db = FakeDatabase({
+        1: [("Wheat needs 120 kg nitrogen per hectare.", towards(0.90)), ("Sow wheat in November.", towards(0.20))],
+        2: [("Split nitrogen into two doses.", towards(0.95)), ("Irrigate after the first dose.", towards(0.88))],
+    })
+    answerer = ExtractiveAnswerer(db, max_sentences=3, min_score=0.6, margin=0.1)
+    answer = answerer.answer(QUERY, documents(1, 2))
+    assert answer["answer"] == ("Split nitrogen into two doses. [1] Wheat needs 120 kg nitrogen per hectare. [2] "
+                                "Irrigate after the first dose. [1]"), answer["answer"]
+    assert answer["sources"] == ["Doc 2", "Doc 1"]
+    assert [c["source"] for c in answer["citations"]] == [1, 2, 1]
+    assert answer["route"] == "extractive" and answer["context_used"] == 2
+
+def test_margin_and_max_sentences():
+    """Sentences further than margin below the best, or past max_sentences, are left out"""
+    db = FakeDatabase({1: [(f"Sentence number {i} about urea.", towards(score))
+                           for i, score in enumerate([0.95, 0.93, 0.92, 0.70])]})
+    answer = ExtractiveAnswerer(db, max_sentences=2, min_score=0.6, margin=0.1).answer(QUERY, documents(1))
+    assert len(answer["citations"]) == 2
+    answer = ExtractiveAnswerer(db, max_sentences=5, min_score=0.6, margin=0.1).answer(QUERY, documents(1))
+    assert [c["text"] for c in answer["citations"]] == [f"Sentence number {i} about urea." for i in range(3)]
+
+def test_declines_below_min_score():
+    """No answer when the best sentence is not close enough, or nothing is stored"""
+    db = FakeDatabase({1: [("Mulch keeps the soil moist.", towards(0.4))]})
+    answerer = ExtractiveAnswerer(db, min_score=0.6)
+    assert answerer.answer(QUERY, documents(1)) is None
+    assert answerer.answer(QUERY, documents(7)) is None
+    assert answerer.answer(None, documents(1)) is None
+    stats = answerer.stats()
+    assert stats["answered"] == 0 and stats["declined"] == 2
+
+def test_duplicate_sentences_quoted_once():
+    """The same sentence stored in two documents is quoted once"""
+    shared = ("Apply zinc sulphate at 25 kg per hectare.", towards(0.9))
+    db = FakeDatabase({1: [shared], 2: [shared, ("Zinc deficiency shows as brown spots.", towards(0.85))]})
+    answer = ExtractiveAnswerer(db, max_sentences=3, min_score=0.6, margin=0.1).answer(QUERY, documents(1, 2))
+    texts = [c["text"] for c in answer["citations"]]
+    assert texts == ["Apply zinc sulphate at 25 kg per hectare.", "Zinc deficiency shows as brown spots."], texts
+
+def test_cache_follows_kb_version():
+    """Sentence matrices are reused until the knowledge-base version changes"""
+    db = FakeDatabase({1: [("Wheat needs 120 kg nitrogen per hectare.", towards(0.9))]})
+    answerer = ExtractiveAnswerer(db, min_score=0.6)
+    answerer.answer(QUERY, documents(1))
+    answerer.answer(QUERY, documents(1))
+    assert db.reads == 1
+    db.version = 2
+    db.sentences[1] = [("Wheat needs 150 kg nitrogen on sandy soils.", towards(0.9))]
+    answer = answerer.answer(QUERY, documents(1))
+    assert db.reads == 2
+    assert answer["citations"][0]["text"] == "Wheat needs 150 kg nitrogen on sandy soils."
+
+def test_split_sentences():
+    """One sentence per bullet, paragraphs split at sentence ends, headings and fragments dropped"""
+    content = """POMEGRANATE FERTILIZER APPLICATION
+Apply 10 kg of farmyard manure per tree. Use e.g. compost if manure is short. Water well.
+
+- Give 500 g of urea to mature trees in two splits.
+1. Add potash before flowering for better fruit colour.
+"""
+    assert split_sentences(content) == [
+        "Apply 10 kg of farmyard manure per tree.",
+        "Use e.g. compost if manure is short.",
+        "Give 500 g of urea to mature trees in two splits.",
+        "Add potash before flowering for better fruit colour.",
+    ]
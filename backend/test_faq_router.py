@@ -0,0 +1,88 @@
+"""
+Tests for faq_router.FAQRouter and stored_answer: a query is answered from
+the stored FAQ text only when the top row is an FAQ, close enough to the
+query and clearly ahead of the runner-up; otherwise it falls through to the
+LLM.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from faq_router import FAQRouter, stored_answer
+
+SOIL = {"title": "FAQ: Soil Testing", "content": "How often should I test my soil?\nEvery two to three years.",
+        "metadata": {"type": "faq"}}
+GUIDE = {"title": "Wheat Guide", "content": "Wheat needs 120 kg nitrogen per hectare.", "metadata": None}
+
+
+def scored(doc, score):
+    return dict(doc, similarity_score=score)
+
+
+@pytest.fixture
+def router():
+    return FAQRouter(min_similarity=0.85, min_margin=0.05)
+
+
+def test_confident_faq_is_answered(router):
+    """A top FAQ row at or above min_similarity and clear of the runner-up is served as is"""
+    answer = router.route("how often test soil", [scored(GUIDE, 0.70), scored(SOIL, 0.90)])
+    assert answer == {"answer": "Every two to three years.", "sources": ["FAQ: Soil Testing"],
+                      "context_used": 1, "route": "faq"}
+    assert router.stats()["decisions"] == {"faq": 1}
+
+
+@pytest.mark.parametrize("score, routed", [(0.85, True), (0.8499, False)])
+def test_similarity_threshold(router, score, routed):
+    """The top row's cosine similarity must reach min_similarity"""
+    answer = router.route("soil testing", [scored(SOIL, score)])
+    assert (answer is not None) == routed
+    assert router.stats()["decisions"] == {"faq" if routed else "llm:low_similarity": 1}
+
+
+def test_ambiguous_match_falls_through(router):
+    """A runner-up within min_margin of the top row sends the query to the LLM"""
+    assert router.route("soil testing", [scored(SOIL, 0.90), scored(GUIDE, 0.87)]) is None
+    assert router.stats()["decisions"] == {"llm:ambiguous": 1}
+
+
+def test_not_faq_falls_through(router):
+    """A top row that is not an FAQ is never answered from its text"""
+    assert router.route("wheat nitrogen", [scored(GUIDE, 0.99)]) is None
+    assert router.route("anything", []) is None
+    assert router.stats()["decisions"] == {"llm:not_faq": 1}
+
+
+def test_ranked_by_similarity_not_order(router):
+    """The confidence test uses the most similar row, whatever order retrieval returned"""
+    answer = router.route("soil testing", [scored(GUIDE, 0.60), scored(SOIL, 0.92)])
+    assert answer["sources"] == ["FAQ: Soil Testing"]
+
+
+def test_stored_answer_drops_the_question_line():
+    """FAQ content is "<question>?\n<answer>"; only the answer is served"""
+    assert stored_answer(SOIL) == "Every two to three years."
+
+
+def test_stored_answer_prefers_metadata():
+    """An answer precomputed at ingestion wins over the row's content"""
+    greeting = {"title": "Greeting", "content": "Respond warmly and offer help.",
+                "metadata": '{"type": "greeting-response", "response": "Hello! How can I help?"}'}
+    assert stored_answer(greeting) == "Hello! How can I help?"
+    assert stored_answer(dict(SOIL, metadata={"type": "faq", "answer": "Every 2-3 years."})) == "Every 2-3 years."
+
+
+def test_stored_answer_without_question_line():
+    """FAQ rows titled 'FAQ...' count even without metadata; content without a question line is kept whole"""
+    row = {"title": "FAQ: Mulching", "content": "Mulch keeps the soil moist.\nUse straw or leaves.", "metadata": None}
+    assert stored_answer(row) == "Mulch keeps the soil moist.\nUse straw or leaves."
+
+
+def test_stored_answer_none_for_other_rows():
+    """Rows that are not FAQs, including ones with unreadable metadata, have no stored answer"""
+    assert stored_answer(GUIDE) is None
+    assert stored_answer(dict(GUIDE, metadata="not json")) is None
@@ -0,0 +1,81 @@
+"""
+Tests for hybrid_search: reciprocal rank fusion, the floor on documents only
+the full-text ranker found, and the request deadline reaching the lexical
+query's thread.
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from deadline import deadline_scope, remaining
+from hybrid_search import HybridRetriever, reciprocal_rank_fusion
+
+def doc(doc_id, score=0.0):
+    return {"id": doc_id, "title": f"Doc {doc_id}", "content": "", "similarity_score": score}
+
+class FakeRanker:
+    """Vector and lexical rankers serving fixed lists"""
+
+    def __init__(self, semantic, lexical):
+        self.semantic = semantic
+        self.lexical = lexical
+        self.lexical_deadline = None
+
+    def search_similar_documents(self, query_embedding, limit=3, similarity_threshold=0.7, query_text=None):
+        return self.semantic[:limit]
+
+    def lexical_search_documents(self, query_text, query_embedding, limit=10):
+        self.lexical_deadline = remaining()
+        return self.lexical[:limit]
+
+def test_rrf_scores():
+    """Each ranking adds 1/(k + rank); a document in both lists sums both"""
+    fused = reciprocal_rank_fusion([[doc(1), doc(2)], [doc(2), doc(3)]], k=10)
+    assert abs(fused[1][0] - 1 / 11) < 1e-9
+    assert abs(fused[2][0] - (1 / 12 + 1 / 11)) < 1e-9
+    assert abs(fused[3][0] - 1 / 12) < 1e-9
+
+def test_fusion_order_and_lexical_floor():
+    """Documents both rankers found lead; lexical-only hits below the floor are dropped"""
+    ranker = FakeRanker(semantic=[doc(1, 0.9), doc(2, 0.8)], lexical=[doc(2, 0.8), doc(3, 0.2), doc(4, 0.1)])
+    retriever = HybridRetriever(ranker, ranker, rrf_k=10, lexical_min_rrf_score=1 / 12)
+    results = retriever.search_similar_documents([1.0], limit=5, query_text="urea dose")
+    assert [r["id"] for r in results] == [2, 1, 3], [r["id"] for r in results]
+    assert results[0]["rrf_score"] > results[1]["rrf_score"]
+
+def test_floor_zero_keeps_lexical_hits():
+    """lexical_min_rrf_score=0 keeps every full-text match"""
+    ranker = FakeRanker(semantic=[doc(1, 0.9)], lexical=[doc(3), doc(4), doc(5)])
+    retriever = HybridRetriever(ranker, ranker, rrf_k=10, lexical_min_rrf_score=0)
+    results = retriever.search_similar_documents([1.0], limit=5, query_text="urea dose")
+    assert sorted(r["id"] for r in results) == [1, 3, 4, 5]
+
+def test_without_query_text():
+    """No query text: the vector ranker alone"""
+    ranker = FakeRanker(semantic=[doc(1, 0.9)], lexical=[doc(3)])
+    results = HybridRetriever(ranker, ranker).search_similar_documents([1.0], limit=5)
+    assert [r["id"] for r in results] == [1]
+
+def test_lexical_thread_sees_deadline():
+    """The lexical query runs with the caller's request deadline"""
+    ranker = FakeRanker(semantic=[doc(1, 0.9)], lexical=[doc(1)])
+    with deadline_scope(5):
+        HybridRetriever(ranker, ranker).search_similar_documents([1.0], limit=3, query_text="urea")
+    assert ranker.lexical_deadline is not None and 0 < ranker.lexical_deadline <= 5
+
+def test_slow_lexical_query_bounded_by_deadline():
+    """A lexical query still running at the deadline is dropped, leaving the vector results"""
+    class SlowLexical(FakeRanker):
+        def lexical_search_documents(self, query_text, query_embedding, limit=10):
+            time.sleep(0.5)
+            return [doc(3)]
+
+    ranker = SlowLexical(semantic=[doc(1, 0.9)], lexical=[])
+    start = time.monotonic()
+    with deadline_scope(0.1):
+        results = HybridRetriever(ranker, ranker).search_similar_documents([1.0], limit=3, query_text="urea")
+    assert time.monotonic() - start < 0.4
+    assert [r["id"] for r in results] == [1]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for the serverless entry points.
+
+Imports each entry point in a fresh interpreter with `python -X importtime`
+and checks that the module loads within IMPORT_TIME_BUDGET_MS and without
+pulling in heavy libraries, which are only loaded when the first request
+builds the chatbot. Also reports how long that first build takes.
+
+    python -m pytest test_import_time.py
+    python test_import_time.py
+"""
+
+import os
+import re
+import sys
+import subprocess
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BACKEND_DIR)
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', '200'))
+IMPORT_TIME_RUNS = 3  # best of N, so a busy machine does not fail the budget
+
+# Entry point module -> directory it is imported from
+ENTRY_POINTS = {
+    'chat': os.path.join(ROOT_DIR, 'api'),
+    'index': os.path.join(BACKEND_DIR, 'api'),
+}
+
+# Must not be imported until the first request needs them
+DEFERRED_MODULES = ['numpy', 'requests', 'psycopg2', 'pgvector', 'google.generativeai', 'sqlalchemy', 'httpx', 'asyncpg']
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def import_profile(module, directory):
+    """Return ({module: cumulative µs} imported by the entry module, its cumulative µs) from one -X importtime run"""
+    code = f"import sys; sys.path.insert(0, {directory!r}); import {module}"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, cwd=directory, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    # Children are listed (indented) before their parent, so the entry module's
+    # subtree is everything since the previous top-level import (e.g. site)
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        name, cumulative, nested = match.group(4), int(match.group(2)), len(match.group(3)) > 1
+        if not nested and name == module:
+            return modules, cumulative
+        modules = dict(modules, **{name: cumulative}) if nested else {}
+    return modules, 0
+
+
+def first_build_seconds(module, directory):
+    """Seconds for the first get_chatbot() call (service imports and construction)"""
+    code = (f"import sys, time; sys.path.insert(0, {directory!r}); import {module}; "
+            f"start = time.perf_counter(); {module}.get_chatbot(); print(time.perf_counter() - start)")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=directory, timeout=120)
+    return float(result.stdout.strip().splitlines()[-1]) if result.returncode == 0 else None
+
+
+def check_entry_point(module, directory):
+    print(f"\n📦 {module} ({os.path.relpath(os.path.join(directory, module + '.py'), ROOT_DIR)})")
+    print("-" * 50)
+    try:
+        runs = [import_profile(module, directory) for _ in range(IMPORT_TIME_RUNS)]
+    except Exception as e:
+        print(f"❌ Import failed: {str(e)}")
+        return False
+    modules, best = min(runs, key=lambda run: run[1])
+    best_ms = best / 1000
+
+    passed = True
+    if best_ms <= IMPORT_TIME_BUDGET_MS:
+        print(f"✅ Import time {best_ms:.1f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)")
+    else:
+        print(f"❌ Import time {best_ms:.1f} ms exceeds the {IMPORT_TIME_BUDGET_MS:.0f} ms budget")
+        passed = False
+
+    loaded = [name for name in DEFERRED_MODULES if name in modules]
+    if loaded:
+        print(f"❌ Imported eagerly: {', '.join(loaded)}")
+        passed = False
+    else:
+        print("✅ No heavy libraries imported")
+
+    slowest = sorted(((us, name) for name, us in modules.items()), reverse=True)[:5]
+    print("🐢 Slowest imports: " + ", ".join(f"{name} {us / 1000:.1f} ms" for us, name in slowest))
+
+    build = first_build_seconds(module, directory)
+    if build is not None:
+        print(f"⏱️  First get_chatbot(): {build * 1000:.0f} ms (paid by the first request, not the import)")
+    else:
+        print("⚠️  get_chatbot() failed here (missing dependencies?); import budget still checked")
+    return passed
+
+
+@pytest.mark.parametrize('module', sorted(ENTRY_POINTS))
+def test_entry_point_import_budget(module):
+    """The entry point imports within IMPORT_TIME_BUDGET_MS and defers every heavy library"""
+    assert check_entry_point(module, ENTRY_POINTS[module]), f"{module} is over its import-time budget (see output)"
+
+
+def main():
+    print("🚀 Import-Time Budget Test")
+    print("=" * 50)
+    results = [check_entry_point(module, directory) for module, directory in ENTRY_POINTS.items()]
+    print("\n" + ("✅ All entry points within budget" if all(results) else "❌ Import-time budget exceeded"))
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -21,7 +21,9 @@ def test_imports():
     
     try:
         # Test existing API imports
-        from api.index import chatbot, EmbeddingService, DatabaseService, GeminiService
+        from api.index import get_chatbot, GeminiService
+        from embeddings import EmbeddingService
+        from database import DatabaseService
         print("✅ Existing API modules imported successfully")
         
         # Test new RAG functions
@@ -60,7 +62,8 @@ def test_chatbot_initialization():
     print("\n🤖 Testing chatbot initialization...")
     
     try:
-        from api.index import chatbot
+        from api.index import get_chatbot
+        chatbot = get_chatbot()
         
         # Test basic initialization
         print(f"✅ Chatbot initialized: {type(chatbot).__name__}")
@@ -0,0 +1,105 @@
+"""
+Tests for response_cache.ResponseCache over the in-memory backend: entries
+are keyed on the normalized query, retrieval parameters and the
+knowledge-base version, so a version bump makes older answers unreachable,
+and caching is bypassed while the version is unknown.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from response_cache import MemoryBackend, ResponseCache, create_response_cache
+
+RESPONSE = {"answer": "Apply urea in two splits.", "sources": ["Urea"]}
+
+
+class Version:
+    """kb_version stand-in the tests can bump"""
+
+    def __init__(self, value=1):
+        self.value = value
+
+    def __call__(self):
+        return self.value
+
+
+def make_cache(version, **kwargs):
+    return ResponseCache(MemoryBackend(**kwargs), version, ttl=0)
+
+
+def cached(cache, query="How much urea?", namespace="chat", top_k=3, threshold=0.5):
+    return cache.lookup(namespace, query, top_k, threshold)[1]
+
+
+def test_hit_after_store():
+    """A stored response is served for the same normalized query and parameters"""
+    cache = make_cache(Version())
+    key, response = cache.lookup("chat", "How much urea?", 3, 0.5)
+    assert response is None
+    cache.store(key, RESPONSE)
+    assert cached(cache, "  how MUCH   urea? ") == RESPONSE
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
+
+
+def test_kb_version_bump_invalidates():
+    """A new knowledge-base version misses every entry stored under the old one"""
+    version = Version(1)
+    cache = make_cache(version)
+    key, _ = cache.lookup("chat", "How much urea?", 3, 0.5)
+    cache.store(key, RESPONSE)
+    version.value = 2
+    assert cached(cache) is None
+    version.value = 1
+    assert cached(cache) == RESPONSE, "the old version's entry should still be keyed on that version"
+
+
+def test_unknown_version_bypasses():
+    """With no KB version (database unreachable) nothing is read or stored"""
+    cache = make_cache(Version(None))
+    key, response = cache.lookup("chat", "How much urea?", 3, 0.5)
+    assert key is None and response is None
+    cache.store(key, RESPONSE)
+    stats = cache.stats()
+    assert (stats["bypassed"], stats["stores"], stats["hits"], stats["misses"]) == (1, 0, 0, 0)
+
+
+@pytest.mark.parametrize("changed", [{"namespace": "enhanced-chat"}, {"top_k": 5}, {"threshold": 0.7},
+                                     {"query": "How much zinc?"}])
+def test_key_covers_namespace_and_parameters(changed):
+    """A different namespace, top_k, threshold or query is a different entry"""
+    cache = make_cache(Version())
+    key, _ = cache.lookup("chat", "How much urea?", 3, 0.5)
+    cache.store(key, RESPONSE)
+    assert cached(cache, **changed) is None
+
+
+def test_memory_hits_are_copies():
+    """Changing a returned response does not change what later hits get"""
+    cache = make_cache(Version())
+    key, _ = cache.lookup("chat", "How much urea?", 3, 0.5)
+    cache.store(key, RESPONSE)
+    cached(cache)["sources"].append("Zinc")
+    assert cached(cache) == RESPONSE
+
+
+def test_memory_backend_evicts_least_recently_used():
+    """Past max_entries the least recently read or written entry goes first"""
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1, 0)
+    backend.set("b", 2, 0)
+    backend.get("a")
+    backend.set("c", 3, 0)
+    assert (backend.get("a"), backend.get("b"), backend.get("c")) == (1, None, 3)
+
+
+def test_create_response_cache():
+    """The configured backend is built, 'none' disables caching and unknown names are rejected"""
+    assert create_response_cache(Version(), backend="none") is None
+    assert create_response_cache(Version(), backend="memory").backend.name == "memory"
+    with pytest.raises(ValueError):
+        create_response_cache(Version(), backend="redis")
@@ -0,0 +1,120 @@
+"""
+Tests for semantic_cache.SemanticAnswerCache: answers are served for queries
+within the cosine radius and missed outside it, and entries are dropped when
+a contributing document's fingerprint changes, whether retrieval sees the new
+copy or the periodic database check does.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from semantic_cache import SemanticAnswerCache, document_fingerprint
+
+QUERY = [1.0, 0.0]
+UREA = {"id": 1, "title": "Urea", "content": "Apply urea in two splits."}
+ZINC = {"id": 2, "title": "Zinc", "content": "Apply zinc sulphate at 25 kg per hectare."}
+RESPONSE = {"answer": "Apply urea in two splits.", "sources": ["Urea"]}
+
+
+def towards(score):
+    """A vector whose cosine similarity to QUERY is score"""
+    return [score, float(np.sqrt(1 - score ** 2))]
+
+
+def make_cache(**kwargs):
+    options = dict(threshold=0.95, max_entries=8, ttl=0, policy='lru', validator=None, validate_interval=0)
+    options.update(kwargs)
+    return SemanticAnswerCache(**options)
+
+
+def test_hit_within_radius():
+    """A query at or above the threshold gets the stored answer and its similarity"""
+    cache = make_cache()
+    cache.store(QUERY, [UREA], RESPONSE)
+    hit = cache.lookup(towards(0.97))
+    assert hit["answer"] == RESPONSE["answer"] and hit["sources"] == ["Urea"]
+    assert abs(hit["cache_similarity"] - 0.97) < 1e-5
+
+
+def test_miss_outside_radius():
+    """A query below the threshold misses"""
+    cache = make_cache()
+    cache.store(QUERY, [UREA], RESPONSE)
+    assert cache.lookup(towards(0.90)) is None
+    stats = cache.stats()
+    assert (stats["lookups"], stats["hits"], stats["misses"]) == (1, 0, 1)
+
+
+def test_scale_does_not_matter():
+    """Query vectors are normalized, so only the direction decides a hit"""
+    cache = make_cache()
+    cache.store([3.0, 0.0], [UREA], RESPONSE)
+    assert cache.lookup([0.5, 0.0]) is not None
+    assert cache.lookup([0.0, 0.0]) is None
+
+
+def test_hit_is_a_copy():
+    """Changing a returned answer does not change the cached one"""
+    cache = make_cache()
+    cache.store(QUERY, [UREA], RESPONSE)
+    cache.lookup(QUERY)["answer"] = "changed"
+    assert cache.lookup(QUERY)["answer"] == RESPONSE["answer"]
+
+
+def test_changed_document_seen_by_retrieval_invalidates():
+    """observe_documents drops entries built from an older copy of a document"""
+    cache = make_cache()
+    cache.store(QUERY, [UREA, ZINC], RESPONSE)
+    cache.observe_documents([dict(UREA), dict(ZINC)])
+    assert cache.lookup(QUERY) is not None, "unchanged documents must not invalidate"
+    cache.observe_documents([dict(UREA, content="Apply urea in three splits.")])
+    assert cache.lookup(QUERY) is None
+    assert len(cache) == 0 and cache.stats()["invalidations"] == 1
+
+
+def test_passage_fingerprint_is_used():
+    """A passage carries its parent's fingerprint, which is compared instead of its partial content"""
+    cache = make_cache()
+    fingerprint = document_fingerprint(UREA["title"], UREA["content"])
+    cache.store(QUERY, [dict(UREA, content="Apply urea", fingerprint=fingerprint)], RESPONSE)
+    cache.observe_documents([dict(UREA, content="in two splits.", fingerprint=fingerprint)])
+    assert cache.lookup(QUERY) is not None
+
+
+def test_validator_invalidates_on_hit():
+    """On a hit the validator's current fingerprints are compared with the stored ones"""
+    current = {1: document_fingerprint(UREA["title"], UREA["content"])}
+    calls = []
+
+    def validator(ids):
+        calls.append(sorted(ids))
+        return dict(current)
+
+    cache = make_cache(validator=validator)
+    cache.store(QUERY, [UREA], RESPONSE)
+    assert cache.lookup(QUERY) is not None
+    current[1] = document_fingerprint(UREA["title"], "Apply urea in three splits.")
+    assert cache.lookup(QUERY) is None
+    assert calls == [[1], [1]]
+    assert len(cache) == 0
+
+
+def test_validator_unavailable_keeps_entry():
+    """A validator returning None (database down) does not drop the entry"""
+    cache = make_cache(validator=lambda ids: None)
+    cache.store(QUERY, [UREA], RESPONSE)
+    assert cache.lookup(QUERY) is not None
+
+
+def test_invalidate_documents():
+    """invalidate_documents drops only the entries that used those documents"""
+    cache = make_cache()
+    cache.store(QUERY, [UREA], RESPONSE)
+    cache.store([0.0, 1.0], [ZINC], {"answer": "Zinc.", "sources": ["Zinc"]})
+    assert cache.invalidate_documents([1]) == 1
+    assert cache.lookup(QUERY) is None
+    assert cache.lookup([0.0, 1.0])["answer"] == "Zinc."
@@ -52,7 +52,7 @@ You can also call us directly at +91 91988-03978 for immediate assistance with y
 def clear_all_data():
     """Clear all existing data from the database"""
     try:
-        from api.index import DatabaseService
+        from database import DatabaseService
         db_service = DatabaseService()
         conn = db_service.get_connection()
         
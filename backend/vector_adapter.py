@@ -0,0 +1,133 @@
+import io
+import json
+import struct
+import logging
+
+import numpy as np
+from psycopg2.extensions import ISQLQuote, new_type, register_type
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# '%.9g' round-trips every float32 exactly while staying ~30% shorter than str(float)
+_TEXT_TEMPLATES = {}
+
+# pgvector binary wire format: int16 dim, int16 unused, then big-endian float4 values
+_VECTOR_HEADER = struct.Struct('>HH')
+
+# Binary COPY framing
+_COPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+_COPY_TRAILER = struct.pack('>h', -1)
+
+# vector type OID per database, so new connections register the typecaster without a query
+_vector_oids = {}
+
+
+def as_vector(embedding):
+    """Return embedding as a contiguous 1-D float32 array"""
+    return np.ascontiguousarray(embedding, dtype=np.float32).ravel()
+
+
+def to_vector_text(vector):
+    """Serialize a vector to pgvector's text form '[x,y,...]'"""
+    values = as_vector(vector)
+    template = _TEXT_TEMPLATES.get(values.shape[0])
+    if template is None:
+        template = _TEXT_TEMPLATES.setdefault(values.shape[0], ','.join(['%.9g'] * values.shape[0]))
+    return '[' + template % tuple(values.tolist()) + ']'
+
+
+def from_vector_text(value):
+    """Parse pgvector's text form into a float32 array"""
+    return np.fromstring(value[1:-1], sep=',', dtype=np.float32)
+
+
+def encode_vector_binary(vector):
+    """Encode a vector in pgvector's binary send/recv format"""
+    values = np.ascontiguousarray(vector, dtype='>f4').ravel()
+    return _VECTOR_HEADER.pack(values.shape[0], 0) + values.tobytes()
+
+
+def decode_vector_binary(data):
+    """Decode pgvector's binary format into a float32 array"""
+    dim, _ = _VECTOR_HEADER.unpack_from(data)
+    return np.frombuffer(data, dtype='>f4', count=dim, offset=_VECTOR_HEADER.size).astype(np.float32)
+
+
+class Vector:
+    """An embedding passed as a psycopg2 parameter, bound as a single '[...]'::vector literal.
+
+    Only values wrapped in Vector are sent as vectors: it adapts itself
+    (__conform__), so no global adapter changes how other NumPy arrays bind.
+    """
+
+    __slots__ = ('values',)
+
+    def __init__(self, embedding):
+        self.values = as_vector(embedding)
+
+    def __conform__(self, protocol):
+        if protocol is ISQLQuote:
+            return self
+        return None
+
+    def getquoted(self):
+        # The literal only ever contains digits, signs, '.', 'e' and ',' so no escaping is needed
+        return f"'{to_vector_text(self.values)}'::vector".encode()
+
+
+def _cast_vector(value, cursor):
+    if value is None:
+        return None
+    return from_vector_text(value)
+
+
+def register_vector(conn, key=None):
+    """Register NumPy <-> vector conversion on a psycopg2 connection.
+
+    Selected vector columns come back as float32 arrays instead of strings;
+    parameters are sent as vectors by wrapping them in Vector.
+    """
+    key = key or conn.dsn
+    oid = _vector_oids.get(key)
+    if oid is None:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 'vector'::regtype::oid;")
+            oid = cursor.fetchone()[0]
+            cursor.close()
+            conn.rollback()  # do not leave the connection idle in transaction
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"pgvector type not available, vectors stay as text: {str(e)}")
+            return False
+        _vector_oids[key] = oid
+    register_type(new_type((oid,), 'VECTOR', _cast_vector), conn)
+    return True
+
+
+def copy_documents_binary(cursor, rows, table='documents', columns=('title', 'content', 'embedding', 'metadata')):
+    """Bulk load (title, content, embedding, metadata) rows with COPY ... FORMAT BINARY.
+
+    Vectors travel in pgvector's binary format, so Postgres does no float parsing.
+    Returns the number of rows copied.
+    """
+    buffer = io.BytesIO()
+    buffer.write(_COPY_SIGNATURE)
+    count = 0
+    for title, content, embedding, metadata in rows:
+        fields = (
+            title.encode('utf-8'),
+            content.encode('utf-8'),
+            encode_vector_binary(embedding),
+            b'\x01' + json.dumps(metadata or {}).encode('utf-8')  # jsonb binary = version byte + text
+        )
+        buffer.write(struct.pack('>h', len(fields)))
+        for field in fields:
+            buffer.write(struct.pack('>i', len(field)))
+            buffer.write(field)
+        count += 1
+    buffer.write(_COPY_TRAILER)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT BINARY)", buffer)
+    return count
@@ -0,0 +1,315 @@
+import os
+import json
+import mmap
+import time
+import struct
+from datetime import datetime
+import threading
+import logging
+
+import numpy as np
+from psycopg2.extras import RealDictCursor
+
+from vector_adapter import from_vector_text
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# In-memory retrieval configuration
+VECTOR_INDEX_ENABLED = os.getenv('VECTOR_INDEX_ENABLED', 'false').strip().lower() in ('1', 'true', 'yes')
+VECTOR_INDEX_REFRESH_INTERVAL = float(os.getenv('VECTOR_INDEX_REFRESH_INTERVAL', '30'))  # seconds between watermark checks
+VECTOR_INDEX_FULL_RELOAD_INTERVAL = float(os.getenv('VECTOR_INDEX_FULL_RELOAD_INTERVAL', '900'))  # catches in-place UPDATEs
+
+# Shared snapshot file: header, then the float32 matrix, then the rows as JSON
+_SHARED_MAGIC = b'RAGV'
+_SHARED_HEADER = struct.Struct('<4sQQQ')  # magic, rows, dim, JSON rows length
+
+
+def shared_snapshot_path():
+    """Snapshot file published by prefork.py (in its private directory) and mmap'ed read-only by every worker"""
+    return os.getenv('VECTOR_INDEX_SHARED_PATH', '').strip()
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def write_shared_snapshot(path, rows, matrix):
+    """Write rows and their normalized matrix to path, atomically replacing any previous file"""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    dim = matrix.shape[1] if matrix.ndim == 2 else 0
+    # JSON, never pickle: reading the file must not be able to run code
+    payload = json.dumps([
+        {**row, 'created_at': row['created_at'].isoformat() if row.get('created_at') is not None else None}
+        for row in rows
+    ]).encode('utf-8')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    # O_EXCL: never write through a file or symlink someone else put there
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_SHARED_HEADER.pack(_SHARED_MAGIC, len(rows), dim, len(payload)))
+            f.write(matrix.tobytes())
+            f.write(payload)
+        # Readers that already mapped the old file keep it until they re-attach
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def read_shared_snapshot(path):
+    """Map a snapshot file; returns (rows, read-only matrix view, file identity)"""
+    with open(path, 'rb') as f:
+        identity = os.fstat(f.fileno())
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, n, dim, payload_length = _SHARED_HEADER.unpack_from(buffer)
+    if magic != _SHARED_MAGIC:
+        raise ValueError(f"{path} is not a vector snapshot")
+    offset = _SHARED_HEADER.size
+    # frombuffer over the mapping: pages are shared with every other process mapping the file
+    matrix = np.frombuffer(buffer, dtype=np.float32, count=n * dim, offset=offset).reshape(n, dim)
+    offset += n * dim * 4
+    rows = json.loads(buffer[offset:offset + payload_length])
+    for row in rows:
+        if row.get('created_at') is not None:
+            row['created_at'] = datetime.fromisoformat(row['created_at'])
+    return rows, matrix, (identity.st_ino, identity.st_mtime_ns)
+
+
+class _Snapshot:
+    """Immutable view swapped in atomically so searches never need a lock"""
+
+    def __init__(self, matrix, rows, max_id, max_created_at):
+        self.matrix = matrix  # (n, dim) float32, L2-normalized, C-contiguous
+        self.rows = rows  # list of dicts: id, title, content, metadata
+        self.max_id = max_id
+        self.max_created_at = max_created_at
+
+
+class InMemoryVectorIndex:
+    """Brute-force cosine retrieval over a NumPy snapshot of the documents table.
+
+    For a knowledge base of a few thousand rows one matrix-vector product plus
+    argpartition answers top-k in microseconds. The snapshot refreshes
+    incrementally via id/created_at watermarks, so Postgres is only hit for
+    refreshes. Exposes the same search_similar_documents interface as
+    DatabaseService and falls back to it until the first load succeeds.
+
+    With shared_path set (prefork workers), loads map the snapshot file the
+    prefork master publishes instead of copying the matrix from Postgres, and
+    full reloads become a cheap check for a newer file. Incremental refreshes
+    still apply on top, into a private copy, until the next publish.
+    """
+
+    def __init__(self, db_service, refresh_interval=VECTOR_INDEX_REFRESH_INTERVAL,
+                 full_reload_interval=VECTOR_INDEX_FULL_RELOAD_INTERVAL, shared_path=None):
+        self.db_service = db_service
+        self.refresh_interval = refresh_interval
+        self.full_reload_interval = full_reload_interval
+        self.shared_path = shared_snapshot_path() if shared_path is None else shared_path
+        self._shared_identity = None
+        self._snapshot = None
+        self._last_refresh = 0.0
+        self._last_full_reload = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._snapshot.rows) if self._snapshot else 0
+
+    def _fetch(self, cursor, where="", params=()):
+        cursor.execute(f"""
+            SELECT id, title, content, metadata, embedding, created_at
+            FROM documents
+            WHERE embedding IS NOT NULL {where}
+            ORDER BY id;
+        """, params)
+        rows = cursor.fetchall()
+        vectors = []
+        for row in rows:
+            embedding = row.pop('embedding')
+            # Vectors arrive as float32 arrays when the pgvector typecaster is registered
+            vectors.append(from_vector_text(embedding) if isinstance(embedding, str) else embedding)
+        matrix = np.vstack(vectors).astype(np.float32) if vectors else None
+        return rows, matrix
+
+    def attach_shared(self):
+        """Swap in the published snapshot if it is newer than the one attached; returns True on attach"""
+        try:
+            identity = os.stat(self.shared_path)
+            if (identity.st_ino, identity.st_mtime_ns) == self._shared_identity:
+                return False
+            rows, matrix, self._shared_identity = read_shared_snapshot(self.shared_path)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.error(f"Shared vector snapshot error: {str(e)}")
+            return False
+        self._snapshot = self._build_snapshot(rows, matrix)
+        self._last_refresh = self._last_full_reload = time.monotonic()
+        logger.info(f"Vector index attached to shared snapshot: {len(rows)} documents")
+        return True
+
+    def publish(self, path):
+        """Write the current snapshot for workers to map; returns False if nothing is loaded"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return False
+        write_shared_snapshot(path, snapshot.rows, snapshot.matrix)
+        return True
+
+    def load(self):
+        """Load every document embedding into a fresh snapshot"""
+        if self.shared_path and self.attach_shared():
+            return True
+        conn = self.db_service.get_connection()
+        if not conn:
+            return False
+        try:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            rows, matrix = self._fetch(cursor)
+            cursor.close()
+
+            if matrix is None:
+                matrix = np.empty((0, 0), dtype=np.float32)
+            else:
+                matrix = np.ascontiguousarray(_normalize_rows(matrix))
+            self._snapshot = self._build_snapshot(rows, matrix)
+
+            now = time.monotonic()
+            self._last_refresh = self._last_full_reload = now
+            logger.info(f"Vector index loaded: {len(rows)} documents")
+            return True
+
+        except Exception as e:
+            logger.error(f"Vector index load error: {str(e)}")
+            return False
+        finally:
+            conn.close()
+
+    def refresh(self):
+        """Pull rows past the id/created_at watermarks; full reload if rows were deleted"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.load()
+
+        conn = self.db_service.get_connection()
+        if not conn:
+            return False
+        try:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute("SELECT COUNT(*) AS n FROM documents WHERE embedding IS NOT NULL;")
+            total = cursor.fetchone()['n']
+
+            if snapshot.max_created_at is None:
+                rows, matrix = self._fetch(cursor, "AND id > %s", (snapshot.max_id,))
+            else:
+                rows, matrix = self._fetch(
+                    cursor, "AND (id > %s OR created_at > %s)", (snapshot.max_id, snapshot.max_created_at)
+                )
+            cursor.close()
+        except Exception as e:
+            logger.error(f"Vector index refresh error: {str(e)}")
+            return False
+        finally:
+            conn.close()
+
+        known = {row['id']: i for i, row in enumerate(snapshot.rows)}
+        new_count = sum(1 for row in rows if row['id'] not in known)
+        if len(snapshot.rows) + new_count != total:
+            # Deletions can't be seen through watermarks
+            return self.load()
+
+        if rows:
+            matrix = _normalize_rows(matrix)
+            base = snapshot.matrix if snapshot.matrix.size else np.empty((0, matrix.shape[1]), dtype=np.float32)
+            base_rows = list(snapshot.rows)
+            appended_rows, appended = [], []
+            replaced = base.copy() if any(row['id'] in known for row in rows) else base
+            for row, vector in zip(rows, matrix):
+                pos = known.get(row['id'])
+                if pos is None:
+                    appended_rows.append(row)
+                    appended.append(vector)
+                else:
+                    base_rows[pos] = row
+                    replaced[pos] = vector
+            if appended:
+                replaced = np.concatenate([replaced, np.vstack(appended)])
+            self._snapshot = self._build_snapshot(base_rows + appended_rows, np.ascontiguousarray(replaced))
+            logger.info(f"Vector index refreshed: +{len(appended_rows)} new, {len(rows) - len(appended_rows)} updated")
+
+        self._last_refresh = time.monotonic()
+        return True
+
+    def _build_snapshot(self, rows, matrix):
+        max_id = max((row['id'] for row in rows), default=0)
+        created = [row['created_at'] for row in rows if row.get('created_at') is not None]
+        return _Snapshot(matrix, rows, max_id, max(created) if created else None)
+
+    def _maybe_refresh(self):
+        """Refresh on the calling thread when due; concurrent callers keep using the current snapshot"""
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._last_refresh < self.refresh_interval:
+            return
+        if not self._refresh_lock.acquire(blocking=self._snapshot is None):
+            return
+        try:
+            if self._snapshot is None:
+                self.load()
+            elif self.shared_path:
+                # The master republishes on its own schedule; only fall back to a private refresh
+                if not self.attach_shared():
+                    self.refresh()
+            elif now - self._last_full_reload >= self.full_reload_interval:
+                self.load()
+            elif now - self._last_refresh >= self.refresh_interval:
+                self.refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def warm_up(self):
+        """Load (or attach) the snapshot ahead of the first search"""
+        self._maybe_refresh()
+
+    def search_similar_documents(self, query_embedding, limit=3, similarity_threshold=0.7, query_text=None):
+        """Search for similar documents using cosine similarity over the in-memory snapshot"""
+        self._maybe_refresh()
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Never loaded (e.g. database briefly unreachable): serve from Postgres directly
+            return self.db_service.search_similar_documents(query_embedding, limit=limit, similarity_threshold=similarity_threshold)
+
+        n = len(snapshot.rows)
+        if n == 0 or limit <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        scores = snapshot.matrix @ (query / norm)
+
+        k = min(limit, n)
+        top = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            score = float(scores[i])
+            if score < similarity_threshold:
+                break
+            row = snapshot.rows[i]
+            results.append({
+                "id": row['id'],
+                "title": row['title'],
+                "content": row['content'],
+                "metadata": row['metadata'],
+                "similarity_score": score
+            })
+        return results
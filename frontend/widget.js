@@ -3,6 +3,8 @@ class RAGChatbotWidget {
         this.config = {
             apiBaseUrl: config.apiBaseUrl || this.getApiBaseUrl(),
             position: config.position || 'bottom-right',
+            // Render tokens as they are generated via /api/chat/stream
+            streaming: config.streaming !== false,
             ...config
         };
 
@@ -113,6 +115,84 @@ class RAGChatbotWidget {
         if (this.inputField) this.inputField.value = '';
         if (this.sendBtn) this.sendBtn.classList.remove('active');
         this.showTyping();
+        if (this.config.streaming) {
+            try {
+                if (await this.streamMessage(message)) return;
+            } catch (e) {
+                console.warn('Streaming failed, falling back to /api/chat', e);
+            }
+        }
+        await this.fetchMessage(message);
+    }
+
+    normalizeAnswer(text) {
+        return text && text.toLowerCase().includes('i do not have enough information')
+            ? "Sorry, I don’t have that information right now."
+            : text;
+    }
+
+    // Returns false if nothing was rendered, so the caller can retry non-streaming
+    async streamMessage(message) {
+        const base = this.config.apiBaseUrl;
+        const url = base ? `${base}/api/chat/stream` : `/api/chat/stream`;
+        const resp = await fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ query: message })
+        });
+        if (!resp.ok || !resp.body) return false;
+
+        const reader = resp.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let text = '';
+        let bubble = null;
+
+        const handleEvent = (event) => {
+            if (event.type === 'token' && event.text) {
+                if (!bubble) {
+                    this.hideTyping();
+                    this.isTyping = true; // keep input locked until the stream ends
+                    bubble = this.addMessage('', 'bot');
+                }
+                text += event.text;
+                bubble.textContent = text;
+                this.scrollToBottom();
+            } else if (event.type === 'error' && !bubble) {
+                throw new Error(event.error || 'stream error');
+            }
+        };
+
+        try {
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let sep;
+                while ((sep = buffer.indexOf('\n\n')) !== -1) {
+                    const frame = buffer.slice(0, sep);
+                    buffer = buffer.slice(sep + 2);
+                    const data = frame.split('\n')
+                        .filter(line => line.startsWith('data:'))
+                        .map(line => line.slice(5).trim())
+                        .join('');
+                    if (data) handleEvent(JSON.parse(data));
+                }
+            }
+        } catch (e) {
+            // Once text is on screen keep the partial answer instead of asking again
+            if (!bubble) throw e;
+            console.error(e);
+        } finally {
+            if (bubble) {
+                bubble.textContent = this.normalizeAnswer(text) || "Sorry, I don’t have that information right now.";
+                this.isTyping = false;
+            }
+        }
+        return bubble !== null;
+    }
+
+    async fetchMessage(message) {
         try {
             const base = this.config.apiBaseUrl;
             const url = base ? `${base}/api/chat` : `/api/chat`;
@@ -125,9 +205,7 @@ class RAGChatbotWidget {
             this.hideTyping();
             if (resp.ok) {
                 const botText = (data && typeof data.response === 'string') ? data.response : '';
-                const normalized = botText && botText.toLowerCase().includes('i do not have enough information')
-                    ? "Sorry, I don’t have that information right now."
-                    : botText;
+                const normalized = this.normalizeAnswer(botText);
                 this.addMessage(normalized || "Sorry, I don’t have that information right now.", 'bot');
             } else {
                 this.addMessage("Sorry, I don’t have that information right now.", 'bot');
@@ -148,6 +226,7 @@ class RAGChatbotWidget {
         row.appendChild(bubble);
         this.messages.insertBefore(row, this.typing);
         this.scrollToBottom();
+        return bubble;
     }
     showTyping() { this.isTyping = true; this.typing.classList.add('show'); this.scrollToBottom(); }
     hideTyping() { this.isTyping = false; this.typing.classList.remove('show'); }